@@ -0,0 +1,382 @@
+# Benchmarks of the performance-sensitive parts of dependenpy.
+#
+# Run `python scripts/benchmark.py --help` to list the available benchmarks.
+
+from __future__ import annotations
+
+import argparse
+import gc
+import os
+import subprocess
+import sys
+import sysconfig
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from dependenpy._internal.dsm import DSM
+from dependenpy._internal.parsing import (
+    AST,
+    BYTECODE,
+    ENGINES,
+    SERIAL,
+    _extract_imports,
+    _parse_paths,
+    _read_bytecode_imports,
+    _read_imports,
+)
+from dependenpy._internal.structures import Graph, Matrix
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+
+def _timeit(function: Callable[[], object], repeat: int, setup: Callable[[], object] | None = None) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _read_sources(directories: list[str]) -> dict[str, bytes]:
+    # Modules that cannot be read or decoded (some test data in the standard library) are skipped.
+    sources = {}
+    for directory in directories:
+        for path in sorted(Path(directory).rglob("*.py")):
+            try:
+                source = path.read_bytes()
+                source.decode("utf-8")
+            except (OSError, UnicodeDecodeError):
+                continue
+            sources[str(path)] = source
+    return sources
+
+
+def _evict(paths: list[str]) -> None:
+    # Drop the files from the page cache, so that they are read from the disk again.
+    for path in paths:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+
+def bench_engines(opts: argparse.Namespace) -> None:
+    """Compare the engines used to find imports in modules."""
+    sources = _read_sources(opts.directories)
+    print(f"{len(sources)} files, {sum(map(len, sources.values())) / 2**20:.1f} MiB")
+    results = {}
+    for engine in ENGINES:
+        results[engine] = {path: _extract_imports(source, engine) for path, source in sources.items()}
+        seconds = _timeit(
+            lambda engine=engine: [_extract_imports(source, engine) for source in sources.values()],
+            opts.repeat,
+        )
+        print(f"{engine:>8}: {seconds:.3f}s")
+    for engine in ENGINES:
+        differences = [path for path in sources if results[engine][path] != results[AST][path]]
+        if differences:
+            print(f"{engine} differs from {AST} on {len(differences)} files, for example {differences[0]}")
+
+
+def bench_prefetch(opts: argparse.Namespace) -> None:
+    """Compare serial parsing with and without prefetching files, on a cold page cache."""
+    if not hasattr(os, "posix_fadvise"):
+        sys.exit("This benchmark needs os.posix_fadvise to evict files from the page cache.")
+    paths = list(_read_sources(opts.directories))
+    print(f"{len(paths)} files")
+    for size in opts.sizes:
+        seconds = _timeit(
+            lambda size=size: _parse_paths(paths, SERIAL, prefetch=size),
+            opts.repeat,
+            setup=None if opts.warm else lambda: _evict(paths),
+        )
+        print(f"prefetch={size:<4}: {seconds:.3f}s")
+
+
+def bench_bytecode(opts: argparse.Namespace) -> None:
+    """Compare finding imports in cached bytecode with parsing the sources of modules."""
+    paths = list(_read_sources(opts.directories))
+    fallbacks = sum(_read_bytecode_imports(path) is None for path in paths)
+    print(f"{len(paths)} files, {len(paths) - fallbacks} with usable bytecode, {fallbacks} parsed")
+    results = {}
+    for engine in (AST, BYTECODE):
+        results[engine] = [_read_imports(path, engine) for path in paths]
+        seconds = _timeit(lambda engine=engine: [_read_imports(path, engine) for path in paths], opts.repeat)
+        print(f"{engine:>8}: {seconds:.3f}s")
+    differences = [path for path, ast, bytecode in zip(paths, *results.values()) if ast != bytecode]
+    if differences:
+        print(f"{BYTECODE} differs from {AST} on {len(differences)} files, for example {differences[0]}")
+
+
+# Each finder runs in a new interpreter, so that packages imported by a run are not reused by the next one.
+_FINDERS = {
+    "importlib": "from importlib.util import find_spec\nfind = lambda package: find_spec(package)",
+    "sys.path": "from dependenpy import InstalledPackageFinder\nfind = InstalledPackageFinder().find",
+}
+_FINDER_RUN = """
+import sys, time
+{finder}
+modules = len(sys.modules)
+start = time.perf_counter()
+for package in {packages!r}:
+    find(package)
+print(time.perf_counter() - start, len(sys.modules) - modules)
+"""
+
+
+def bench_finders(opts: argparse.Namespace) -> None:
+    """Compare finding installed packages with importlib (importing their parents) and on disk only."""
+    for name, finder in _FINDERS.items():
+        code = _FINDER_RUN.format(finder=finder, packages=opts.packages)
+        runs = []
+        for _ in range(opts.repeat):
+            output = subprocess.run(  # noqa: S603
+                [sys.executable, "-c", code],
+                capture_output=True,
+                check=True,
+                text=True,
+            ).stdout
+            seconds, imported = output.split()
+            runs.append((float(seconds), int(imported)))
+        seconds, imported = min(runs)
+        print(f"{name:>9}: {seconds * 1000:.1f}ms, {imported} modules imported")
+
+
+def _traced_memory() -> int:
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def bench_memory(opts: argparse.Namespace) -> None:
+    """Measure the memory held by the tree of modules, and by their dependencies."""
+    tracemalloc.start()
+    start = _traced_memory()
+    dsm = DSM(*opts.packages, build_dependencies=False, compact=opts.compact)
+    tree = _traced_memory()
+    dsm.build_dependencies()
+    dependencies = _traced_memory()
+    tracemalloc.stop()
+    modules = len(dsm.submodules)
+    count = sum(len(module.dependencies) for module in dsm.submodules)
+    print(f"{modules} modules, {count} dependencies")
+    tree, dependencies = tree - start, dependencies - tree
+    print(f"tree: {tree / 2**20:.1f} MiB, {tree / modules:.0f} bytes per module")
+    print(f"dependencies: {dependencies / 2**20:.1f} MiB, {dependencies / count:.0f} bytes per dependency")
+
+
+def _wide_package(directory: Path, width: int) -> None:
+    # A package with wide directories: each of its sub-packages holds `width` modules,
+    # and each module imports modules and objects from its own and from the other sub-packages.
+    for package in ("wide", "wide.left", "wide.right"):
+        package_dir = directory.joinpath(*package.split("."))
+        package_dir.mkdir()
+        package_dir.joinpath("__init__.py").touch()
+        if package == "wide":
+            continue
+        for index in range(width):
+            package_dir.joinpath(f"module_{index}.py").write_text(
+                f"from . import module_{(index + 1) % width}\n"
+                f"from wide.left.module_{index * 7 % width} import Object\n"
+                f"from wide.right import module_{index * 13 % width}\n"
+                "import wide.missing.module\n",
+            )
+
+
+def bench_resolve(opts: argparse.Namespace) -> None:
+    """Measure looking up nodes and resolving imports in a package with wide directories."""
+    with tempfile.TemporaryDirectory() as directory:
+        _wide_package(Path(directory), opts.width)
+        sys.path.insert(0, directory)
+        try:
+            dsm = DSM("wide")
+        finally:
+            sys.path.remove(directory)
+    modules = dsm.submodules
+    names = [module.absolute_name() for module in modules]
+    targets = sorted({name for module in modules for name, _ in module._recorded_imports() or []})
+    print(f"{len(modules)} modules, {len(targets)} unique import targets")
+    # The DSM's caches of lookups (`get` and `get_target`) are bypassed.
+    seconds = _timeit(lambda: [dsm[name] for name in names], opts.repeat)
+    print(f"  lookup: {seconds / len(names) * 1e6:.2f}us per name")
+    seconds = _timeit(lambda: [dsm._get_target(target) for target in targets], opts.repeat)
+    print(f" resolve: {seconds / len(targets) * 1e6:.2f}us per target")
+
+
+def bench_graph(opts: argparse.Namespace) -> None:
+    """Measure building the graph of modules of a package with wide directories."""
+    with tempfile.TemporaryDirectory() as directory:
+        _wide_package(Path(directory), opts.width)
+        sys.path.insert(0, directory)
+        try:
+            dsm = DSM("wide")
+        finally:
+            sys.path.remove(directory)
+    graph = Graph(dsm)
+    print(f"{len(graph.vertices)} vertices, {len(graph.edges)} edges")
+    seconds = _timeit(lambda: Graph(dsm), opts.repeat)
+    print(f"graph: {seconds:.3f}s")
+
+
+def bench_export(opts: argparse.Namespace) -> None:
+    """Measure exporting the dependencies of packages in each format."""
+    dsm = DSM(*opts.packages)
+    count = sum(len(module.dependencies) for module in dsm.submodules)
+    print(f"{len(dsm.submodules)} modules, {count} dependencies")
+    dsms = []
+    for name in ("csv", "json", "text"):
+        # A new DSM is exported on each run, as names and lookups are cached on the nodes.
+        seconds = _timeit(
+            lambda name=name: getattr(dsms.pop(), f"_to_{name}")(),
+            opts.repeat,
+            setup=lambda: dsms.append(DSM(*opts.packages)),
+        )
+        print(f"{name:>5}: {seconds:.3f}s")
+
+
+def bench_matrix(opts: argparse.Namespace) -> None:
+    """Measure building the matrices of packages at each depth."""
+    dsm = DSM(*opts.packages)
+    count = sum(len(module.dependencies) for module in dsm.submodules)
+    print(f"{len(dsm.submodules)} modules, {count} dependencies")
+    for depth in opts.depths:
+        matrix = Matrix(dsm, depth=depth)
+        seconds = _timeit(lambda depth=depth: Matrix(dsm, depth=depth), opts.repeat)
+        sequence = _timeit(matrix.sequence, opts.repeat)
+        print(f"depth {depth}: {matrix.size}x{matrix.size}, {seconds:.3f}s (sequence: {sequence:.3f}s)")
+    matrix = Matrix(dsm, depth=1)
+    for package in opts.expand:
+        expanded = matrix.expand(package)
+        seconds = _timeit(lambda package=package: matrix.expand(package), opts.repeat)
+        rebuild = _timeit(lambda package=package: Matrix(dsm, depth=1, expanded=[package]), opts.repeat)
+        print(f"expand {package}: {expanded.size}x{expanded.size}, {seconds:.3f}s (rebuild: {rebuild:.3f}s)")
+
+
+class _Output:
+    # Output discarding what is written, but recording when it was first written to.
+    def __init__(self) -> None:
+        self.first_write = 0.0
+
+    def write(self, text: str) -> None:  # noqa: ARG002
+        if not self.first_write:
+            self.first_write = time.perf_counter()
+
+
+def bench_render(opts: argparse.Namespace) -> None:
+    """Measure printing the matrix of packages in each format, and the peak memory it needs."""
+    dsm = DSM(*opts.packages)
+    matrix = Matrix(dsm, depth=opts.depth)
+    print(f"{matrix.size}x{matrix.size} matrix")
+    for name in ("csv", "json", "text"):
+        output = _Output()
+        tracemalloc.start()
+        start = time.perf_counter()
+        matrix.print(format=name, output=output)
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(
+            f"{name:>5}: first write after {output.first_write - start:.3f}s, {seconds:.3f}s in total "
+            f"(with tracing), peak {peak / 2**20:.1f} MiB",
+        )
+
+
+# Big installed packages whose modules can all be decoded (parsing fails on some test data of IPython, for example).
+_PACKAGES = ["mypy", "pygments", "jedi", "trio"]
+_DIRECTORIES = "Directories containing the modules to parse. Default: the standard library."
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="Number of runs, the best one is reported.")
+    subparsers = parser.add_subparsers(required=True)
+
+    engines = subparsers.add_parser("engines", help=bench_engines.__doc__)
+    engines.add_argument("directories", nargs="*", default=[sysconfig.get_paths()["stdlib"]], help=_DIRECTORIES)
+    engines.set_defaults(func=bench_engines)
+
+    prefetch = subparsers.add_parser("prefetch", help=bench_prefetch.__doc__)
+    prefetch.add_argument("directories", nargs="*", default=[sysconfig.get_paths()["stdlib"]], help=_DIRECTORIES)
+    prefetch.add_argument("--sizes", nargs="+", type=int, default=[0, 4, 16, 64], help="Prefetch sizes to compare.")
+    prefetch.add_argument("--warm", action="store_true", help="Do not evict files from the page cache between runs.")
+    prefetch.set_defaults(func=bench_prefetch)
+
+    bytecode = subparsers.add_parser("bytecode", help=bench_bytecode.__doc__)
+    bytecode.add_argument(
+        "directories",
+        nargs="*",
+        default=[sysconfig.get_paths()["purelib"]],
+        help="Directories containing the modules to parse. Default: the site-packages directory.",
+    )
+    bytecode.set_defaults(func=bench_bytecode)
+
+    finders = subparsers.add_parser("finders", help=bench_finders.__doc__)
+    finders.add_argument(
+        "packages",
+        nargs="*",
+        default=["IPython.core.magics", "mypy.plugins", "jedi.api", "pygments.lexers", "mkdocs.commands"],
+        help="Dotted names of installed packages to find. Default: some packages with heavy imports.",
+    )
+    finders.set_defaults(func=bench_finders)
+
+    memory = subparsers.add_parser("memory", help=bench_memory.__doc__)
+    memory.add_argument(
+        "packages",
+        nargs="*",
+        default=_PACKAGES,
+        help="Packages to analyze. Default: some big installed packages.",
+    )
+    memory.add_argument("--compact", action="store_true", help="Store dependencies in compact arrays.")
+    memory.set_defaults(func=bench_memory)
+
+    resolve = subparsers.add_parser("resolve", help=bench_resolve.__doc__)
+    resolve.add_argument("--width", type=int, default=2000, help="Number of modules per directory.")
+    resolve.set_defaults(func=bench_resolve)
+
+    graph = subparsers.add_parser("graph", help=bench_graph.__doc__)
+    graph.add_argument("--width", type=int, default=10000, help="Number of modules per directory.")
+    graph.set_defaults(func=bench_graph)
+
+    export = subparsers.add_parser("export", help=bench_export.__doc__)
+    export.add_argument(
+        "packages",
+        nargs="*",
+        default=_PACKAGES,
+        help="Packages to analyze. Default: some big installed packages.",
+    )
+    export.set_defaults(func=bench_export)
+
+    matrix = subparsers.add_parser("matrix", help=bench_matrix.__doc__)
+    matrix.add_argument(
+        "packages",
+        nargs="*",
+        default=_PACKAGES,
+        help="Packages to analyze. Default: some big installed packages.",
+    )
+    matrix.add_argument("--depths", nargs="+", type=int, default=[0, 1, 2, 3], help="Depths of the matrices.")
+    matrix.add_argument("--expand", nargs="*", default=[], help="Packages to expand in the matrix of depth 1.")
+    matrix.set_defaults(func=bench_matrix)
+
+    render = subparsers.add_parser("render", help=bench_render.__doc__)
+    render.add_argument(
+        "packages",
+        nargs="*",
+        default=_PACKAGES,
+        help="Packages to analyze. Default: some big installed packages.",
+    )
+    render.add_argument("--depth", type=int, default=0, help="Depth of the matrix.")
+    render.set_defaults(func=bench_render)
+
+    opts = parser.parse_args()
+    opts.func(opts)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,21 +12,45 @@ please refer to the README.md included in this package to get the link to the of
 
 from __future__ import annotations
 
+from dependenpy._internal.archives import ARCHIVE_SUFFIXES
+from dependenpy._internal.cache import ParseCache
 from dependenpy._internal.cli import get_parser, main
-from dependenpy._internal.dsm import DSM, Dependency, Module, Package
-from dependenpy._internal.finder import Finder, InstalledPackageFinder, LocalPackageFinder, PackageFinder, PackageSpec
+from dependenpy._internal.dsm import DSM, Dependency, DependencyView, Module, Package
+from dependenpy._internal.finder import (
+    ArchivePackageFinder,
+    Finder,
+    InstalledPackageFinder,
+    LocalPackageFinder,
+    PackageFinder,
+    PackageSpec,
+    PathIndex,
+)
 from dependenpy._internal.helpers import CSV, FORMAT, JSON, TEXT, PrintMixin, guess_depth
 from dependenpy._internal.node import LeafNode, NodeMixin, RootNode
+from dependenpy._internal.parsing import AST, BYTECODE, ENGINES, EXECUTORS, PROCESS, SCAN, SERIAL, THREAD
 from dependenpy._internal.plugins import InternalDependencies
-from dependenpy._internal.structures import Edge, Graph, Matrix, TreeMap, Vertex
+from dependenpy._internal.store import DependencyStore
+from dependenpy._internal.structures import Edge, Graph, Matrix, MatrixDiff, TreeMap, Vertex
 
 __all__: list[str] = [
+    "ARCHIVE_SUFFIXES",
+    "AST",
+    "BYTECODE",
     "CSV",
     "DSM",
+    "ENGINES",
+    "EXECUTORS",
     "FORMAT",
     "JSON",
+    "PROCESS",
+    "SCAN",
+    "SERIAL",
     "TEXT",
+    "THREAD",
+    "ArchivePackageFinder",
     "Dependency",
+    "DependencyStore",
+    "DependencyView",
     "Edge",
     "Finder",
     "Graph",
@@ -35,11 +59,14 @@ __all__: list[str] = [
     "LeafNode",
     "LocalPackageFinder",
     "Matrix",
+    "MatrixDiff",
     "Module",
     "NodeMixin",
     "Package",
     "PackageFinder",
     "PackageSpec",
+    "ParseCache",
+    "PathIndex",
     "PrintMixin",
     "RootNode",
     "TreeMap",
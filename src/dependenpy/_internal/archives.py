@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import os
+import re
+import tarfile
+import threading
+import zipfile
+from collections import OrderedDict
+
+ARCHIVE_SUFFIXES = (".whl", ".zip", ".pyz", ".egg", ".tar.gz", ".tgz", ".tar")
+"""Suffixes of the archives whose modules can be analyzed in place, without extracting them."""
+
+# An archive path, optionally followed by the path of a member inside it: `dist/pkg-1.0-py3-none-any.whl/pkg/api.py`.
+_ARCHIVE_PATH = re.compile(
+    r"(.+?(?:{suffixes}))(?:[/\\](.*))?$".format(suffixes="|".join(re.escape(suffix) for suffix in ARCHIVE_SUFFIXES)),
+    re.IGNORECASE,
+)
+
+
+class _ArchiveEntry:
+    """Entry of a directory inside an archive, with the same interface as `os.DirEntry`."""
+
+    def __init__(self, name: str, path: str, is_dir: bool) -> None:  # noqa: FBT001
+        self.name = name
+        self.path = path
+        self._is_dir = is_dir
+
+    def is_dir(self, *, follow_symlinks: bool = True) -> bool:  # noqa: ARG002
+        return self._is_dir
+
+    def is_file(self, *, follow_symlinks: bool = True) -> bool:  # noqa: ARG002
+        return not self._is_dir
+
+    def is_symlink(self) -> bool:
+        return False
+
+
+class _Archive:
+    """Index of the members of an archive, to list and read them in place.
+
+    Zip-based archives (wheels, zip applications, eggs) are indexed from their central directory,
+    and members are decompressed only when read. Tar archives cannot be read at random,
+    so the Python modules they contain are decompressed in a single pass when indexing them.
+    """
+
+    def __init__(self, path: str, stat: os.stat_result) -> None:
+        self.path = path
+        self.stamp = (stat.st_mtime_ns, stat.st_size)
+        # Names of the children of each directory (the root being ""), and whether they are directories.
+        self._children: dict[str, dict[str, bool]] = {"": {}}
+        self._sizes: dict[str, int] = {}
+        self._sources: dict[str, bytes] = {}
+        self._zip: zipfile.ZipFile | None = None
+        self._closed = False
+        if zipfile.is_zipfile(path):
+            self._zip = zipfile.ZipFile(path)
+            for info in self._zip.infolist():
+                if info.is_dir():
+                    self._add(info.filename.rstrip("/"), is_dir=True)
+                else:
+                    self._add(info.filename, is_dir=False)
+                    self._sizes[info.filename] = info.file_size
+        else:
+            with tarfile.open(path) as tar:
+                for member in tar:
+                    name = member.name.strip("/")
+                    if member.isdir():
+                        self._add(name, is_dir=True)
+                    elif member.isfile():
+                        self._add(name, is_dir=False)
+                        self._sizes[name] = member.size
+                        if name.endswith(".py"):
+                            self._sources[name] = tar.extractfile(member).read()  # type: ignore[union-attr]
+
+    def _add(self, name: str, *, is_dir: bool) -> None:
+        # Zip files do not always have entries for directories: they are deduced from the members' paths.
+        parent, _, base = name.rpartition("/")
+        if not base:
+            return
+        if parent not in self._children:
+            self._add(parent, is_dir=True)
+        self._children[parent][base] = is_dir or self._children[parent].get(base, False)
+        if is_dir:
+            self._children.setdefault(name, {})
+
+    def close(self) -> None:
+        # Members can still be read afterwards, the archive being opened again for each of them.
+        self._closed = True
+        if self._zip is not None:
+            self._zip.close()
+
+    def isdir(self, inner: str) -> bool:
+        return inner.strip("/") in self._children
+
+    def isfile(self, inner: str) -> bool:
+        return inner.strip("/") in self._sizes
+
+    def scandir(self, inner: str) -> list[_ArchiveEntry]:
+        inner = inner.strip("/")
+        if inner not in self._children:
+            raise FileNotFoundError(f"No such directory in {self.path}: {inner}")
+        prefix = f"{self.path}/{inner}/" if inner else f"{self.path}/"
+        return [_ArchiveEntry(name, prefix + name, is_dir) for name, is_dir in self._children[inner].items()]
+
+    def read(self, inner: str) -> bytes:
+        inner = inner.strip("/")
+        if inner in self._sources:
+            return self._sources[inner]
+        if self._zip is not None and inner in self._sizes:
+            if not self._closed:
+                try:
+                    return self._zip.read(inner)
+                except ValueError:
+                    # Closed by another thread in the meantime.
+                    pass
+            with zipfile.ZipFile(self.path) as zip_file:
+                return zip_file.read(inner)
+        raise FileNotFoundError(f"No such file in {self.path}: {inner}")
+
+    def stat(self, inner: str) -> tuple[int, int]:
+        # Members have no reliable modification time: the archive's one is used instead.
+        inner = inner.strip("/")
+        if inner not in self._sizes:
+            raise FileNotFoundError(f"No such file in {self.path}: {inner}")
+        return self.stamp[0], self._sizes[inner]
+
+
+# Archives recently opened by this process, re-indexed when they change on disk.
+# The least recently used ones are closed, so that long-lived processes do not keep
+# file descriptors and the sources of tar archives for every archive they ever read.
+_ARCHIVES: OrderedDict[str, _Archive] = OrderedDict()
+_ARCHIVES_LOCK = threading.Lock()
+_MAX_ARCHIVES = 16
+
+
+def _open_archive(path: str) -> _Archive | None:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    with _ARCHIVES_LOCK:
+        archive = _ARCHIVES.get(path)
+        if archive is not None and archive.stamp == (stat.st_mtime_ns, stat.st_size):
+            _ARCHIVES.move_to_end(path)
+            return archive
+        if archive is not None:
+            archive.close()
+            del _ARCHIVES[path]
+        try:
+            archive = _Archive(path, stat)
+        except (OSError, zipfile.BadZipFile, tarfile.TarError):
+            return None
+        _ARCHIVES[path] = archive
+        while len(_ARCHIVES) > _MAX_ARCHIVES:
+            _ARCHIVES.popitem(last=False)[1].close()
+    return archive
+
+
+def _archive_member(path: str) -> tuple[_Archive, str] | None:
+    # The archive containing the given path, and the path inside this archive.
+    match = _ARCHIVE_PATH.match(path)
+    if match is None:
+        return None
+    archive_path, inner = match.groups()
+    archive = _open_archive(archive_path)
+    if archive is None:
+        return None
+    return archive, (inner or "").replace("\\", "/")
+
+
+# The following functions first try the file system, and only look into archives when that fails,
+# so that regular files and directories cost nothing more.
+
+
+def _read_bytes(path: str) -> bytes:
+    try:
+        with open(path, "rb") as file:
+            return file.read()
+    except OSError:
+        member = _archive_member(path)
+        if member is None:
+            raise
+    archive, inner = member
+    return archive.read(inner)
+
+
+def _stat(path: str) -> tuple[int, int]:
+    # Modification time (in nanoseconds) and size of a file.
+    try:
+        stat = os.stat(path)
+    except OSError:
+        member = _archive_member(path)
+        if member is None:
+            raise
+    else:
+        return stat.st_mtime_ns, stat.st_size
+    archive, inner = member
+    return archive.stat(inner)
+
+
+def _isdir(path: str) -> bool:
+    if os.path.isdir(path):
+        return True
+    member = _archive_member(path)
+    return member is not None and member[0].isdir(member[1])
+
+
+def _isfile(path: str) -> bool:
+    if os.path.isfile(path):
+        return True
+    member = _archive_member(path)
+    return member is not None and bool(member[1]) and member[0].isfile(member[1])
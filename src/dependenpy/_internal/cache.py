@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from contextlib import suppress
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from dependenpy._internal.archives import _read_bytes, _stat
+
+if TYPE_CHECKING:
+    from dependenpy._internal.parsing import _RawImport
+
+# Bump when the format of entries or the extracted imports change.
+_CACHE_VERSION = 1
+
+# Minimum time between two automatic prunings of a cache directory, in seconds.
+_PRUNE_INTERVAL = 3600
+
+# (mtime_ns, size, digest) of a file, the stat part being taken before reading it.
+_Stamp = tuple[int, int, str]
+
+
+def _digest(source: bytes) -> str:
+    return hashlib.blake2b(source, digest_size=16).hexdigest()
+
+
+def _write_json(path: Path, data: Any) -> bool:
+    # Write to a temporary file in the same directory then atomically replace the file,
+    # so that concurrent readers never see a partially written file. False when it could not be written.
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            json.dump(data, file)
+        os.replace(tmp_path, path)
+    except OSError:
+        with suppress(OSError):
+            os.unlink(tmp_path)
+        return False
+    return True
+
+
+class ParseCache:
+    """On-disk cache of the imports found in modules.
+
+    Each module gets one small JSON entry, keyed by its absolute path,
+    that stores the raw imports found in the file together with
+    the file modification time, size and content hash. An entry is reused
+    when modification time and size are unchanged, or when the content hash
+    still matches (for example after a checkout that only touched timestamps).
+
+    Entries are written atomically, so several processes can safely share
+    the same cache directory.
+    """
+
+    def __init__(
+        self,
+        directory: str | os.PathLike,
+        max_age: float | None = None,
+        max_size: int | None = None,
+    ) -> None:
+        """Initialization method.
+
+        Parameters:
+            directory: Directory in which to store entries. Created if needed.
+            max_age: Entries not used for this many seconds are evicted by `prune`.
+            max_size: Oldest entries are evicted by `prune` until the cache weighs less than this many bytes.
+        """
+        self.directory: Path = Path(directory)
+        """Directory in which entries are stored."""
+        self.max_age: float | None = max_age
+        """Maximum age of entries, in seconds."""
+        self.max_size: int | None = max_size
+        """Maximum total size of entries, in bytes."""
+        self.hits: int = 0
+        """Number of lookups answered from the cache."""
+        self.misses: int = 0
+        """Number of lookups that required parsing the file."""
+        self._tag = f"{_CACHE_VERSION}-py{sys.version_info[0]}{sys.version_info[1]}"
+
+    def _entry_path(self, path: str, engine: str) -> Path:
+        # Engines are meant to find the same imports, but entries are still kept apart
+        # so that switching engines never serves results of the other one.
+        key = f"{self._tag}:{engine}:{os.path.abspath(path)}"
+        key = hashlib.sha1(key.encode(), usedforsecurity=False).hexdigest()
+        return self.directory / key[:2] / f"{key[2:]}.json"
+
+    def get(self, path: str, engine: str = "ast") -> list[_RawImport] | None:
+        """Return the cached imports of a file, if they are still valid.
+
+        Parameters:
+            path: Path to the module.
+            engine: Engine that found the imports.
+
+        Returns:
+            The raw imports, or None if the entry is missing or stale.
+        """
+        entry_path = self._entry_path(path, engine)
+        try:
+            with entry_path.open(encoding="utf-8") as file:
+                entry = json.load(file)
+            mtime_ns, size = _stat(path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        if entry.get("version") != self._tag or entry.get("path") != os.path.abspath(path):
+            self.misses += 1
+            return None
+        if entry["size"] != size:
+            self.misses += 1
+            return None
+        if entry["mtime_ns"] != mtime_ns:
+            try:
+                digest = _digest(_read_bytes(path))
+            except OSError:
+                self.misses += 1
+                return None
+            if digest != entry["hash"]:
+                self.misses += 1
+                return None
+            entry["mtime_ns"] = mtime_ns
+            _write_json(entry_path, entry)
+        elif self.max_age is not None:
+            self._touch(entry_path)
+        self.hits += 1
+        return [tuple(import_) for import_ in entry["imports"]]
+
+    def set(self, path: str, imports: list[_RawImport], stamp: _Stamp, engine: str = "ast") -> None:
+        """Store the imports of a file.
+
+        Parameters:
+            path: Path to the module.
+            imports: The raw imports found in the file.
+            stamp: Modification time (taken before reading the file), size and content hash of the file.
+            engine: Engine that found the imports.
+        """
+        mtime_ns, size, digest = stamp
+        entry = {
+            "version": self._tag,
+            "path": os.path.abspath(path),
+            "mtime_ns": mtime_ns,
+            "size": size,
+            "hash": digest,
+            "imports": imports,
+        }
+        _write_json(self._entry_path(path, engine), entry)
+
+    def prune(self) -> int:
+        """Evict entries that are too old, then the oldest entries until the cache is small enough.
+
+        Returns:
+            The number of evicted entries.
+        """
+        if self.max_age is None and self.max_size is None:
+            return 0
+        entries = []
+        for entry_path in self.directory.glob("*/*.json"):
+            try:
+                stat = entry_path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry_path))
+        entries.sort()
+        evicted = 0
+        total_size = sum(size for _, size, _ in entries)
+        oldest_allowed = time.time() - self.max_age if self.max_age is not None else None
+        for mtime, size, entry_path in entries:
+            too_old = oldest_allowed is not None and mtime < oldest_allowed
+            too_big = self.max_size is not None and total_size > self.max_size
+            if not (too_old or too_big):
+                break
+            try:
+                entry_path.unlink()
+            except OSError:
+                continue
+            total_size -= size
+            evicted += 1
+        return evicted
+
+    def _prune_if_due(self) -> int:
+        # Prune at most once per interval, as listing the whole directory would slow down warm runs
+        # and refreshes. The time of the last pruning is shared with other processes through a file.
+        if self.max_age is None and self.max_size is None:
+            return 0
+        stamp_path = self.directory / "last-prune"
+        with suppress(OSError):
+            if time.time() - stamp_path.stat().st_mtime < _PRUNE_INTERVAL:
+                return 0
+        evicted = self.prune()
+        with suppress(OSError):
+            self.directory.mkdir(parents=True, exist_ok=True)
+            stamp_path.touch()
+        return evicted
+
+    def _touch(self, entry_path: Path) -> None:
+        # Refresh the age of entries that are still in use, but not on every hit.
+        with suppress(OSError):
+            if time.time() - entry_path.stat().st_mtime > self.max_age / 2:  # type: ignore[operator]
+                os.utime(entry_path)
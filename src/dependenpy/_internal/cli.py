@@ -12,15 +12,23 @@
 from __future__ import annotations
 
 import argparse
+import os
+import posixpath
+import subprocess
 import sys
+import tempfile
+import time
 from contextlib import contextmanager
 from typing import TYPE_CHECKING, Any, TextIO
 
 from colorama import init
 
 from dependenpy._internal import debug
+from dependenpy._internal.cache import ParseCache
 from dependenpy._internal.dsm import DSM
 from dependenpy._internal.helpers import CSV, FORMAT, JSON, guess_depth
+from dependenpy._internal.parsing import AST, ENGINES, EXECUTORS
+from dependenpy._internal.structures import Matrix
 
 if TYPE_CHECKING:
     from collections.abc import Iterator, Sequence
@@ -63,6 +71,22 @@ def get_parser() -> argparse.ArgumentParser:
         dest="depth",
         help="Specify matrix or graph depth. Default: best guess.",
     )
+    parser.add_argument(
+        "--expand",
+        action="append",
+        default=[],
+        dest="expanded",
+        metavar="PACKAGE",
+        help="Show the contents of this package in the matrix, whatever the depth. Can be repeated.",
+    )
+    parser.add_argument(
+        "--collapse",
+        action="append",
+        default=[],
+        dest="collapsed",
+        metavar="PACKAGE",
+        help="Show this package as a single key in the matrix, whatever the depth. Can be repeated.",
+    )
     parser.add_argument(
         "-f",
         "--format",
@@ -105,6 +129,14 @@ def get_parser() -> argparse.ArgumentParser:
         "Text will always have new-lines. JSON can be minified with "
         "a negative value. Default: best guess.",
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        default=1,
+        type=int,
+        dest="jobs",
+        help="Number of parallel jobs used to read and parse modules. 0 means one job per CPU. Default: 1.",
+    )
     mxg.add_argument(
         "-l",
         "--show-dependencies-list",
@@ -151,6 +183,98 @@ def get_parser() -> argparse.ArgumentParser:
         default="0",
         help="Character to use for cells with value=0 (text matrix display only).",
     )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        dest="cache_dir",
+        help="Cache the imports found in modules in this directory, to skip parsing unchanged files "
+        "on the next runs. Default: no cache.",
+    )
+    parser.add_argument(
+        "--cache-max-age",
+        default=30,
+        type=float,
+        metavar="DAYS",
+        dest="cache_max_age",
+        help="Evict cached entries not used for this many days. 0 to keep them. Default: 30.",
+    )
+    parser.add_argument(
+        "--cache-max-size",
+        default=100,
+        type=float,
+        metavar="MB",
+        dest="cache_max_size",
+        help="Evict the oldest cached entries when the cache weighs more than this many megabytes. "
+        "0 for no limit. Default: 100.",
+    )
+    parser.add_argument(
+        "--executor",
+        choices=EXECUTORS,
+        default=None,
+        dest="executor",
+        help="How to run parallel jobs. Default: process when more than one job, serial otherwise.",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default=AST,
+        dest="engine",
+        help="How to find imports: ast parses the whole code, scan only tokenizes the lines "
+        "that contain imports (faster), bytecode reads them from up-to-date __pycache__ files "
+        "and parses the other modules (fastest on installed packages). Default: ast.",
+    )
+    parser.add_argument(
+        "--prefetch",
+        default=0,
+        type=int,
+        metavar="FILES",
+        dest="prefetch",
+        help="Read up to FILES files ahead in a few threads while parsing, to overlap reading and parsing "
+        "(serial mode only). Helps on cold caches and network file systems. Default: 0 (disabled).",
+    )
+    parser.add_argument(
+        "--sparse",
+        action="store_true",
+        default=False,
+        dest="sparse",
+        help="Print the matrix in JSON as a list of non-zero cells [row, column, count] instead of rows. "
+        "Default: false.",
+    )
+    parser.add_argument(
+        "--sequence",
+        action="store_true",
+        default=False,
+        dest="sequence",
+        help="Order the matrix keys in blocks of mutually dependent keys, each key after its dependencies "
+        "outside its block, instead of by name. Default: false.",
+    )
+    parser.add_argument(
+        "--cluster",
+        action="store_true",
+        default=False,
+        dest="cluster",
+        help="Like --sequence, and also order the keys within blocks to put most dependencies "
+        "below the diagonal. Default: false.",
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        default=False,
+        dest="compact",
+        help="Store dependencies in compact arrays instead of objects, to use less memory on big trees. "
+        "Default: false.",
+    )
+    parser.add_argument(
+        "--watch",
+        nargs="?",
+        const=1.0,
+        default=None,
+        type=float,
+        metavar="SECONDS",
+        dest="watch",
+        help="Keep running, and print the output again each time modules are changed, added or removed, "
+        "re-parsing only those. Files are checked every SECONDS (default: 1). Stop with Ctrl-C.",
+    )
 
     parser.add_argument("--debug-info", action=_DebugInfo, help="Print debug information.")
     return parser
@@ -180,6 +304,16 @@ def _get_depth(opts: argparse.Namespace, packages: Sequence[str]) -> int:
     return opts.depth or guess_depth(packages)
 
 
+def _get_cache(opts: argparse.Namespace) -> ParseCache | None:
+    if opts.cache_dir is None:
+        return None
+    return ParseCache(
+        opts.cache_dir,
+        max_age=opts.cache_max_age * 86400 or None,
+        max_size=int(opts.cache_max_size * 2**20) or None,
+    )
+
+
 def _get_packages(opts: argparse.Namespace) -> list[str]:
     packages = []
     for arg in opts.packages:
@@ -199,30 +333,206 @@ def _run(opts: argparse.Namespace, dsm: DSM) -> None:
         if opts.dependencies:
             dsm.print(format=opts.format, output=output, indent=indent)
         elif opts.matrix:
-            dsm.print_matrix(format=opts.format, output=output, depth=depth, indent=indent, zero=opts.zero)
+            dsm.print_matrix(
+                format=opts.format,
+                output=output,
+                depth=depth,
+                expanded=opts.expanded,
+                collapsed=opts.collapsed,
+                indent=indent,
+                zero=opts.zero,
+                sparse=opts.sparse,
+                sequence=opts.sequence,
+                cluster=opts.cluster,
+            )
         elif opts.treemap:
             dsm.print_treemap(format=opts.format, output=output)
         elif opts.graph:
             dsm.print_graph(format=opts.format, output=output, depth=depth, indent=indent)
 
 
+def _watch(opts: argparse.Namespace, dsm: DSM) -> None:
+    while True:
+        time.sleep(opts.watch)
+        start = time.perf_counter()
+        changes = dsm.refresh()
+        if not any(changes.values()):
+            continue
+        if opts.output is sys.stdout and sys.stdout.isatty():
+            # Clear the terminal and move the cursor home, to redraw in place.
+            print("\033[2J\033[H", end="")
+        _run(opts, dsm)
+        elapsed = time.perf_counter() - start
+        counts = ", ".join(f"{len(names)} {change}" for change, names in changes.items())
+        print(f"** dependenpy: Updated in {elapsed:.3f}s ({counts}).", file=sys.stderr)
+
+
+def _get_diff_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="dependenpy diff",
+        add_help=False,
+        description="Compare the matrices of packages between two snapshots or revisions: "
+        "print the added and removed keys, the added, removed and changed edges, and the new cycles.",
+    )
+    parser.add_argument(
+        "base",
+        metavar="BASE",
+        help="JSON output of a matrix (dependenpy -f json), or a git revision of the packages.",
+    )
+    parser.add_argument(
+        "head",
+        metavar="HEAD",
+        nargs="?",
+        default=None,
+        help="JSON output of a matrix, or a git revision of the packages. Default: the packages as they are on disk.",
+    )
+    parser.add_argument(
+        "-p",
+        "--packages",
+        nargs=argparse.ONE_OR_MORE,
+        default=[],
+        dest="packages",
+        help="Paths of the packages to analyze, required unless comparing two JSON outputs. "
+        "In revisions, they are read from the git repository of the current directory.",
+    )
+    parser.add_argument(
+        "-d",
+        "--depth",
+        default=None,
+        type=int,
+        dest="depth",
+        help="Specify matrix depth. Default: best guess.",
+    )
+    parser.add_argument(
+        "-f",
+        "--format",
+        choices=FORMAT,
+        default="text",
+        dest="format",
+        help="Output format. Default: text.",
+    )
+    parser.add_argument(
+        "-h",
+        "--help",
+        action="help",
+        default=argparse.SUPPRESS,
+        help="Show this help message and exit.",
+    )
+    parser.add_argument(
+        "-i",
+        "--indent",
+        default=None,
+        type=int,
+        dest="indent",
+        help="Specify output indentation. JSON can be minified with a negative value. Default: best guess.",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        action="store",
+        dest="output",
+        default=sys.stdout,
+        help="Output to given file. Default: stdout.",
+    )
+    return parser
+
+
+def _git_archive(revision: str, paths: list[str], directory: str) -> list[str]:
+    # Paths of the packages inside an archive of the given revision, that DSM reads in place.
+    # The repository is the one containing the first package, and members are relative to its root.
+    if revision.startswith("-"):
+        raise ValueError(f"Invalid revision: {revision}")
+    top_level = subprocess.run(
+        ["git", "rev-parse", "--show-toplevel"],  # noqa: S607
+        cwd=os.path.dirname(os.path.realpath(paths[0])),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.strip()
+    members = []
+    for path in paths:
+        member = os.path.relpath(os.path.realpath(path), top_level)
+        if member == os.pardir or member.startswith(os.pardir + os.sep) or os.path.isabs(member):
+            raise ValueError(f"{path} is outside the repository {top_level}")
+        members.append(posixpath.normpath(member.replace(os.sep, "/")))
+    archive = os.path.join(directory, "revision.tar")
+    subprocess.run(  # noqa: S603
+        ["git", "archive", "--format=tar", "-o", archive, revision, "--", *members],  # noqa: S607
+        cwd=top_level,
+        capture_output=True,
+        check=True,
+    )
+    return [f"{archive}/{member}" for member in members]
+
+
+def _diff_matrix(source: str | None, opts: argparse.Namespace, directory: str) -> Matrix:
+    # Matrix of a JSON output, of a revision, or of the packages on disk when no source is given.
+    if source is not None and source.endswith(".json") and os.path.isfile(source):
+        with open(source) as file:
+            return Matrix.from_json(file.read())
+    packages = opts.packages
+    if source is not None:
+        packages = _git_archive(source, packages, tempfile.mkdtemp(dir=directory))
+    dsm = DSM(*packages, build_tree=True, build_dependencies=True)
+    return dsm.as_matrix(depth=_get_depth(opts, packages=opts.packages))
+
+
+def _diff(args: list[str]) -> int:
+    parser = _get_diff_parser()
+    opts = parser.parse_args(args=args)
+    sources = (opts.base, opts.head)
+    if not opts.packages and not all(
+        source is not None and source.endswith(".json") and os.path.isfile(source) for source in sources
+    ):
+        parser.error("packages are required to compare revisions or packages on disk")
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            old, new = (_diff_matrix(source, opts, directory) for source in sources)
+    except subprocess.CalledProcessError as error:
+        print(f"dependenpy: {error.stderr.decode().strip()}", file=sys.stderr)
+        return 2
+    except (OSError, ValueError) as error:
+        print(f"dependenpy: {error}", file=sys.stderr)
+        return 2
+    with _open_if_str(opts.output) as output:
+        old.diff(new).print(format=opts.format, output=output, indent=_get_indent(opts))
+    return 0
+
+
 def main(args: list[str] | None = None) -> int:
     """Run the main program.
 
     This function is executed when you type `dependenpy` or `python -m dependenpy`.
 
+    `dependenpy diff` compares the matrices of two snapshots or revisions instead.
+
     Parameters:
         args: Arguments passed from the command line.
 
     Returns:
         An exit code. 0 (OK), 1 (dsm empty) or 2 (error).
     """
+    if args is None:
+        args = sys.argv[1:]
+    if args and args[0] == "diff":
+        return _diff(args[1:])
     parser = get_parser()
     opts = parser.parse_args(args=args)
     if not (opts.matrix or opts.dependencies or opts.treemap or opts.graph):
         opts.matrix = True
 
-    dsm = DSM(*_get_packages(opts), build_tree=True, build_dependencies=True, enforce_init=not opts.greedy)
+    dsm = DSM(
+        *_get_packages(opts),
+        build_tree=True,
+        build_dependencies=True,
+        enforce_init=not opts.greedy,
+        workers=opts.jobs,
+        executor=opts.executor,
+        cache=_get_cache(opts),
+        engine=opts.engine,
+        prefetch=opts.prefetch,
+        compact=opts.compact,
+    )
     if dsm.empty:
         return 1
 
@@ -231,6 +541,10 @@ def main(args: list[str] | None = None) -> int:
 
     try:
         _run(opts, dsm)
+        if opts.watch is not None:
+            _watch(opts, dsm)
+    except KeyboardInterrupt:
+        return 0
     except BrokenPipeError:
         # avoid traceback
         return 2
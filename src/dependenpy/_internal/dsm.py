@@ -9,20 +9,63 @@
 
 from __future__ import annotations
 
-import ast
-import json
+import os
 import sys
-from os import listdir
-from os.path import isdir, isfile, join, splitext
-from pathlib import Path
-from typing import TYPE_CHECKING, Any
+from collections.abc import Sequence
+from typing import TYPE_CHECKING, Any, overload
 
+from dependenpy._internal.archives import _archive_member, _isdir, _isfile, _stat
+from dependenpy._internal.cache import ParseCache
 from dependenpy._internal.finder import Finder, PackageSpec
-from dependenpy._internal.helpers import PrintMixin
+from dependenpy._internal.helpers import PrintMixin, _iter_json
 from dependenpy._internal.node import LeafNode, NodeMixin, RootNode
+from dependenpy._internal.parsing import (
+    _RECURSIVE_NODES,
+    AST,
+    _check_engine,
+    _get_executor,
+    _parse_paths,
+    _walk_imports,
+)
+from dependenpy._internal.store import DependencyStore
+from dependenpy._internal.structures import TreeMap
 
 if TYPE_CHECKING:
-    from collections.abc import Sequence
+    import ast
+    from collections.abc import Iterable, Iterator
+    from concurrent.futures import Executor
+
+    from dependenpy._internal.archives import _ArchiveEntry
+    from dependenpy._internal.parsing import _RawImport
+    from dependenpy._internal.store import _Row
+
+
+def _file_stamp(path: str) -> tuple[int, int] | None:
+    try:
+        return _stat(path)
+    except OSError:
+        return None
+
+
+def _has_prefix(name: str, prefixes: set[str]) -> bool:
+    # Whether one of the dotted prefixes of the name (or the name itself) is in the given set.
+    parts = name.split(".")
+    return any(".".join(parts[:index]) in prefixes for index in range(1, len(parts) + 1))
+
+
+def _descendants(node: DSM | Package | Module) -> Iterator[Package | Module]:
+    # Descendants of the node, without building the parts of the tree that are still pending.
+    if isinstance(node, RootNode):
+        yield from node._modules
+        for package in node._packages:
+            yield package
+            yield from _descendants(package)
+
+
+def _built_modules(node: DSM | Package | Module) -> list[Module]:
+    if isinstance(node, Module):
+        return [node]
+    return [descendant for descendant in _descendants(node) if isinstance(descendant, Module)]
 
 
 class DSM(RootNode, NodeMixin, PrintMixin):
@@ -40,6 +83,13 @@ class DSM(RootNode, NodeMixin, PrintMixin):
         build_tree: bool = True,
         build_dependencies: bool = True,
         enforce_init: bool = True,
+        workers: int | None = None,
+        executor: str | Executor | None = None,
+        cache: ParseCache | str | os.PathLike | None = None,
+        engine: str = AST,
+        lazy: bool = False,
+        prefetch: int = 0,
+        compact: bool = False,
     ):
         """Initialization method.
 
@@ -48,23 +98,50 @@ class DSM(RootNode, NodeMixin, PrintMixin):
             build_tree: Auto-build the tree or not.
             build_dependencies: Auto-build the dependencies or not.
             enforce_init: If True, only treat directories if they contain an `__init__.py` file.
+            workers: Number of workers used to read and parse modules. Zero or less means one per CPU.
+            executor: How to parse modules: `"serial"`, `"thread"`, `"process"`, or an executor instance.
+                Defaults to `"process"` when more than one worker is requested, `"serial"` otherwise.
+            cache: A parse cache, or the path to a directory in which to cache the imports found in modules.
+            engine: How to find imports in modules: `"ast"` parses the whole code,
+                `"scan"` only tokenizes the lines that contain imports, which is faster.
+            lazy: Only build the tree of packages and the dependencies of modules when they are first accessed,
+                so that queries on a small part of a big tree only read the directories and files they need.
+            prefetch: When parsing modules serially, number of files read ahead by a few threads,
+                so that reading files overlaps with parsing them. Zero disables prefetching.
+            compact: Store dependencies in a columnar store shared by all modules instead of `Dependency` objects,
+                which takes much less memory on big trees. Modules' dependencies are then read-only views
+                building `Dependency` objects on access.
         """
         self.base_packages: tuple[str, ...] = packages
         """Packages initially specified."""
-        self.finder: Finder = Finder()
-        """Finder instance for locating packages and modules."""
+        self.cache: ParseCache | None = cache if cache is None or isinstance(cache, ParseCache) else ParseCache(cache)
+        """Cache of the imports found in modules."""
+        self.finder: Finder = Finder(index=None if self.cache is None else self.cache.directory / "path-index.json")
+        """Finder instance for locating packages and modules. Its index of `sys.path` is saved in the cache."""
         self.specs: list[PackageSpec] = []
         """List of package specifications found."""
         self.not_found: list[str] = []
         """List of packages that were not found."""
         self.enforce_init: bool = enforce_init
         """Whether to enforce the presence of `__init__.py` files."""
+        self.workers: int | None = workers
+        """Number of workers used to read and parse modules."""
+        self.executor: str | Executor = _get_executor(executor, workers)
+        """Executor used to read and parse modules."""
+        self.engine: str = _check_engine(engine)
+        """Engine used to find imports in modules."""
+        self.lazy: bool = lazy
+        """Whether the tree and dependencies are built on first access."""
+        self.prefetch: int = prefetch
+        """Number of files read ahead while parsing modules serially."""
+        self.store: DependencyStore | None = DependencyStore() if compact else None
+        """Columnar store of the dependencies, in compact mode."""
 
         specs = []
         for package in packages:
-            spec = self.finder.find(package, enforce_init=enforce_init)
-            if spec:
-                specs.append(spec)
+            found = self.finder.find_all(package, enforce_init=enforce_init)
+            if found:
+                specs.extend(found)
             else:
                 self.not_found.append(package)
 
@@ -76,9 +153,12 @@ class DSM(RootNode, NodeMixin, PrintMixin):
         for module in self.not_found:
             print(f"** dependenpy: Not found: {module}.", file=sys.stderr)  # noqa: T201
 
-        super().__init__(build_tree)
+        self._lazy_dependencies = lazy and build_tree and build_dependencies
+        self._dependencies_built = False
+
+        super().__init__(build_tree, lazy)
 
-        if build_tree and build_dependencies:
+        if build_tree and build_dependencies and not lazy:
             self.build_dependencies()
 
     def __str__(self):
@@ -96,21 +176,152 @@ class DSM(RootNode, NodeMixin, PrintMixin):
 
     def build_tree(self) -> None:
         """Build the Python packages tree."""
+        self._build_tree_pending = False
         for spec in self.specs:
+            node: Module | Package
             if spec.ismodule:
-                self.modules.append(Module(spec.name, spec.path, dsm=self))
+                node = Module(spec.name, spec.path, dsm=self, lazy=self._lazy_dependencies)
+                self.modules.append(node)
             else:
-                self.packages.append(
-                    Package(
-                        spec.name,
-                        spec.path,
-                        dsm=self,
-                        limit_to=spec.limit_to,
-                        build_tree=True,
-                        build_dependencies=False,
-                        enforce_init=self.enforce_init,
-                    ),
+                node = Package(
+                    spec.name,
+                    spec.path,
+                    dsm=self,
+                    limit_to=spec.limit_to,
+                    build_tree=True,
+                    build_dependencies=self._lazy_dependencies,
+                    enforce_init=self.enforce_init,
+                    lazy=self.lazy,
                 )
+                self.packages.append(node)
+            self._register(node)
+
+    def build_dependencies(self) -> None:
+        """Build the dependencies for all sub-modules.
+
+        Files are read and parsed with the DSM executor, possibly in parallel.
+        Imports are then resolved in the main process, module by module,
+        so the result is the same whatever the executor.
+        """
+        self._dependencies_built = True
+        self._build_modules_dependencies(self.submodules)
+
+    def _build_modules_dependencies(self, modules: list[Module]) -> None:
+        # Files are stat'ed before being read, so that changes made meanwhile are seen by the next refresh.
+        stamps = [_file_stamp(module.path) for module in modules]
+        parsed = _parse_paths(
+            [module.path for module in modules],
+            executor=self.executor,
+            workers=self.workers,
+            cache=self.cache,
+            engine=self.engine,
+            prefetch=self.prefetch,
+        )
+        for module, stamp, raw_imports in zip(modules, stamps, parsed):
+            module.dependencies = []
+            module.build_dependencies(imports=module._absolute_imports(raw_imports))
+            module._stamp = stamp
+        if self.cache is not None:
+            self.cache._prune_if_due()
+
+    def refresh(self) -> dict[str, list[str]]:
+        """Update the tree and the dependencies after modules were changed, added or removed.
+
+        Modules are compared by modification time and size with what they were when last parsed.
+        Only changed and new modules are parsed again, and only the dependencies
+        whose target may have been added or removed are resolved again.
+        Cached lookups, matrices, graphs and treemaps are invalidated where needed.
+        In lazy mode, the parts of the tree that were not built yet are left untouched,
+        but the trees of added packages are built to list their modules, like in eager mode.
+        Modules of removed packages that were never built are not listed.
+
+        Returns:
+            The sorted absolute names of the `added`, `changed` and `removed` modules.
+        """
+        added: list[Module | Package] = []
+        removed: list[Module | Package] = []
+        if not self._build_tree_pending:
+            self._listings.clear()
+            self._refresh_tree(added, removed)
+        added_modules = [
+            module for node in added for module in ([node] if isinstance(node, Module) else node.submodules)
+        ]
+        removed_nodes = [descendant for node in removed for descendant in (node, *_descendants(node))]
+        names = {node.absolute_name() for node in added + removed}
+        for node in removed_nodes:
+            self._unregister(node)
+        self._invalidate_lookups(names)
+
+        new_modules = set(added_modules)
+        if self.store is not None:
+            for node in removed_nodes:
+                if isinstance(node, Module):
+                    self.store.release(node)
+        built = [
+            module
+            for module in _built_modules(self)
+            if module._recorded_imports() is not None and module not in new_modules
+        ]
+        changed = [module for module in built if _file_stamp(module.path) != module._stamp]
+        parsed = list(changed)
+        if self._dependencies_built:
+            # In lazy mode, new modules build their dependencies on first access instead.
+            parsed.extend(module for module in added_modules if not module._build_dependencies_pending)
+        if parsed:
+            self._build_modules_dependencies(parsed)
+        resolved = []
+        if names:
+            changed_modules = set(changed)
+            for module in built:
+                imports = module._recorded_imports() or []
+                if module not in changed_modules and any(_has_prefix(name, names) for name, _ in imports):
+                    module.dependencies = []
+                    module.build_dependencies(imports=[{"target": name, "lineno": lineno} for name, lineno in imports])
+                    resolved.append(module)
+
+        for node in parsed + resolved + added + removed:
+            self._invalidate_views(node)
+        return {
+            "added": sorted(module.absolute_name() for module in added_modules),
+            "changed": sorted(module.absolute_name() for module in changed),
+            "removed": sorted(node.absolute_name() for node in removed_nodes if node.ismodule),
+        }
+
+    def _refresh_tree(self, added: list[Module | Package], removed: list[Module | Package]) -> None:
+        # Top-level modules and packages come from the specifications: they can only disappear.
+        for module in self._modules:
+            if not _isfile(module.path):
+                removed.append(module)
+        for package in self._packages:
+            if _isdir(package.path):
+                package._refresh_tree(added, removed)
+            else:
+                removed.append(package)
+        self._modules = [module for module in self._modules if module not in removed]
+        self._packages = [package for package in self._packages if package not in removed]
+
+    def _invalidate_lookups(self, names: set[str]) -> None:
+        # Forget the lookups of names going through an added or removed node, on every node of the tree.
+        if not names:
+            return
+        packages = [node for node in _descendants(self) if isinstance(node, Package)]
+        for node in [self, *packages]:
+            prefix = node.absolute_name() + "." if isinstance(node, Package) else ""
+            for cache in (node._item_cache, node._target_cache):
+                for key in [key for key in cache if _has_prefix(prefix + key, names)]:
+                    del cache[key]
+
+    def _invalidate_views(self, node: Module | Package) -> None:
+        # Forget the matrices, graphs and treemaps of the node's ancestors, which include its dependencies.
+        ancestors: list[Package | DSM] = [self]
+        package = node.package
+        while package is not None:
+            ancestors.append(package)
+            package = package.package
+        for ancestor in ancestors:
+            ancestor._matrix_cache.clear()
+            ancestor._graph_cache.clear()
+            ancestor._treemap_cache = TreeMap()
 
 
 class Package(RootNode, LeafNode, NodeMixin, PrintMixin):
@@ -119,6 +330,18 @@ class Package(RootNode, LeafNode, NodeMixin, PrintMixin):
     This class represent Python packages as nodes in a tree.
     """
 
+    __slots__ = (
+        "_lazy_dependencies",
+        "_names_cache",
+        "dsm",
+        "enforce_init",
+        "lazy",
+        "limit_to",
+        "name",
+        "package",
+        "path",
+    )
+
     def __init__(
         self,
         name: str,
@@ -129,6 +352,7 @@ class Package(RootNode, LeafNode, NodeMixin, PrintMixin):
         build_tree: bool = True,  # noqa: FBT001,FBT002
         build_dependencies: bool = True,  # noqa: FBT001,FBT002
         enforce_init: bool = True,  # noqa: FBT001,FBT002
+        lazy: bool = False,  # noqa: FBT001,FBT002
     ):
         """Initialization method.
 
@@ -141,8 +365,9 @@ class Package(RootNode, LeafNode, NodeMixin, PrintMixin):
             build_tree: Auto-build the tree or not.
             build_dependencies: Auto-build the dependencies or not.
             enforce_init: If True, only treat directories if they contain an `__init__.py` file.
+            lazy: Only build the tree and the dependencies of modules when they are first accessed.
         """
-        self.name = name
+        self.name = sys.intern(name)
         """Name of the package."""
         self.path = path
         """Path to the package."""
@@ -154,11 +379,14 @@ class Package(RootNode, LeafNode, NodeMixin, PrintMixin):
         """List of strings to limit the recursive tree-building."""
         self.enforce_init = enforce_init
         """Whether to enforce the presence of `__init__.py` files."""
+        self.lazy = lazy
+        """Whether the tree and dependencies are built on first access."""
+        self._lazy_dependencies = lazy and build_tree and build_dependencies
 
-        RootNode.__init__(self, build_tree)
         LeafNode.__init__(self)
+        RootNode.__init__(self, build_tree, lazy)
 
-        if build_tree and build_dependencies:
+        if build_tree and build_dependencies and not lazy:
             self.build_dependencies()
 
     @property
@@ -206,28 +434,108 @@ class Package(RootNode, LeafNode, NodeMixin, PrintMixin):
         return heads, new_limit_to
 
     def build_tree(self) -> None:
-        """Build the tree for this package."""
-        for module in listdir(self.path):
-            abs_m = join(self.path, module)
-            if isfile(abs_m) and module.endswith(".py"):
-                name = splitext(module)[0]
+        """Build the tree for this package.
+
+        The directory is listed once, and the type of its entries is taken from the listing.
+        Sub-directories are listed to check for `__init__.py` files,
+        and this listing is then reused to build the sub-packages.
+        """
+        self._build_tree_pending = False
+        modules, packages = self._list_children()
+        self.modules.extend(self._new_module(name, path) for name, path in modules)
+        self.packages.extend(self._new_package(name, path) for name, path in packages)
+
+    def _list_children(self) -> tuple[list[tuple[str, str]], list[tuple[str, str]]]:
+        # Names and paths of the modules and packages currently found in the directory.
+        highest = self._highest()
+        entries = highest._listings.pop(self.path, None)
+        if entries is None:
+            entries = self._scandir(self.path)
+        heads, _ = self.split_limits_heads()
+        modules = []
+        packages = []
+        for entry in entries:
+            if entry.name.endswith(".py") and entry.is_file():
+                name = entry.name[:-3]
                 if not self.limit_to or name in self.limit_to:
-                    self.modules.append(Module(name, abs_m, self.dsm, self))
-            elif isdir(abs_m) and (isfile(join(abs_m, "__init__.py")) or not self.enforce_init):
-                heads, new_limit_to = self.split_limits_heads()
-                if not heads or module in heads:
-                    self.packages.append(
-                        Package(
-                            module,
-                            abs_m,
-                            self.dsm,
-                            self,
-                            new_limit_to,
-                            build_tree=True,
-                            build_dependencies=False,
-                            enforce_init=self.enforce_init,
-                        ),
-                    )
+                    modules.append((name, entry.path))
+            elif (not heads or entry.name in heads) and entry.is_dir():
+                if self.enforce_init:
+                    sub_entries = self._scandir(entry.path)
+                    if not any(sub_entry.name == "__init__.py" and sub_entry.is_file() for sub_entry in sub_entries):
+                        continue
+                    highest._listings[entry.path] = sub_entries
+                packages.append((entry.name, entry.path))
+        return modules, packages
+
+    def _highest(self) -> DSM | Package:
+        return self.dsm if self.dsm is not None else self.root
+
+    def _index_prefix(self) -> str:
+        return self.absolute_name() + "."
+
+    def _new_module(self, name: str, path: str) -> Module:
+        module = Module(name, path, self.dsm, self, lazy=self._lazy_dependencies)
+        self._register(module)
+        return module
+
+    def _new_package(self, name: str, path: str) -> Package:
+        _, new_limit_to = self.split_limits_heads()
+        package = Package(
+            name,
+            path,
+            self.dsm,
+            self,
+            new_limit_to,
+            build_tree=True,
+            build_dependencies=self._lazy_dependencies,
+            enforce_init=self.enforce_init,
+            lazy=self.lazy,
+        )
+        self._register(package)
+        return package
+
+    def _refresh_tree(self, added: list[Module | Package], removed: list[Module | Package]) -> None:
+        # Synchronize the children with the directory, keeping the nodes that still exist.
+        if self._build_tree_pending:
+            return
+        modules, packages = self._list_children()
+        old_modules = {module.name: module for module in self._modules}
+        self._modules = []
+        for name, path in modules:
+            module = old_modules.pop(name, None)
+            if module is None:
+                module = self._new_module(name, path)
+                added.append(module)
+            self._modules.append(module)
+        removed.extend(old_modules.values())
+        old_packages = {package.name: package for package in self._packages}
+        self._packages = []
+        for name, path in packages:
+            package = old_packages.pop(name, None)
+            if package is None:
+                package = self._new_package(name, path)
+                added.append(package)
+            else:
+                package._refresh_tree(added, removed)
+            self._packages.append(package)
+        removed.extend(old_packages.values())
+
+    def _scandir(self, path: str) -> list[os.DirEntry] | list[_ArchiveEntry]:
+        stats = self._highest().stats
+        try:
+            with os.scandir(path) as entries:
+                listing = list(entries)
+        except OSError:
+            # Directories inside archives are listed from the archive's index, without system calls.
+            member = _archive_member(path)
+            if member is None:
+                raise
+            return member[0].scandir(member[1])
+        stats["scandir"] += 1
+        # Types of entries come with the listing, except for symbolic links which must be followed.
+        stats["stat"] += sum(entry.is_symlink() for entry in listing)
+        return listing
 
     def cardinal(self, to: Package | Module) -> int:
         """Return the number of dependencies of this package to the given node.
@@ -247,10 +555,31 @@ class Module(LeafNode, NodeMixin, PrintMixin):
     This class represents a Python module (a Python file).
     """
 
-    RECURSIVE_NODES = (ast.ClassDef, ast.FunctionDef, ast.If, ast.IfExp, ast.Try, ast.With, ast.ExceptHandler)
+    __slots__ = (
+        "_build_dependencies_pending",
+        "_dependencies",
+        "_enter",
+        "_imports",
+        "_names_cache",
+        "_rows",
+        "_stamp",
+        "dsm",
+        "name",
+        "package",
+        "path",
+    )
+
+    RECURSIVE_NODES = _RECURSIVE_NODES
     """Nodes that can be recursive."""
 
-    def __init__(self, name: str, path: str, dsm: DSM | None = None, package: Package | None = None) -> None:
+    def __init__(
+        self,
+        name: str,
+        path: str,
+        dsm: DSM | None = None,
+        package: Package | None = None,
+        lazy: bool = False,  # noqa: FBT001,FBT002
+    ) -> None:
         """Initialization method.
 
         Parameters:
@@ -258,9 +587,10 @@ class Module(LeafNode, NodeMixin, PrintMixin):
             path: Path to the module.
             dsm: Parent DSM.
             package: Parent Package.
+            lazy: Build the dependencies of the module when they are first accessed.
         """
         super().__init__()
-        self.name = name
+        self.name = sys.intern(name)
         """Name of the module."""
         self.path = path
         """Path to the module."""
@@ -268,8 +598,12 @@ class Module(LeafNode, NodeMixin, PrintMixin):
         """Package to which the module belongs."""
         self.dsm = dsm
         """Parent DSM."""
-        self.dependencies: list[Dependency] = []
-        """List of dependencies."""
+        self._dependencies: list[Dependency] = []
+        self._build_dependencies_pending = lazy
+        self._imports: list[tuple[str, int]] | None = None
+        self._rows: tuple[int, int] | None = None
+        self._enter = -1
+        self._stamp: tuple[int, int] | None = None
 
     def __contains__(self, item: Package | Module) -> bool:
         """Whether given item is contained inside this module.
@@ -294,6 +628,57 @@ class Module(LeafNode, NodeMixin, PrintMixin):
         """
         return True
 
+    @property
+    def dependencies(self) -> Sequence[Dependency]:
+        """List of dependencies.
+
+        In lazy mode, the dependencies are built on first access.
+        In compact mode, this is a read-only view over the rows of the DSM's dependency store.
+        """
+        if self._build_dependencies_pending:
+            self.build_dependencies()
+        if self._rows is not None:
+            return DependencyView(self.dsm.store, self, *self._rows)  # type: ignore[union-attr,arg-type]
+        return self._dependencies
+
+    @dependencies.setter
+    def dependencies(self, dependencies: Sequence[Dependency]) -> None:
+        store = self._store()
+        if store is None:
+            self._dependencies = list(dependencies)
+            return
+        dependencies = list(dependencies)
+        store.release(self)
+        self._rows = (len(store), len(store))
+        for dep in dependencies:
+            if dep.external:
+                name = dep.target
+            else:
+                name = dep.target.absolute_name()  # type: ignore[union-attr]
+                if dep.what:
+                    name += "." + dep.what
+            store.add(self, dep.target, dep.lineno, dep.what, name)  # type: ignore[arg-type]
+
+    def _highest(self) -> DSM | Package:
+        return self.dsm if self.dsm is not None else self.root
+
+    def _store(self) -> DependencyStore | None:
+        return self.dsm.store if self.dsm is not None else None
+
+    def _dependency_rows(self) -> Iterator[_Row]:
+        # Dependencies as (target, line number, what) tuples, read from the store without building objects.
+        if self._build_dependencies_pending:
+            self.build_dependencies()
+        if self._rows is not None:
+            return self.dsm.store.rows(*self._rows)  # type: ignore[union-attr]
+        return ((dep.target, dep.lineno, dep.what) for dep in self._dependencies)
+
+    def _recorded_imports(self) -> list[tuple[str, int]] | None:
+        # Absolute names imported by the module, or None if its dependencies were not built.
+        if self._rows is not None:
+            return self.dsm.store.imports(*self._rows)  # type: ignore[union-attr]
+        return self._imports
+
     def as_dict(self, absolute: bool = False) -> dict:  # noqa: FBT001,FBT002
         """Return the dependencies as a dictionary.
 
@@ -309,56 +694,76 @@ class Module(LeafNode, NodeMixin, PrintMixin):
             "dependencies": [
                 {
                     # 'source': d.source.absolute_name(),  # redundant
-                    "target": dep.target if dep.external else dep.target.absolute_name(),  # type: ignore[union-attr]
-                    "lineno": dep.lineno,
-                    "what": dep.what,
-                    "external": dep.external,
+                    "target": target if isinstance(target, str) else target.absolute_name(),
+                    "lineno": lineno,
+                    "what": what,
+                    "external": isinstance(target, str),
                 }
-                for dep in self.dependencies
+                for target, lineno, what in self._dependency_rows()
             ],
         }
 
-    def _to_text(self, **kwargs: Any) -> str:
+    def _iter_text(self, **kwargs: Any) -> Iterator[str]:
         indent = kwargs.pop("indent", 2)
         base_indent = kwargs.pop("base_indent", None)
         if base_indent is None:
             base_indent = indent
             indent = 0
-        text = [" " * indent + self.name + "\n"]
         new_indent = indent + base_indent
+        text = [" " * indent + self.name + "\n"]
         for dep in self.dependencies:
             external = "! " if dep.external else ""
             text.append(" " * new_indent + external + str(dep) + "\n")
-        return "".join(text)
+        yield "".join(text)
 
-    def _to_csv(self, **kwargs: Any) -> str:
+    def _iter_csv(self, **kwargs: Any) -> Iterator[str]:
         header = kwargs.pop("header", True)
         text = ["module,path,target,lineno,what,external\n" if header else ""]
         name = self.absolute_name()
-        for dep in self.dependencies:
-            target = dep.target if dep.external else dep.target.absolute_name()  # type: ignore[union-attr]
-            text.append(f"{name},{self.path},{target},{dep.lineno},{dep.what or ''},{dep.external}\n")
-        return "".join(text)
+        for target, lineno, what in self._dependency_rows():
+            external = isinstance(target, str)
+            target_name = target if external else target.absolute_name()  # type: ignore[union-attr]
+            text.append(f"{name},{self.path},{target_name},{lineno},{what or ''},{external}\n")
+        yield "".join(text)
 
-    def _to_json(self, **kwargs: Any) -> str:
+    def _iter_json(self, **kwargs: Any) -> Iterator[str]:
         absolute = kwargs.pop("absolute", False)
-        return json.dumps(self.as_dict(absolute=absolute), **kwargs)
+        return _iter_json(self.as_dict(absolute=absolute), **kwargs)
 
-    def build_dependencies(self) -> None:
+    def build_dependencies(self, imports: list[dict] | None = None) -> None:
         """Build the dependencies for this module.
 
         Parse the code with ast, find all the import statements, convert
         them into Dependency objects.
+
+        Parameters:
+            imports: Already parsed import statements, as returned by `parse_code`.
+                If not given, the code is parsed.
         """
+        self._build_dependencies_pending = False
         highest = self.dsm or self.root
-        for import_ in self.parse_code():
-            target = highest.get_target(import_["target"])
+        if imports is None:
+            self._stamp = _file_stamp(self.path)
+            imports = self.parse_code()
+        # Absolute names are kept to resolve them again when nodes are added or removed, see `DSM.refresh`.
+        # In compact mode, they are stored with the dependencies.
+        store = self._store()
+        if store is None:
+            self._imports = [(import_["target"], import_["lineno"]) for import_ in imports]
+        elif self._rows is None:
+            self._rows = (len(store), len(store))
+        for import_ in imports:
+            name = import_["target"]
+            target = highest.get_target(name)
             if target:
-                what = import_["target"].split(".")[-1]
+                what = name.rsplit(".", 1)[-1]
                 if what != target.name:
-                    import_["what"] = what
+                    import_["what"] = sys.intern(what)
                 import_["target"] = target
-            self.dependencies.append(Dependency(source=self, **import_))
+            if store is None:
+                self._dependencies.append(Dependency(source=self, **import_))
+            else:
+                store.add(self, import_["target"], import_["lineno"], import_.get("what"), name)
 
     def parse_code(self) -> list[dict]:
         """Read the source code and return all the import statements.
@@ -366,16 +771,9 @@ class Module(LeafNode, NodeMixin, PrintMixin):
         Returns:
             The import statements.
         """
-        code = Path(self.path).read_text(encoding="utf-8")
-        try:
-            body = ast.parse(code).body
-        except SyntaxError:
-            code = code.encode("utf-8")  # type: ignore[assignment]
-            try:
-                body = ast.parse(code).body
-            except SyntaxError:
-                return []
-        return self.get_imports(body)
+        cache = self.dsm.cache if self.dsm else None
+        engine = self.dsm.engine if self.dsm else AST
+        return self._absolute_imports(_parse_paths([self.path], cache=cache, engine=engine)[0])
 
     def get_imports(self, ast_body: Sequence[ast.AST]) -> list[dict]:
         """Return all the import statements given an AST body (AST nodes).
@@ -386,20 +784,15 @@ class Module(LeafNode, NodeMixin, PrintMixin):
         Returns:
             The import statements.
         """
-        imports: list[dict] = []
-        for node in ast_body:
-            if isinstance(node, ast.Import):
-                imports.extend({"target": name.name, "lineno": node.lineno} for name in node.names)
-            elif isinstance(node, ast.ImportFrom):
-                for name in node.names:
-                    abs_name = self.absolute_name(self.depth - node.level) + "." if node.level > 0 else ""
-                    node_module = node.module + "." if node.module else ""
-                    name = abs_name + node_module + name.name  # type: ignore[assignment]  # noqa: PLW2901
-                    imports.append({"target": name, "lineno": node.lineno})
-            elif isinstance(node, Module.RECURSIVE_NODES):
-                imports.extend(self.get_imports(node.body))  # type: ignore[arg-type]
-                if isinstance(node, ast.Try):
-                    imports.extend(self.get_imports(node.finalbody))
+        return self._absolute_imports(_walk_imports(ast_body, Module.RECURSIVE_NODES))
+
+    def _absolute_imports(self, raw_imports: Iterable[_RawImport]) -> list[dict]:
+        imports = []
+        for name, level, lineno in raw_imports:
+            if level > 0:
+                name = self.absolute_name(self.depth - level) + "." + name  # noqa: PLW2901
+            # Names are interned: the same targets are imported by many modules.
+            imports.append({"target": sys.intern(name), "lineno": lineno})
         return imports
 
     def cardinal(self, to: Package | Module) -> int:
@@ -411,7 +804,7 @@ class Module(LeafNode, NodeMixin, PrintMixin):
         Returns:
             Number of dependencies.
         """
-        return len([dep for dep in self.dependencies if not dep.external and dep.target in to])  # type: ignore[operator]
+        return sum(1 for target, _, _ in self._dependency_rows() if not isinstance(target, str) and target in to)
 
 
 class Dependency:
@@ -420,6 +813,8 @@ class Dependency:
     Represent a dependency from a module to another.
     """
 
+    __slots__ = ("lineno", "source", "target", "what")
+
     def __init__(self, source: Module, lineno: int, target: str | Module | Package, what: str | None = None) -> None:
         """Initialization method.
 
@@ -451,3 +846,52 @@ class Dependency:
             Whether the dependency's target is a valid node.
         """
         return isinstance(self.target, str)
+
+
+class DependencyView(Sequence["Dependency"]):
+    """Read-only view over the dependencies of a module in a dependency store.
+
+    `Dependency` objects are built on access, and are not kept.
+    """
+
+    __slots__ = ("_module", "_start", "_stop", "_store")
+
+    def __init__(self, store: DependencyStore, module: Module, start: int, stop: int) -> None:
+        """Initialization method.
+
+        Parameters:
+            store: The dependency store.
+            module: The source module.
+            start: First row.
+            stop: Row after the last one.
+        """
+        self._store = store
+        self._module = module
+        self._start = start
+        self._stop = stop
+
+    def __len__(self) -> int:
+        return self._stop - self._start
+
+    @overload
+    def __getitem__(self, index: int) -> Dependency: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[Dependency]: ...
+
+    def __getitem__(self, index: int | slice) -> Dependency | list[Dependency]:
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        row = self._start + index
+        return next(self._dependencies(row, row + 1))
+
+    def __iter__(self) -> Iterator[Dependency]:
+        return self._dependencies(self._start, self._stop)
+
+    def _dependencies(self, start: int, stop: int) -> Iterator[Dependency]:
+        for target, lineno, what in self._store.rows(start, stop):
+            yield Dependency(self._module, lineno, target, what)
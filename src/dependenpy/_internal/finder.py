@@ -1,13 +1,27 @@
 from __future__ import annotations
 
-from importlib.util import find_spec
+import ast
+import json
+import os
+import sys
 from os.path import basename, exists, isdir, isfile, join, splitext
-from typing import Any
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from dependenpy._internal.archives import _archive_member, _isdir, _isfile
+from dependenpy._internal.cache import _write_json
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    from dependenpy._internal.archives import _ArchiveEntry
 
 
 class PackageSpec:
     """Holder for a package specification (given as argument to DSM)."""
 
+    __slots__ = ("limit_to", "name", "path")
+
     def __init__(self, name: str, path: str, limit_to: list[str] | None = None) -> None:
         """Initialization method.
 
@@ -83,6 +97,22 @@ class PackageFinder:
         """
         raise NotImplementedError
 
+    def find_all(self, package: str, **kwargs: Any) -> list[PackageSpec]:
+        """Find all the packages designated by the given argument.
+
+        A single argument can designate several packages, for example an archive
+        containing several top-level packages. By default, only `find` is used.
+
+        Parameters:
+            package: Package to find.
+            **kwargs: Additional keyword arguments.
+
+        Returns:
+            Package specs, possibly empty.
+        """
+        spec = self.find(package, **kwargs)
+        return [spec] if spec else []
+
 
 class LocalPackageFinder(PackageFinder):
     """Finder to find local packages (directories on the disk)."""
@@ -111,8 +141,263 @@ class LocalPackageFinder(PackageFinder):
         return None
 
 
+class ArchivePackageFinder(PackageFinder):
+    """Finder to find packages inside archives (wheels, zip files, sdists), without extracting them.
+
+    An archive path can be followed by the path of a package or module inside it,
+    for example `dist/pkg-1.0-py3-none-any.whl/pkg/api`.
+    """
+
+    def find(self, package: str, **kwargs: Any) -> PackageSpec | None:
+        """Find method.
+
+        Parameters:
+            package: Package to find.
+            **kwargs: Additional keyword arguments.
+
+        Returns:
+            Package spec or None.
+        """
+        member = _archive_member(package)
+        if member is None:
+            return None
+        archive, inner = member
+        inner = inner.strip("/")
+        if not inner:
+            specs = self.find_all(package, **kwargs)
+            return specs[0] if specs else None
+        enforce_init = kwargs.pop("enforce_init", True)
+        path = f"{archive.path}/{inner}"
+        if archive.isdir(inner):
+            if archive.isfile(f"{inner}/__init__.py") or not enforce_init:
+                return PackageSpec(basename(inner), path)
+        elif archive.isfile(inner) and inner.endswith(".py"):
+            return PackageSpec(splitext(basename(inner))[0], path)
+        return None
+
+    def find_all(self, package: str, **kwargs: Any) -> list[PackageSpec]:
+        """Find all the packages designated by the given argument.
+
+        A bare archive designates all its top-level packages and modules.
+        When there are none, like in source distributions, the archive's single
+        top-level directory and its `src` directory are searched as well.
+
+        Parameters:
+            package: Package to find.
+            **kwargs: Additional keyword arguments.
+
+        Returns:
+            Package specs, possibly empty.
+        """
+        member = _archive_member(package)
+        if member is None:
+            return []
+        archive, inner = member
+        if inner.strip("/"):
+            spec = self.find(package, **kwargs)
+            return [spec] if spec else []
+        enforce_init = kwargs.get("enforce_init", True)
+        directory = ""
+        while True:
+            entries = archive.scandir(directory)
+            specs = []
+            for entry in entries:
+                stem = entry.name[:-3] if entry.name.endswith(".py") else entry.name
+                # Metadata directories (`pkg-1.0.dist-info`) and data files are not importable.
+                if not stem.isidentifier():
+                    continue
+                if entry.is_dir():
+                    if not enforce_init or archive.isfile(f"{directory}/{entry.name}/__init__.py"):
+                        specs.append(PackageSpec(entry.name, entry.path))
+                elif entry.name.endswith(".py") and entry.name != "setup.py":
+                    specs.append(PackageSpec(stem, entry.path))
+            if specs:
+                return specs
+            directories = [entry.name for entry in entries if entry.is_dir()]
+            if "src" in directories:
+                directories = ["src"]
+            elif len(directories) != 1:
+                return []
+            directory = f"{directory}/{directories[0]}"
+
+
+def _has_submodule(location: str, name: str) -> bool:
+    # Whether a dotted submodule exists in a package, checked on disk only.
+    *packages, last = name.split(".")
+    for part in packages:
+        location = join(location, part)
+        if not _isdir(location):
+            return False
+    return _isdir(join(location, last)) or _isfile(join(location, f"{last}.py"))
+
+
+def _read_mapping(path: str) -> dict[str, str]:
+    # The `MAPPING` literal of a setuptools editable finder, read without executing the finder.
+    try:
+        with open(path, encoding="utf-8") as file:
+            tree = ast.parse(file.read())
+    except (OSError, UnicodeDecodeError, SyntaxError):
+        return {}
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(
+            isinstance(target, ast.Name) and target.id == "MAPPING" for target in node.targets
+        ):
+            try:
+                mapping = ast.literal_eval(node.value)
+            except ValueError:
+                return {}
+            if isinstance(mapping, dict):
+                return {str(name): str(location) for name, location in mapping.items()}
+    return {}
+
+
+def _read_pth(path: str) -> list[str]:
+    # Directories listed in a `.pth` file. Lines starting with `import` are never executed.
+    try:
+        with open(path, encoding="utf-8") as file:
+            lines = file.read().splitlines()
+    except (OSError, UnicodeDecodeError):
+        return []
+    return [line.strip() for line in lines if line.strip() and not line.startswith(("#", "import ", "import\t"))]
+
+
+# Bump when the format of the index changes.
+_INDEX_VERSION = 2
+
+
+class PathIndex:
+    """Index of the top-level packages and modules found in path entries.
+
+    Each path entry is listed once, and the names it contains are then looked up in memory,
+    so that finding many packages does not probe the file system for each of them.
+    The directories listed in `.pth` files and the packages mapped by setuptools editable finders
+    are recorded at the same time.
+
+    The index can be saved to a file and loaded by the next runs: it is keyed by
+    the path entries and the modification times of the entries and of their `.pth` and editable finder files,
+    and the entries that changed are listed again.
+    """
+
+    def __init__(self, file: str | os.PathLike | None = None) -> None:
+        """Initialization method.
+
+        Parameters:
+            file: File in which to save the index, and from which to load it. Default: the index is kept in memory.
+        """
+        self.file: Path | None = Path(file) if file is not None else None
+        """File in which the index is saved."""
+        self.scans: int = 0
+        """Number of path entries listed, because they were missing from the index or changed since."""
+        self._entries: dict[str, dict[str, Any]] = {}
+        self._checked: set[str] = set()
+        self._changed = False
+        self._tag = f"{_INDEX_VERSION}-py{sys.version_info[0]}{sys.version_info[1]}"
+        if self.file is not None:
+            try:
+                with self.file.open(encoding="utf-8") as file_:
+                    data = json.load(file_)
+            except (OSError, ValueError):
+                return
+            if isinstance(data, dict) and data.get("version") == self._tag:
+                self._entries = data["entries"]
+
+    def entry(self, path: str) -> dict[str, Any]:
+        """Return the index of a path entry, listing the entry if needed.
+
+        The modification time of an entry is checked once per index.
+
+        Parameters:
+            path: Path entry.
+
+        Returns:
+            The modification time of the entry, its names (with whether they are directories,
+            whether they are modules, and whether they are regular packages), the directories
+            listed in its `.pth` files, the packages mapped by its editable finders,
+            and the modification times of these files.
+        """
+        entry = self._entries.get(path)
+        if path not in self._checked:
+            self._checked.add(path)
+            mtime_ns = _mtime_ns(path)
+            # Editing a `.pth` or finder file does not change the modification time of its directory.
+            if (
+                entry is None
+                or entry["mtime_ns"] != mtime_ns
+                or any(_mtime_ns(file) != file_mtime_ns for file, file_mtime_ns in entry["files"].items())
+            ):
+                entry = self._scan(path, mtime_ns)
+                self._entries[path] = entry
+                self._changed = True
+        return entry  # type: ignore[return-value]
+
+    def _scan(self, path: str, mtime_ns: int | None) -> dict[str, Any]:
+        self.scans += 1
+        entry: dict[str, Any] = {"mtime_ns": mtime_ns, "names": {}, "directories": [], "mapping": {}, "files": {}}
+        if mtime_ns is None:
+            return entry
+        try:
+            with os.scandir(path) as scanned:
+                listing: Sequence[os.DirEntry | _ArchiveEntry] = list(scanned)
+        except OSError:
+            member = _archive_member(path)
+            if member is None:
+                return entry
+            listing = member[0].scandir(member[1])
+        names = entry["names"]
+        for dir_entry in sorted(listing, key=lambda dir_entry: dir_entry.name):
+            name = dir_entry.name
+            if name.isidentifier() and dir_entry.is_dir():
+                kinds = names.setdefault(name, [False, False, False])
+                kinds[0] = True
+                kinds[2] = _isfile(join(dir_entry.path, "__init__.py"))
+            elif name.endswith(".py") and name[:-3].isidentifier():
+                names.setdefault(name[:-3], [False, False, False])[1] = True
+                if name.startswith("__editable__") and name.endswith("_finder.py"):
+                    entry["mapping"].update(_read_mapping(dir_entry.path))
+                    entry["files"][dir_entry.path] = _mtime_ns(dir_entry.path)
+            elif name.endswith(".pth"):
+                entry["directories"].extend(join(path, directory) for directory in _read_pth(dir_entry.path))
+                entry["files"][dir_entry.path] = _mtime_ns(dir_entry.path)
+        return entry
+
+    def save(self) -> None:
+        """Save the index to its file, if it changed."""
+        if self.file is None or not self._changed:
+            return
+        if _write_json(self.file, {"version": self._tag, "entries": self._entries}):
+            self._changed = False
+
+
+def _mtime_ns(path: str) -> int | None:
+    # Modification time of a path entry, directory or archive, or None if it does not exist.
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        member = _archive_member(path)
+        return None if member is None else member[0].stamp[0]
+
+
 class InstalledPackageFinder(PackageFinder):
-    """Finder to find installed Python packages using importlib."""
+    """Finder to find installed Python packages by searching `sys.path` entries on disk.
+
+    Packages are never imported, so finding `django.contrib` does not run Django's `__init__` module.
+    Path entries are searched like the import system does: regular packages and modules
+    take precedence over namespace packages. Packages installed in editable mode
+    (directories listed in `.pth` files, setuptools editable finders) are searched last.
+    Extension and built-in modules are not found, as they cannot be analyzed.
+    """
+
+    def __init__(self, path: list[str] | None = None, index: PathIndex | None = None) -> None:
+        """Initialization method.
+
+        Parameters:
+            path: Path entries to search. Default: `sys.path` at the time of the search.
+            index: Index of the path entries. Default: a new index, kept in memory.
+        """
+        self.path = path
+        """Path entries to search, or None to search `sys.path`."""
+        self.index: PathIndex = index if index is not None else PathIndex()
+        """Index of the path entries."""
 
     def find(self, package: str, **kwargs: Any) -> PackageSpec | None:  # noqa: ARG002
         """Find method.
@@ -124,24 +409,48 @@ class InstalledPackageFinder(PackageFinder):
         Returns:
             Package spec or None.
         """
-        spec = find_spec(package)
-        if spec is None:
+        name, _, rest = package.partition(".")
+        if not name.isidentifier():
             return None
-        if "." in package:
-            package, rest = package.split(".", 1)
-            limit = [rest]
-            spec = find_spec(package)
-        else:
-            limit = []
-        if spec is not None:
-            if spec.submodule_search_locations:
-                path = spec.submodule_search_locations[0]
-            elif spec.origin and spec.origin != "built-in":
-                path = spec.origin
-            else:
-                return None
-            return PackageSpec(spec.name, path, limit)
-        return None
+        location = self._find_location(name)
+        self.index.save()
+        if location is None or (rest and not _has_submodule(location, rest)):
+            return None
+        return PackageSpec(name, location, [rest] if rest else [])
+
+    def _locate(self, entry: str, name: str) -> tuple[str, bool] | None:
+        # Location of a top-level package or module in a path entry, and whether it is a namespace package.
+        kinds = self.index.entry(entry)["names"].get(name)
+        if kinds is None:
+            return None
+        _, is_module, is_package = kinds
+        directory = join(entry, name)
+        if is_package:
+            return directory, False
+        if is_module:
+            return f"{directory}.py", False
+        return directory, True
+
+    def _find_location(self, name: str) -> str | None:
+        entries = [entry or os.getcwd() for entry in (sys.path if self.path is None else self.path)]
+        namespace = None
+        for entry in entries:
+            found = self._locate(entry, name)
+            if found is not None:
+                location, is_namespace = found
+                if not is_namespace:
+                    return location
+                namespace = namespace or location
+        for entry in entries:
+            location = self.index.entry(entry)["mapping"].get(name)
+            if location is not None and (_isdir(location) or _isfile(location)):
+                return location
+        for entry in entries:
+            for directory in self.index.entry(entry)["directories"]:
+                found = self._locate(directory, name)
+                if found is not None and not found[1]:
+                    return found[0]
+        return namespace
 
 
 class Finder:
@@ -150,20 +459,24 @@ class Finder:
     Initialize it with a list of package finder classes (not instances).
     """
 
-    def __init__(self, finders: list[type] | None = None):
+    def __init__(self, finders: list[type[PackageFinder]] | None = None, index: str | os.PathLike | None = None):
         """Initialization method.
 
         Parameters:
             finders: list of package finder classes (not instances) in a specific
-                order. Default: [LocalPackageFinder, InstalledPackageFinder].
+                order. Default: [LocalPackageFinder, ArchivePackageFinder, InstalledPackageFinder].
+            index: File in which to save the index of the path entries searched by installed package finders,
+                so that the next runs can reuse it. Default: the index is kept in memory.
         """
         self.finders: list[PackageFinder]
         """Selected finders."""
+        self.index: PathIndex = PathIndex(index)
+        """Index of the path entries, shared by the installed package finders."""
         if finders is None:
-            finder_instances = [LocalPackageFinder(), InstalledPackageFinder()]
-        else:
-            finder_instances = [finder() for finder in finders]
-        self.finders = finder_instances
+            finders = [LocalPackageFinder, ArchivePackageFinder, InstalledPackageFinder]
+        self.finders = [
+            finder(index=self.index) if issubclass(finder, InstalledPackageFinder) else finder() for finder in finders
+        ]
 
     def find(self, package: str, **kwargs: Any) -> PackageSpec | None:
         """Find a package using package finders.
@@ -182,3 +495,21 @@ class Finder:
             if package_spec:
                 return package_spec
         return None
+
+    def find_all(self, package: str, **kwargs: Any) -> list[PackageSpec]:
+        """Find all the packages designated by the given argument, using package finders.
+
+        Return the packages found by the first finder finding any.
+
+        Parameters:
+            package: package to find.
+            **kwargs: additional keyword arguments used by finders.
+
+        Returns:
+            Package specs, possibly empty.
+        """
+        for finder in self.finders:
+            package_specs = finder.find_all(package, **kwargs)
+            if package_specs:
+                return package_specs
+        return []
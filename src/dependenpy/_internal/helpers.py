@@ -1,10 +1,11 @@
 from __future__ import annotations
 
+import json
 import sys
 from typing import IO, TYPE_CHECKING, Any
 
 if TYPE_CHECKING:
-    from collections.abc import Sequence
+    from collections.abc import Iterable, Iterator, Sequence
 
 
 CSV = "csv"
@@ -16,13 +17,91 @@ TEXT = "text"
 FORMAT = (CSV, JSON, TEXT)
 """Supported output formats."""
 
+# Size from which rendered chunks are written to the output.
+_BUFFER_SIZE = 1 << 16
+
+
+class _Stream(list):
+    """List whose items are produced while iterating on it, so that JSON encoders write them one at a time.
+
+    Encoders check whether lists are empty before iterating: the number of items must be given.
+    """
+
+    def __init__(self, items: Iterable[Any], length: int) -> None:
+        super().__init__()
+        self._items = items
+        self._length = length
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._items)
+
+    def __len__(self) -> int:
+        return self._length
+
+
+def _iter_json(obj: Any, **kwargs: Any) -> Iterator[str]:
+    # Same output as `json.dumps(obj, **kwargs)`, in chunks: the items of `_Stream` lists are encoded one at a time.
+    cls = kwargs.pop("cls", None) or json.JSONEncoder
+    encoder = cls(**kwargs)
+    indent = " " * encoder.indent if isinstance(encoder.indent, int) else encoder.indent
+    return _iter_encoded(obj, encoder, indent, 0)
+
+
+def _has_stream(value: Any) -> bool:
+    return isinstance(value, _Stream) or (isinstance(value, dict) and any(map(_has_stream, value.values())))
+
+
+def _iter_encoded(obj: Any, encoder: json.JSONEncoder, indent: str | None, level: int) -> Iterator[str]:
+    # The structure of `_Stream` lists and of the dictionaries containing them is written here,
+    # and the other values are encoded whole with the (accelerated) encoder, then indented at their level.
+    if not _has_stream(obj):
+        text = encoder.encode(obj)
+        # Encoded strings never contain line breaks, which are escaped: only the encoder's ones are indented.
+        yield text.replace("\n", "\n" + indent * level) if indent else text
+        return
+    is_dict = isinstance(obj, dict)
+    opening, closing = ("{", "}") if is_dict else ("[", "]")
+    if not len(obj):
+        yield opening + closing
+        return
+    items = (sorted(obj.items()) if encoder.sort_keys else obj.items()) if is_dict else obj
+    newline = "" if indent is None else "\n" + indent * (level + 1)
+    separator = opening + newline
+    for item in items:
+        yield separator
+        if is_dict:
+            key, item = item  # noqa: PLW2901
+            yield encoder.encode(key) + encoder.key_separator
+        yield from _iter_encoded(item, encoder, indent, level + 1)
+        separator = encoder.item_separator + newline
+    yield ("" if indent is None else "\n" + indent * level) + closing
+
+
+def _write(chunks: Iterable[str], output: IO) -> None:
+    # Chunks are written by batches: the output starts early and is never held whole in memory.
+    batch: list[str] = []
+    size = 0
+    for chunk in chunks:
+        batch.append(chunk)
+        size += len(chunk)
+        if size >= _BUFFER_SIZE:
+            output.write("".join(batch))
+            batch.clear()
+            size = 0
+    batch.append("\n")
+    output.write("".join(batch))
+
 
 class PrintMixin:
     """Print mixin class."""
 
+    __slots__ = ()
+
     def print(self, format: str | None = TEXT, output: IO = sys.stdout, **kwargs: Any) -> None:  # noqa: A002
         """Print the object in a file or on standard output by default.
 
+        The output is written while it is rendered, by batches.
+
         Parameters:
             format: Output format (csv, json or text).
             output: Descriptor to an opened file (default to standard output).
@@ -35,19 +114,28 @@ class PrintMixin:
             kwargs.pop("zero", "")
 
         if format == TEXT:
-            print(self._to_text(**kwargs), file=output)
+            _write(self._iter_text(**kwargs), output)
         elif format == CSV:
-            print(self._to_csv(**kwargs), file=output)
+            _write(self._iter_csv(**kwargs), output)
         elif format == JSON:
-            print(self._to_json(**kwargs), file=output)
+            _write(self._iter_json(**kwargs), output)
 
     def _to_text(self, **kwargs: Any) -> str:
-        raise NotImplementedError
+        return "".join(self._iter_text(**kwargs))
 
     def _to_csv(self, **kwargs: Any) -> str:
-        raise NotImplementedError
+        return "".join(self._iter_csv(**kwargs))
 
     def _to_json(self, **kwargs: Any) -> str:
+        return "".join(self._iter_json(**kwargs))
+
+    def _iter_text(self, **kwargs: Any) -> Iterator[str]:
+        raise NotImplementedError
+
+    def _iter_csv(self, **kwargs: Any) -> Iterator[str]:
+        raise NotImplementedError
+
+    def _iter_json(self, **kwargs: Any) -> Iterator[str]:
         raise NotImplementedError
 
 
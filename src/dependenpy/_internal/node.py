@@ -1,18 +1,31 @@
 from __future__ import annotations
 
-import json
 import sys
+from collections import Counter
 from typing import IO, TYPE_CHECKING, Any
 
-from dependenpy._internal.structures import Graph, Matrix, TreeMap
+from dependenpy._internal.helpers import _iter_json, _Stream
+from dependenpy._internal.structures import Graph, Matrix, MatrixDiff, TreeMap
 
 if TYPE_CHECKING:
-    from dependenpy._internal.dsm import Module, Package
+    import os
+    from collections.abc import Iterable, Iterator
+
+    from dependenpy._internal.archives import _ArchiveEntry
+    from dependenpy._internal.dsm import DSM, Module, Package
+
+
+def _index_key(node: Module | Package) -> str:
+    # Packages are indexed with a trailing dot, so that a module and a package can have the same name.
+    name = node.absolute_name()
+    return name + "." if node.ispackage else name
 
 
 class NodeMixin:
     """Shared code between DSM, Package and Module."""
 
+    __slots__ = ()
+
     @property
     def ismodule(self) -> bool:
         """Property to check if object is instance of Module.
@@ -44,28 +57,84 @@ class NodeMixin:
 class RootNode:
     """Shared code between DSM and Package."""
 
-    def __init__(self, build_tree: bool = True):  # noqa: FBT001,FBT002
+    # Big trees hold many nodes: their attributes are stored in slots rather than in a dictionary per instance.
+    __slots__ = (
+        "_build_tree_pending",
+        "_enter",
+        "_exit",
+        "_graph_cache",
+        "_index",
+        "_item_cache",
+        "_listings",
+        "_matrix_cache",
+        "_modules",
+        "_numbered",
+        "_packages",
+        "_target_cache",
+        "_treemap_cache",
+        "stats",
+    )
+
+    def __init__(self, build_tree: bool = True, lazy: bool = False):  # noqa: FBT001,FBT002
         """Initialization method.
 
         Parameters:
-            build_tree: Whether to immediately build the tree or not.
+            build_tree: Whether to build the tree or not.
+            lazy: Whether to delay building the tree until modules or packages are first accessed.
         """
         self._target_cache: dict[str, Any] = {}
         self._item_cache: dict[str, Any] = {}
-        self._contains_cache: dict[Package | Module, bool] = {}
-        self._matrix_cache: dict[int, Matrix] = {}
+        self._matrix_cache: dict[tuple[int, frozenset[str], frozenset[str]], Matrix] = {}
         self._graph_cache: dict[int, Graph] = {}
         self._treemap_cache = TreeMap()
-        self.modules: list[Module] = []
-        """List of modules contained in the node."""
-        self.packages: list[Package] = []
-        """List of packages contained in the node."""
+        self._listings: dict[str, list[os.DirEntry] | list[_ArchiveEntry]] = {}
+        self.stats: Counter[str] = Counter()
+        """Counters of the system calls made to build the tree (`scandir`, `stat`), kept on the highest node."""
+        self._modules: list[Module] = []
+        self._packages: list[Package] = []
+        self._build_tree_pending = build_tree and lazy
+        self._index: dict[str, Module | Package] | None = None
+        # Pre-order numbers of the node and of its last descendant, see `__contains__`.
+        self._enter = -1
+        self._exit = -1
+        self._numbered = False
+
+        if build_tree and not lazy:
+            self.build_tree()
+
+    @property
+    def modules(self) -> list[Module]:
+        """List of modules contained in the node.
 
-        if build_tree:
+        In lazy mode, the tree of the node is built on first access.
+        """
+        if self._build_tree_pending:
             self.build_tree()
+        return self._modules
+
+    @modules.setter
+    def modules(self, modules: list[Module]) -> None:
+        self._modules = modules
+
+    @property
+    def packages(self) -> list[Package]:
+        """List of packages contained in the node.
+
+        In lazy mode, the tree of the node is built on first access.
+        """
+        if self._build_tree_pending:
+            self.build_tree()
+        return self._packages
+
+    @packages.setter
+    def packages(self, packages: list[Package]) -> None:
+        self._packages = packages
 
     def __contains__(self, item: Package | Module) -> bool:
-        """Get result of _contains, cache it and return it.
+        """Whether given item is this node, or one of its descendants.
+
+        The tree is numbered in pre-order when first needed, and again after it changed:
+        the descendants of a node are the nodes numbered between the node and its last descendant.
 
         Parameters:
             item: A package or module.
@@ -73,9 +142,15 @@ class RootNode:
         Returns:
             True if self contains item, False otherwise.
         """
-        if item not in self._contains_cache:
-            self._contains_cache[item] = self._contains(item)
-        return self._contains_cache[item]
+        if self is item:
+            return True
+        highest = self._highest()
+        if item is highest or item._highest() is not highest:
+            return False
+        if not highest._numbered:
+            highest._number_tree(0)
+            highest._numbered = True
+        return self._enter < item._enter <= self._exit
 
     def __getitem__(self, item: str) -> Package | Module:
         """Return the corresponding Package or Module object.
@@ -89,19 +164,34 @@ class RootNode:
         Returns:
             The corresponding object.
         """
-        depth = item.count(".") + 1
-        parts = item.split(".", 1)
-        for module in self.modules:
-            if parts[0] == module.name and depth == 1:
-                return module
-        for package in self.packages:
-            if parts[0] == package.name:
-                if depth == 1:
-                    return package
-                obj = package.get(parts[1])
-                if obj:
-                    return obj
-        raise KeyError(item)
+        index = self._tree_index()
+        prefix = self._index_prefix()
+        obj = index.get(prefix + item)
+        if obj is None:
+            obj = index.get(prefix + item + ".")
+        if obj is not None:
+            return obj
+        # The node may be in a part of the tree that is not built yet.
+        *packages, last = item.split(".")
+        node: RootNode = self
+        name = prefix
+        for part in packages:
+            if node._build_tree_pending:
+                node.build_tree()
+            name += part + "."
+            package = index.get(name)
+            if package is None:
+                raise KeyError(item)
+            node = package  # type: ignore[assignment]
+        if node._build_tree_pending:
+            node.build_tree()
+        name += last
+        obj = index.get(name)
+        if obj is None:
+            obj = index.get(name + ".")
+            if obj is None:
+                raise KeyError(item)
+        return obj
 
     def __bool__(self) -> bool:
         """Node as Boolean.
@@ -137,21 +227,43 @@ class RootNode:
         """To be overridden."""
         raise NotImplementedError
 
-    def _contains(self, item: Package | Module) -> bool:
-        """Whether given item is contained inside the node modules/packages.
-
-        Parameters:
-            item: A package or module.
-
-        Returns:
-            True if self is item or item in self's packages/modules.
-        """
-        if self is item:
-            return True
-        for module in self.modules:
-            if item in module:
-                return True
-        return any(item in package for package in self.packages)
+    def _highest(self) -> DSM | Package:
+        # The node holding what is shared by the whole tree: the DSM, or the root package.
+        return self  # type: ignore[return-value]
+
+    def _index_prefix(self) -> str:
+        # Prefix of the absolute names of the node's children.
+        return ""
+
+    def _tree_index(self) -> dict[str, Module | Package]:
+        # Modules and packages of the whole tree, by absolute name, filled while building the tree.
+        highest = self._highest()
+        if highest._index is None:
+            highest._index = {}
+        return highest._index
+
+    def _register(self, node: Module | Package) -> None:
+        self._tree_index()[_index_key(node)] = node
+        self._highest()._numbered = False
+
+    def _unregister(self, node: Module | Package) -> None:
+        index = self._tree_index()
+        key = _index_key(node)
+        if index.get(key) is node:
+            del index[key]
+        self._highest()._numbered = False
+        node._enter = -1
+
+    def _number_tree(self, number: int) -> int:
+        # Number the built part of the tree in pre-order, and return the number of the last descendant.
+        self._enter = number
+        for module in self._modules:
+            number += 1
+            module._enter = number
+        for package in self._packages:
+            number = package._number_tree(number + 1)
+        self._exit = number
+        return number
 
     def get(self, item: str) -> Package | Module:
         """Get item through `__getitem__` and cache the result.
@@ -192,27 +304,37 @@ class RootNode:
         Returns:
             Package containing target or corresponding module.
         """
-        depth = target.count(".") + 1
-        parts = target.split(".", 1)
-        for module in self.modules:
-            if parts[0] == module.name and depth < 3:  # noqa: PLR2004
+        # Each part of the name is looked up in the index of the tree, instead of in the lists of children.
+        index = self._tree_index()
+        parts = target.split(".")
+        depth = len(parts)
+        node: RootNode = self
+        name = self._index_prefix()
+        fallback = None
+        for position, part in enumerate(parts):
+            remaining = depth - position
+            if node._build_tree_pending:
+                node.build_tree()
+            name += part
+            module = index.get(name)
+            if module is not None and remaining < 3:  # noqa: PLR2004
                 return module
-        for package in self.packages:
-            if parts[0] == package.name:
-                if depth == 1:
-                    return package
-                targ = package._get_target(parts[1])
-                if targ:
-                    return targ
+            package = index.get(name + ".")
+            if package is None:
                 # FIXME: can lead to internal dep instead of external
                 # see example with django.contrib.auth.forms
                 # importing forms from django
                 # Idea: when parsing files with ast, record what objects
                 # are defined in the module. Then check here if the given
                 # part is one of these objects.
-                if depth < 3:  # noqa: PLR2004
-                    return package
-        return None
+                return fallback
+            if remaining == 1:
+                return package
+            # A package stands for its unknown module, or for an object imported from it.
+            fallback = package if remaining < 3 else None  # noqa: PLR2004
+            node = package  # type: ignore[assignment]
+            name += "."
+        return fallback
 
     def build_dependencies(self) -> None:
         """Recursively build the dependencies for sub-modules and sub-packages.
@@ -248,6 +370,11 @@ class RootNode:
         format: str | None = None,  # noqa: A002
         output: IO = sys.stdout,
         depth: int = 0,
+        expanded: Iterable[str] = (),
+        collapsed: Iterable[str] = (),
+        *,
+        sequence: bool = False,
+        cluster: bool = False,
         **kwargs: Any,
     ) -> None:
         """Print the matrix for self's nodes.
@@ -256,9 +383,15 @@ class RootNode:
             format: Output format (csv, json or text).
             output: File descriptor on which to write.
             depth: Depth of the matrix.
+            expanded: Names of packages to show the contents of, whatever the depth.
+            collapsed: Names of packages to show as a single key, whatever the depth.
+            sequence: Order the keys in blocks of mutually dependent keys instead of by name.
+            cluster: Also order the keys within these blocks to put most dependencies below the diagonal.
             **kwargs: Additional keyword arguments passed to `matrix.print`.
         """
-        matrix = self.as_matrix(depth=depth)
+        matrix = self.as_matrix(depth=depth, expanded=expanded, collapsed=collapsed)
+        if sequence or cluster:
+            matrix = matrix.sequence(cluster=cluster)
         matrix.print(format=format, output=output, **kwargs)
 
     def print_treemap(self, format: str | None = None, output: IO = sys.stdout, **kwargs: Any) -> None:  # noqa: A002
@@ -272,30 +405,36 @@ class RootNode:
         treemap = self.as_treemap()
         treemap.print(format=format, output=output, **kwargs)
 
-    def _to_text(self, **kwargs: Any) -> str:
+    def _iter_text(self, **kwargs: Any) -> Iterator[str]:
         indent = kwargs.pop("indent", 2)
         base_indent = kwargs.pop("base_indent", None)
         if base_indent is None:
             base_indent = indent
             indent = 0
-        text = [" " * indent + str(self) + "\n"]
+        yield " " * indent + str(self) + "\n"
         new_indent = indent + base_indent
         for module in self.modules:
-            text.append(module._to_text(indent=new_indent, base_indent=base_indent))
+            yield from module._iter_text(indent=new_indent, base_indent=base_indent)
         for package in self.packages:
-            text.append(package._to_text(indent=new_indent, base_indent=base_indent))
-        return "".join(text)
+            yield from package._iter_text(indent=new_indent, base_indent=base_indent)
 
-    def _to_csv(self, **kwargs: Any) -> str:
+    def _iter_csv(self, **kwargs: Any) -> Iterator[str]:
         header = kwargs.pop("header", True)
         modules = sorted(self.submodules, key=lambda mod: mod.absolute_name())
-        text = ["module,path,target,lineno,what,external\n" if header else ""]
+        yield "module,path,target,lineno,what,external\n" if header else ""
         for module in modules:
-            text.append(module._to_csv(header=False))
-        return "".join(text)
+            yield from module._iter_csv(header=False)
 
-    def _to_json(self, **kwargs: Any) -> str:
-        return json.dumps(self.as_dict(), **kwargs)
+    def _iter_json(self, **kwargs: Any) -> Iterator[str]:
+        return _iter_json(self._streamed_dict(), **kwargs)
+
+    def _streamed_dict(self) -> dict:
+        # Same as `as_dict`, but the dictionaries of modules and packages are built while they are written.
+        return {
+            "name": str(self),
+            "modules": _Stream((module.as_dict() for module in self.modules), len(self.modules)),
+            "packages": _Stream((package._streamed_dict() for package in self.packages), len(self.packages)),
+        }
 
     def as_dict(self) -> dict:
         """Return the dependencies as a dictionary.
@@ -322,18 +461,33 @@ class RootNode:
             self._graph_cache[depth] = Graph(self, depth=depth)  # type: ignore[arg-type]
         return self._graph_cache[depth]
 
-    def as_matrix(self, depth: int = 0) -> Matrix:
+    def diff(self, other: RootNode, depth: int = 0) -> MatrixDiff:
+        """Compare the matrix of self to the matrix of another node, matching keys by name.
+
+        Parameters:
+            other: The other (newer) node, like the DSM of another revision of the same packages.
+            depth: Depth of the matrices. With the default depth, keys are modules.
+
+        Returns:
+            The differences from self to the other node.
+        """
+        return self.as_matrix(depth=depth).diff(other.as_matrix(depth=depth))
+
+    def as_matrix(self, depth: int = 0, expanded: Iterable[str] = (), collapsed: Iterable[str] = ()) -> Matrix:
         """Create a matrix with self as node, cache it, return it.
 
         Parameters:
             depth: Depth of the matrix.
+            expanded: Names of packages to show the contents of, whatever the depth.
+            collapsed: Names of packages to show as a single key, whatever the depth.
 
         Returns:
             An instance of Matrix.
         """
-        if depth not in self._matrix_cache:
-            self._matrix_cache[depth] = Matrix(self, depth=depth)  # type: ignore[arg-type]
-        return self._matrix_cache[depth]
+        key = (depth, frozenset(expanded), frozenset(collapsed))
+        if key not in self._matrix_cache:
+            self._matrix_cache[key] = Matrix(self, depth=depth, expanded=key[1], collapsed=key[2])  # type: ignore[arg-type]
+        return self._matrix_cache[key]
 
     def as_treemap(self) -> TreeMap:
         """Return the dependencies as a TreeMap.
@@ -349,9 +503,12 @@ class RootNode:
 class LeafNode:
     """Shared code between Package and Module."""
 
+    # Slots are declared by subclasses, as Package also inherits the slots of RootNode.
+    __slots__ = ()
+
     def __init__(self):
         """Initialization method."""
-        self._depth_cache = None
+        self._names_cache: tuple[str, ...] | None = None
 
     def __str__(self):
         return self.absolute_name()
@@ -375,15 +532,21 @@ class LeafNode:
         Returns:
             The node's depth in the tree.
         """
-        if self._depth_cache is not None:
-            return self._depth_cache
-        node: Package
-        depth, node = 1, self  # type: ignore[assignment]
-        while node.package is not None:
-            depth += 1
-            node = node.package
-        self._depth_cache = depth
-        return depth
+        return len(self._names())
+
+    def _names(self) -> tuple[str, ...]:
+        # Absolute names of the node truncated at each depth, built once from the parent's ones.
+        # Nodes never change name or parent (a refresh creates new nodes), so they stay valid.
+        names = self._names_cache
+        if names is None:
+            package: Package | None = self.package  # type: ignore[attr-defined]
+            if package is None:
+                names = (self.name,)  # type: ignore[attr-defined]
+            else:
+                parent_names = package._names()
+                names = (*parent_names, parent_names[-1] + "." + self.name)  # type: ignore[attr-defined]
+            self._names_cache = names  # type: ignore[misc]
+        return names
 
     def absolute_name(self, depth: int = 0) -> str:
         """Return the absolute name of the node.
@@ -396,15 +559,7 @@ class LeafNode:
         Returns:
             Absolute name of the node (until given depth is reached).
         """
-        node: Package
-        node, node_depth = self, self.depth  # type: ignore[assignment]
-        if depth < 1:
-            depth = node_depth
-        while node_depth > depth and node.package is not None:
-            node = node.package
-            node_depth -= 1
-        names = []
-        while node is not None:
-            names.append(node.name)
-            node = node.package  # type: ignore[assignment]
-        return ".".join(reversed(names))
+        names = self._names()
+        if depth < 1 or depth > len(names):
+            return names[-1]
+        return names[depth - 1]
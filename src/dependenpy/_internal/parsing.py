@@ -0,0 +1,689 @@
+from __future__ import annotations
+
+import ast
+import dis
+import importlib.util
+import inspect
+import marshal
+import os
+import re
+import tokenize
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+from types import CodeType
+from typing import TYPE_CHECKING, TypeVar
+
+from dependenpy._internal.archives import _read_bytes, _stat
+from dependenpy._internal.cache import _digest
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator, Sequence
+
+    from dependenpy._internal.cache import ParseCache, _Stamp
+
+
+SERIAL = "serial"
+"""Parse modules one after the other, in the main thread."""
+THREAD = "thread"
+"""Parse modules in a pool of threads."""
+PROCESS = "process"
+"""Parse modules in a pool of processes."""
+EXECUTORS = (SERIAL, THREAD, PROCESS)
+"""Supported executors."""
+
+AST = "ast"
+"""Find imports by parsing the whole code into an abstract syntax tree."""
+SCAN = "scan"
+"""Find imports by scanning the code line by line, only tokenizing lines that contain imports."""
+BYTECODE = "bytecode"
+"""Find imports in the cached bytecode of modules (`__pycache__`) when it is up to date, parsing the other modules."""
+ENGINES = (AST, SCAN, BYTECODE)
+"""Supported engines for finding imports."""
+
+_IMPORT_NAME = dis.opmap["IMPORT_NAME"]
+_LOAD_CONST = dis.opmap["LOAD_CONST"]
+# Since Python 3.14, small integers like the level of imports are loaded from the instruction's argument.
+_LOAD_SMALL_INT = dis.opmap.get("LOAD_SMALL_INT")
+_LOAD_LEVEL = frozenset(opcode for opcode in (_LOAD_CONST, _LOAD_SMALL_INT) if opcode is not None)
+_EXTENDED_ARG = dis.EXTENDED_ARG
+_ASYNC_FLAGS = inspect.CO_COROUTINE | inspect.CO_ASYNC_GENERATOR
+
+
+_RECURSIVE_NODES = (ast.ClassDef, ast.FunctionDef, ast.If, ast.IfExp, ast.Try, ast.With, ast.ExceptHandler)
+
+# An import as found in the source code, before it is resolved against the tree:
+# (dotted name, relative level, line number). A `from .a import b` statement gives `("a.b", 1, lineno)`.
+_RawImport = tuple[str, int, int]
+
+_T = TypeVar("_T")
+
+# Reading files mostly waits for the disk, a few threads are enough to keep it busy.
+_PREFETCH_THREADS = 4
+
+
+def _walk_imports(
+    ast_body: Sequence[ast.AST],
+    recursive_nodes: tuple[type, ...] = _RECURSIVE_NODES,
+) -> Iterator[_RawImport]:
+    for node in ast_body:
+        if isinstance(node, ast.Import):
+            for name in node.names:
+                yield name.name, 0, node.lineno
+        elif isinstance(node, ast.ImportFrom):
+            node_module = node.module + "." if node.module else ""
+            for name in node.names:
+                yield node_module + name.name, node.level, node.lineno
+        elif isinstance(node, recursive_nodes):
+            yield from _walk_imports(node.body, recursive_nodes)  # type: ignore[attr-defined]
+            if isinstance(node, ast.Try):
+                yield from _walk_imports(node.finalbody, recursive_nodes)
+
+
+def _parse_source(source: bytes) -> list[_RawImport]:
+    code = source.decode("utf-8")
+    try:
+        body = ast.parse(code).body
+    except SyntaxError:
+        try:
+            body = ast.parse(source).body
+        except SyntaxError:
+            return []
+    return list(_walk_imports(body))
+
+
+class _AmbiguousCodeError(Exception):
+    """Raised by the scanner when it cannot reliably tell what a piece of code imports."""
+
+
+# Compound statements, and whether `get_imports` looks into their body (see `_RECURSIVE_NODES`).
+_BLOCKS = {
+    "if": True,
+    "try": True,
+    "finally": True,
+    "def": True,
+    "class": True,
+    "with": True,
+    "elif": False,
+    "else": False,
+    "except": False,
+    "for": False,
+    "while": False,
+    "async": False,
+    "match": False,
+    "case": False,
+}
+_SOFT_KEYWORDS = {"match", "case"}
+_SKIPPED_TOKENS = {tokenize.NL, tokenize.COMMENT}
+
+# Only what matters to know where logical lines start and in which blocks they are:
+# strings (which can span several lines and contain anything), comments, brackets,
+# escaped new lines, and new lines followed by a compound statement keyword.
+# Everything else is skipped at the start of each match, brackets with nothing special inside
+# are matched at once, and strings are written as unrolled loops, to save iterations.
+# The last alternative matches any character, so that the skipping part never has to backtrack.
+_LEXER = re.compile(
+    r"""
+    (?:[^'"\#()\[\]{}\\\n]+|\n(?![ \t]*(?:KEYWORDS)\b))*
+    (?:
+    (?P<string>
+        '''[^'\\]*(?:(?:\\.|'(?!''))[^'\\]*)*'''
+        |\"\"\"[^"\\]*(?:(?:\\.|"(?!""))[^"\\]*)*\"\"\"
+        |'[^'\\\n]*(?:\\.[^'\\\n]*)*'
+        |"[^"\\\n]*(?:\\.[^"\\\n]*)*"
+    )
+    |(?P<comment>\#[^\n]*)
+    |(?P<group>\([^'"\#()\[\]{}\\\n]*\)|\[[^'"\#()\[\]{}\\\n]*\]|\{[^'"\#()\[\]{}\\\n]*\})
+    |(?P<open>[(\[{])
+    |(?P<close>[)\]}])
+    |(?P<continuation>\\\r?\n)
+    |(?P<header>\n(?=[ \t]*(?:KEYWORDS)\b))
+    |(?P<end>\Z)
+    |(?P<other>.)
+    )
+    """.replace("KEYWORDS", "|".join(_BLOCKS)),
+    re.VERBOSE | re.DOTALL,
+)
+_INDENT = re.compile(r"[ \t]*")
+# Starting with a literal lets the regular expression engine search it very fast.
+_IMPORT_WORD = re.compile(r"import\b")
+_WORD_CHAR = re.compile(r"\w")
+_EXCEPT_STAR = re.compile(r"except\s*\*")
+# Import statements that fit on one line without brackets, by far the most common, are read without tokenizing.
+_SIMPLE_IMPORT = re.compile(
+    r"""
+    (?:import|from[ \t]+(?P<level>\.*)(?P<module>\w[\w.]*)?[ \t]+import)[ \t]+
+    (?P<names>[\w.]+(?:[ \t]+as[ \t]+\w+)?(?:[ \t]*,[ \t]*[\w.]+(?:[ \t]+as[ \t]+\w+)?)*)
+    [ \t]*(?:\#[^\n]*)?\r?
+    """,
+    re.VERBOSE,
+)
+
+
+def _scan_source(source: bytes) -> list[_RawImport]:
+    # Same result as `_parse_source`, but only the logical lines mentioning `import` are tokenized,
+    # and only the lines opening blocks are looked at, to know in which blocks imports are.
+    # Whenever the code is ambiguous, fall back to a full parse.
+    code = source.decode("utf-8")
+    if "import" not in code:
+        return []
+    try:
+        return _scan_code(code)
+    except (_AmbiguousCodeError, tokenize.TokenError, SyntaxError):
+        return _parse_source(source)
+
+
+def _scan_code(code: str) -> list[_RawImport]:
+    if "\r" in code and code.count("\r") != code.count("\r\n"):
+        raise _AmbiguousCodeError("old Mac line endings")
+    # Lines are detected after a new line, so we prepend one (and count lines from 0).
+    code = "\n" + code
+    # Positions of the word `import`, consumed in order along with the matches of the lexer:
+    # the ones inside strings or comments are discarded, the others are in a logical line to read.
+    words = [match.start() for match in _IMPORT_WORD.finditer(code) if not _WORD_CHAR.match(code, match.start() - 1)]
+    words.append(len(code) + 1)
+    word_index = 0
+    word = words[0]
+    imports: list[_RawImport] = []
+    # Stack of the blocks opened by the previous compound statements: (indentation, whether get_imports looks into it).
+    # The block containing a line is always the last compound statement with a smaller indentation,
+    # so lines that neither open blocks nor import anything can be ignored.
+    blocks: list[tuple[int, bool]] = []
+    hidden = 0
+    depth = 0
+    lineno = 0
+    counted = 0
+    header = header_visible = -1
+    scanned = -1
+    for match in _LEXER.finditer(code):
+        match_start = match.start(match.lastindex)  # type: ignore[arg-type]
+        while word < match_start:
+            if depth:
+                raise _AmbiguousCodeError("import in continuation line")
+            line = code.rfind("\n", 0, word)
+            if line != scanned:
+                scanned = line
+                if code.endswith("\\", 0, line) or code.endswith("\\\r", 0, line):
+                    raise _AmbiguousCodeError("import after escaped new line")
+                before = code[line:word]
+                if sum(map(before.count, ")]}")) > sum(map(before.count, "([{")):
+                    raise _AmbiguousCodeError("import after brackets opened on a previous line")
+                indent_match = _INDENT.match(code, line + 1)
+                start = indent_match.end()  # type: ignore[union-attr]
+                if line == header:
+                    # Import in the body of a compound statement written on the same line.
+                    visible = header_visible
+                else:
+                    indent = _indentation(indent_match.group())  # type: ignore[union-attr]
+                    while blocks and blocks[-1][0] >= indent:
+                        hidden -= not blocks.pop()[1]
+                    visible = not hidden
+                if visible:
+                    lineno += code.count("\n", counted, start)
+                    counted = start
+                    imports.extend(_scan_line(code, start, lineno))
+            word_index += 1
+            word = words[word_index]
+        kind = match.lastgroup
+        if word < match.end():
+            if kind == "group":
+                raise _AmbiguousCodeError("import in brackets")
+            # Inside a string or a comment.
+            while word < match.end():
+                word_index += 1
+                word = words[word_index]
+        if kind == "open":
+            depth += 1
+        elif kind == "close":
+            depth -= 1
+            if depth < 0:
+                raise _AmbiguousCodeError("unbalanced brackets")
+        elif kind == "header" and not depth:
+            indent_match = _INDENT.match(code, match_start + 1)
+            start = indent_match.end()  # type: ignore[union-attr]
+            indent = _indentation(indent_match.group())  # type: ignore[union-attr]
+            while blocks and blocks[-1][0] >= indent:
+                hidden -= not blocks.pop()[1]
+            header = match_start
+            header_visible = not hidden
+            keyword = next(keyword for keyword in _BLOCKS if code.startswith(keyword, start))
+            if keyword == "except" and _EXCEPT_STAR.match(code, start):
+                # The body of a try/except* block is ignored by get_imports.
+                raise _AmbiguousCodeError("except*")
+            blocks.append((indent, _BLOCKS[keyword]))
+            hidden += not _BLOCKS[keyword]
+    if depth:
+        raise _AmbiguousCodeError("unclosed brackets")
+    return imports
+
+
+def _indentation(indent: str) -> int:
+    return len(indent.expandtabs(8)) if "\t" in indent else len(indent)
+
+
+def _scan_line(code: str, start: int, lineno: int) -> list[_RawImport]:
+    end = code.find("\n", start)
+    simple = _SIMPLE_IMPORT.fullmatch(code, start, len(code) if end < 0 else end)
+    if simple is None:
+        return _scan_statements(code, start, lineno)
+    level, module, names = simple.group("level", "module", "names")
+    names = [name.split(None, 1)[0] for name in names.split(",")]
+    if level is None:
+        return [(name, 0, lineno) for name in names]
+    if any("." in name for name in names):
+        return _scan_statements(code, start, lineno)
+    prefix = module + "." if module else ""
+    return [(prefix + name, len(level), lineno) for name in names]
+
+
+def _scan_statements(code: str, start: int, lineno: int) -> list[_RawImport]:
+    # Tokenize the logical line starting at the given position, and find its imports.
+    def readline() -> str:
+        nonlocal start
+        end = code.find("\n", start) + 1 or len(code)
+        line = code[start:end]
+        start = end
+        return line
+
+    tokens = []
+    for token in tokenize.generate_tokens(readline):
+        if token.type in {tokenize.NEWLINE, tokenize.ENDMARKER}:
+            break
+        if token.type in {tokenize.INDENT, tokenize.DEDENT, tokenize.ERRORTOKEN}:
+            raise _AmbiguousCodeError("unexpected token")
+        if token.type not in _SKIPPED_TOKENS:
+            tokens.append(token)
+    imports: list[_RawImport] = []
+    visible = True
+    index = 0
+    while index < len(tokens):
+        token = tokens[index]
+        if token.string in {"import", "from"}:
+            records, index = _scan_import(tokens, index, lineno + token.start[0] - 1)
+            if visible:
+                imports.extend(records)
+        else:
+            colon = _find_colon(tokens, index) if token.string in _BLOCKS else None
+            if colon is not None:
+                # The rest of the line is the body of a compound statement.
+                visible = visible and _BLOCKS[token.string]
+                index = colon + 1
+                continue
+            if token.string in _BLOCKS and token.string not in _SOFT_KEYWORDS:
+                raise _AmbiguousCodeError("compound statement without colon")
+            index = _skip_statement(tokens, index)
+        if index < len(tokens):
+            if tokens[index].string != ";":
+                raise _AmbiguousCodeError("unexpected token after statement")
+            index += 1
+    return imports
+
+
+def _find_colon(tokens: list[tokenize.TokenInfo], index: int) -> int | None:
+    depth = 0
+    for position in range(index, len(tokens)):
+        string = tokens[position].string
+        if string in "([{":
+            depth += 1
+        elif string in ")]}":
+            depth -= 1
+        elif not depth:
+            if string == ":":
+                return position
+            if string == "lambda":
+                raise _AmbiguousCodeError("lambda in compound statement header")
+            if string == ";":
+                return None
+    return None
+
+
+def _skip_statement(tokens: list[tokenize.TokenInfo], index: int) -> int:
+    depth = 0
+    while index < len(tokens):
+        string = tokens[index].string
+        if string in "([{":
+            depth += 1
+        elif string in ")]}":
+            depth -= 1
+        elif string == ";" and not depth:
+            break
+        index += 1
+    return index
+
+
+def _scan_dotted_name(tokens: list[tokenize.TokenInfo], index: int) -> tuple[str, int]:
+    parts = []
+    while True:
+        if index >= len(tokens) or tokens[index].type != tokenize.NAME:
+            raise _AmbiguousCodeError("expected a name")
+        parts.append(tokens[index].string)
+        index += 1
+        if index < len(tokens) and tokens[index].string == ".":
+            index += 1
+        else:
+            return ".".join(parts), index
+
+
+def _scan_alias(tokens: list[tokenize.TokenInfo], index: int) -> int:
+    if index < len(tokens) and tokens[index].string == "as":
+        if index + 1 >= len(tokens) or tokens[index + 1].type != tokenize.NAME:
+            raise _AmbiguousCodeError("expected a name after 'as'")
+        return index + 2
+    return index
+
+
+def _scan_import(tokens: list[tokenize.TokenInfo], index: int, lineno: int) -> tuple[list[_RawImport], int]:
+    records: list[_RawImport] = []
+    if tokens[index].string == "import":
+        index += 1
+        while True:
+            name, index = _scan_dotted_name(tokens, index)
+            index = _scan_alias(tokens, index)
+            records.append((name, 0, lineno))
+            if index < len(tokens) and tokens[index].string == ",":
+                index += 1
+            else:
+                return records, index
+    index += 1
+    level = 0
+    while index < len(tokens) and tokens[index].string in {".", "..."}:
+        level += len(tokens[index].string)
+        index += 1
+    module = ""
+    if index < len(tokens) and tokens[index].string != "import":
+        module, index = _scan_dotted_name(tokens, index)
+        module += "."
+    if index >= len(tokens) or tokens[index].string != "import":
+        raise _AmbiguousCodeError("expected 'import'")
+    index += 1
+    if index < len(tokens) and tokens[index].string == "*":
+        return [(module + "*", level, lineno)], index + 1
+    parenthesized = index < len(tokens) and tokens[index].string == "("
+    index += parenthesized
+    while True:
+        name, index = _scan_dotted_name(tokens, index)
+        if "." in name:
+            raise _AmbiguousCodeError("dotted name in from-import")
+        index = _scan_alias(tokens, index)
+        records.append((module + name, level, lineno))
+        if index < len(tokens) and tokens[index].string == ",":
+            index += 1
+            if parenthesized and index < len(tokens) and tokens[index].string == ")":
+                break
+        else:
+            break
+    if parenthesized:
+        if index >= len(tokens) or tokens[index].string != ")":
+            raise _AmbiguousCodeError("expected ')'")
+        index += 1
+    return records, index
+
+
+def _opcode_offsets(co_code: bytes, opcode: int) -> Iterator[int]:
+    # Offsets of the instructions with the given opcode, instructions being two bytes long.
+    byte = bytes([opcode])
+    offset = co_code.find(byte)
+    while offset != -1:
+        if offset % 2 == 0:
+            yield offset
+        offset = co_code.find(byte, offset + 1)
+
+
+def _has_imports(code: CodeType) -> bool:
+    return bytes([_IMPORT_NAME]) in code.co_code[::2] or any(
+        isinstance(const, CodeType) and _has_imports(const) for const in code.co_consts
+    )
+
+
+def _import_lines(code: CodeType) -> set[int | None]:
+    # Line numbers of all the import instructions of a code object and the code objects it defines.
+    lines: set[int | None] = set()
+    if bytes([_IMPORT_NAME]) in code.co_code[::2]:
+        positions = list(code.co_positions())
+        lines.update(positions[offset // 2][0] for offset in _opcode_offsets(code.co_code, _IMPORT_NAME))
+    for const in code.co_consts:
+        if isinstance(const, CodeType):
+            lines |= _import_lines(const)
+    return lines
+
+
+def _source_import_lines(source: bytes) -> set[int]:
+    # Line numbers of what looks like import statements in the source: an `import` keyword
+    # at the start of a line, after `;` or `:`, or after `from` and a name. Searching for the keyword
+    # is much faster than a regular expression. Matches in strings are harmless:
+    # they only make the bytecode engine parse the module.
+    lines: set[int] = set()
+    lineno, position = 1, 0
+    index = source.find(b"import")
+    while index != -1:
+        line_start = source.rfind(b"\n", 0, index) + 1
+        statement = re.split(rb"[;:]", source[line_start:index])[-1].lstrip()
+        if source[index + 6 : index + 7] in b" \t\\" and (not statement or statement.startswith(b"from")):
+            lineno += source.count(b"\n", position, index)
+            position = index
+            lines.add(lineno)
+        index = source.find(b"import", index + 6)
+    return lines
+
+
+def _code_imports(code: CodeType, indent: int = 0) -> list[_RawImport] | None:
+    # Same result as `_walk_imports`, found in a code object and the classes and functions it defines.
+    # Only imports written at the indentation of the body are kept, which `_walk_imports` always visits:
+    # deeper imports may be in blocks it does not visit (`else`, `except`, loops), so None is returned.
+    co_code = code.co_code
+    positions = list(code.co_positions())
+    imports: list[_RawImport] = []
+    for offset in _opcode_offsets(co_code, _IMPORT_NAME):
+        lineno, _, column, _ = positions[offset // 2]
+        # `from a import b` loads its level then its imported names, without extended arguments.
+        if (
+            column != indent
+            or lineno is None
+            or offset < 4  # noqa: PLR2004
+            or co_code[offset - 4] not in _LOAD_LEVEL
+            or co_code[offset - 2] != _LOAD_CONST
+            or (offset >= 6 and co_code[offset - 6] == _EXTENDED_ARG)  # noqa: PLR2004
+        ):
+            return None
+        level = code.co_consts[co_code[offset - 3]] if co_code[offset - 4] == _LOAD_CONST else co_code[offset - 3]
+        names = code.co_consts[co_code[offset - 1]]
+        module = code.co_names[co_code[offset + 1]]
+        if not isinstance(level, int):
+            return None
+        if names is None:
+            imports.append((module, level, lineno))
+        else:
+            prefix = module + "." if module else ""
+            imports.extend((prefix + name, level, lineno) for name in names)
+    for index, const in enumerate(code.co_consts):
+        # `_walk_imports` does not visit async functions: neither are they here.
+        if not isinstance(const, CodeType) or const.co_flags & _ASYNC_FLAGS or not _has_imports(const):
+            continue
+        load = bytes([_LOAD_CONST, index]) if index < 256 else None  # noqa: PLR2004
+        offset = co_code.find(load) if load is not None else -1
+        if offset == -1 or offset % 2:
+            return None
+        lineno, _, column, _ = positions[offset // 2]
+        if column != indent or lineno is None:
+            return None
+        # The body is indented like its leftmost instruction after the `def` or `class` line.
+        body_indent = min(
+            (
+                column
+                for line, _, column, _ in const.co_positions()
+                if line is not None and line > lineno and column is not None
+            ),
+            default=None,
+        )
+        nested_imports = _code_imports(const, body_indent) if body_indent is not None else None
+        if nested_imports is None:
+            return None
+        imports.extend(nested_imports)
+    imports.sort(key=lambda import_: import_[2])
+    return imports
+
+
+def _read_bytecode_imports(
+    path: str,
+    stat: tuple[int, int] | None = None,
+    source: bytes | None = None,
+) -> list[_RawImport] | None:
+    # Same result as `_parse_source`, found in the cached bytecode of the module instead of parsing its source.
+    # None when there is no bytecode up to date with the source, when it cannot tell imports apart,
+    # or when the compiler removed imports from the source, with dead code (`if False:`, after `return`, ...).
+    # Columns are only recorded in code objects since Python 3.11.
+    if not hasattr(CodeType, "co_positions"):
+        return None
+    try:
+        data = _read_bytes(importlib.util.cache_from_source(path))
+        mtime_ns, size = _stat(path) if stat is None else stat
+    except (OSError, NotImplementedError, ValueError):
+        return None
+    if len(data) < 16 or data[:4] != importlib.util.MAGIC_NUMBER:  # noqa: PLR2004
+        return None
+    flags = int.from_bytes(data[4:8], "little")
+    if not flags & 0b01 and (int.from_bytes(data[8:12], "little"), int.from_bytes(data[12:16], "little")) != (
+        (mtime_ns // 10**9) & 0xFFFFFFFF,
+        size & 0xFFFFFFFF,
+    ):
+        return None
+    try:
+        source = _read_bytes(path) if source is None else source
+    except OSError:
+        return None
+    # Hash-based bytecode: the hash is checked even when the interpreter would not (unchecked pycs),
+    # as imports must match the current source.
+    if flags & 0b01 and data[8:16] != importlib.util.source_hash(source):
+        return None
+    try:
+        # Unmarshalling only builds the code object, which is never executed.
+        code = marshal.loads(data[16:])  # noqa: S302
+    except (EOFError, ValueError, TypeError):
+        return None
+    if not isinstance(code, CodeType) or not _source_import_lines(source) <= _import_lines(code):
+        return None
+    return _code_imports(code)
+
+
+def _extract_imports(source: bytes, engine: str = AST) -> list[_RawImport]:
+    if engine == SCAN:
+        return _scan_source(source)
+    return _parse_source(source)
+
+
+def _read_source(path: str) -> bytes:
+    return _read_bytes(path)
+
+
+def _read_stamped_source(path: str) -> tuple[bytes, _Stamp]:
+    # Stat before reading: if the file changes in between, the entry is merely considered stale later.
+    mtime_ns, size = _stat(path)
+    source = _read_source(path)
+    return source, (mtime_ns, size, _digest(source))
+
+
+def _read_imports(path: str, engine: str = AST) -> list[_RawImport]:
+    source = _read_source(path)
+    if engine == BYTECODE:
+        imports = _read_bytecode_imports(path, source=source)
+        if imports is not None:
+            return imports
+    return _extract_imports(source, engine)
+
+
+def _read_stamped_imports(path: str, engine: str = AST) -> tuple[list[_RawImport], _Stamp]:
+    source, stamp = _read_stamped_source(path)
+    if engine == BYTECODE:
+        imports = _read_bytecode_imports(path, stamp[:2], source)
+        if imports is not None:
+            return imports, stamp
+    return _extract_imports(source, engine), stamp
+
+
+def _prefetch(function: Callable[[str], _T], paths: Sequence[str], size: int) -> Iterator[_T]:
+    # Run the function (reading files) in a few threads, at most `size` paths ahead of the consumer (parsing files):
+    # reading the next files overlaps with parsing the current one, while memory stays bounded.
+    paths_iterator = iter(paths)
+    with ThreadPoolExecutor(max_workers=min(size, _PREFETCH_THREADS)) as pool:
+        pending = deque(pool.submit(function, path) for path in islice(paths_iterator, size))
+        while pending:
+            result = pending.popleft().result()
+            for path in islice(paths_iterator, 1):
+                pending.append(pool.submit(function, path))
+            yield result
+
+
+def _check_engine(engine: str) -> str:
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine '{engine}', expected one of: {', '.join(ENGINES)}")
+    return engine
+
+
+def _get_workers(workers: int | None) -> int | None:
+    if workers is not None and workers < 1:
+        return os.cpu_count() or 1
+    return workers
+
+
+def _get_executor(executor: str | Executor | None, workers: int | None) -> str | Executor:
+    if executor is None:
+        return PROCESS if (_get_workers(workers) or 1) > 1 else SERIAL
+    if isinstance(executor, str) and executor not in EXECUTORS:
+        raise ValueError(f"Unknown executor '{executor}', expected one of: {', '.join(EXECUTORS)}")
+    return executor
+
+
+def _map(
+    function: Callable[[str], _T],
+    paths: Sequence[str],
+    executor: str | Executor | None = None,
+    workers: int | None = None,
+) -> list[_T]:
+    # Results are returned in the same order as the paths whatever the executor,
+    # so that the output never depends on scheduling.
+    executor = _get_executor(executor, workers)
+    if isinstance(executor, Executor):
+        return list(executor.map(function, paths))
+    if executor == SERIAL or len(paths) < 2:  # noqa: PLR2004
+        return [function(path) for path in paths]
+    max_workers = _get_workers(workers)
+    if executor == THREAD:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            return list(pool.map(function, paths))
+    # Chunks amortize inter-process communication while still balancing load between workers.
+    chunksize = max(1, len(paths) // ((max_workers or os.cpu_count() or 1) * 4))
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(function, paths, chunksize=chunksize))
+
+
+def _parse_paths(
+    paths: Sequence[str],
+    executor: str | Executor | None = None,
+    workers: int | None = None,
+    *,
+    cache: ParseCache | None = None,
+    engine: str = AST,
+    prefetch: int = 0,
+) -> list[list[_RawImport]]:
+    # Pools of threads or processes already overlap reading and parsing: only prefetch in serial mode.
+    # Prefetched sources go straight to the parser, which the bytecode engine mostly avoids.
+    prefetch = prefetch if _get_executor(executor, workers) == SERIAL and engine != BYTECODE else 0
+    if cache is None:
+        if prefetch:
+            return [_extract_imports(source, engine) for source in _prefetch(_read_source, paths, prefetch)]
+        return _map(partial(_read_imports, engine=engine), paths, executor, workers)
+    results = [cache.get(path, engine) for path in paths]
+    missing = [index for index, imports in enumerate(results) if imports is None]
+    missing_paths = [paths[index] for index in missing]
+    if prefetch:
+        parsed = [
+            (_extract_imports(source, engine), stamp)
+            for source, stamp in _prefetch(_read_stamped_source, missing_paths, prefetch)
+        ]
+    else:
+        parsed = _map(partial(_read_stamped_imports, engine=engine), missing_paths, executor, workers)
+    for index, (imports, stamp) in zip(missing, parsed):
+        cache.set(paths[index], imports, stamp, engine)
+        results[index] = imports
+    return results  # type: ignore[return-value]
@@ -53,4 +53,5 @@ else:
             if depth is None:
                 depth = guess_depth(packages)
             matrix = dsm.as_matrix(depth=depth)
-            return archan.DesignStructureMatrix(data=matrix.data, entities=matrix.keys)
+            # Archan needs the dense rows: they are built for it without being kept on the cached matrix.
+            return archan.DesignStructureMatrix(data=list(matrix._dense_rows()), entities=matrix.keys)
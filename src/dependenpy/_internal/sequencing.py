@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import heapq
+from collections import deque
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Sequence
+
+
+def _strong_components(successors: Sequence[Iterable[int]]) -> list[list[int]]:
+    # Tarjan's algorithm, with an explicit stack so that long chains of dependencies do not hit the recursion limit.
+    # A component is found after all the components it depends on.
+    size = len(successors)
+    index = [-1] * size
+    low = [0] * size
+    on_stack = [False] * size
+    stack: list[int] = []
+    components: list[list[int]] = []
+    counter = 0
+    for root in range(size):
+        if index[root] != -1:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, iter(successors[root]))]
+        while work:
+            node, children = work[-1]
+            for child in children:
+                if index[child] == -1:
+                    index[child] = low[child] = counter
+                    counter += 1
+                    stack.append(child)
+                    on_stack[child] = True
+                    work.append((child, iter(successors[child])))
+                    break
+                if on_stack[child] and index[child] < low[node]:
+                    low[node] = index[child]
+            else:
+                work.pop()
+                if work and low[node] < low[work[-1][0]]:
+                    low[work[-1][0]] = low[node]
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+    return components
+
+
+def _feedback_order(members: list[int], cells: Sequence[dict[int, int]]) -> list[int]:
+    # Greedy heuristic of Eades, Lin and Smyth: keys without remaining dependencies go first,
+    # keys nothing depends on anymore go last, and otherwise the key which is the most depended upon
+    # compared to its own dependencies goes first. Most of the weight then ends up below the diagonal.
+    # Keys wait in queues and in buckets of equal `in_weight - out_weight`, so that each step takes constant time,
+    # apart from looking down for the highest non-empty bucket, which takes at most the total weight over all steps.
+    remaining = dict.fromkeys(members)
+    dependents: dict[int, dict[int, int]] = {member: {} for member in members}
+    out_weight = dict.fromkeys(members, 0)
+    in_weight = dict.fromkeys(members, 0)
+    for member in members:
+        for col, value in cells[member].items():
+            if col != member and col in remaining:
+                dependents[col][member] = value
+                out_weight[member] += value
+                in_weight[col] += value
+    # Keys never get dependencies or dependents back: queued keys only need to be skipped once placed.
+    sinks = deque(member for member in members if not out_weight[member])
+    sources = deque(member for member in members if not in_weight[member])
+    buckets: dict[int, dict[int, None]] = {}
+    for member in members:
+        buckets.setdefault(in_weight[member] - out_weight[member], {})[member] = None
+    highest = max(buckets, default=0)
+    front: list[int] = []
+    back: list[int] = []
+
+    def move(member: int, delta: int) -> None:
+        nonlocal highest
+        bucket = in_weight[member] - out_weight[member]
+        del buckets[bucket][member]
+        buckets.setdefault(bucket + delta, {})[member] = None
+        highest = max(highest, bucket + delta)
+
+    while remaining:
+        while sinks and sinks[0] not in remaining:
+            sinks.popleft()
+        while sources and sources[0] not in remaining:
+            sources.popleft()
+        if sinks:
+            node = sinks.popleft()
+            front.append(node)
+        elif sources:
+            node = sources.popleft()
+            back.append(node)
+        else:
+            while not buckets.get(highest):
+                highest -= 1
+            node = next(iter(buckets[highest]))
+            front.append(node)
+        del remaining[node]
+        del buckets[in_weight[node] - out_weight[node]][node]
+        for col, value in cells[node].items():
+            if col in remaining:
+                move(col, -value)
+                in_weight[col] -= value
+                if not in_weight[col]:
+                    sources.append(col)
+        for row, value in dependents[node].items():
+            if row in remaining:
+                move(row, value)
+                out_weight[row] -= value
+                if not out_weight[row]:
+                    sinks.append(row)
+    return front + back[::-1]
+
+
+def _sequence(cells: Sequence[dict[int, int]], *, cluster: bool = False) -> tuple[list[int], list[tuple[int, int]]]:
+    # Order of the keys in blocks of mutually dependent keys (the strongly connected components),
+    # the blocks being sorted so that each key comes after the keys it depends on, except within blocks.
+    # Ties are broken by the current order of the keys. Also returns the (start, stop) range of each block.
+    components = _strong_components([[col for col in row if col != index] for index, row in enumerate(cells)])
+    component_of = [0] * len(cells)
+    for number, component in enumerate(components):
+        component.sort()
+        for member in component:
+            component_of[member] = number
+    waiting = [0] * len(components)
+    dependents: list[list[int]] = [[] for _ in components]
+    for row, row_cells in enumerate(cells):
+        for col in row_cells:
+            if component_of[row] != component_of[col]:
+                waiting[component_of[row]] += 1
+                dependents[component_of[col]].append(component_of[row])
+    ready = [(component[0], number) for number, component in enumerate(components) if not waiting[number]]
+    heapq.heapify(ready)
+    order: list[int] = []
+    blocks: list[tuple[int, int]] = []
+    while ready:
+        _, number = heapq.heappop(ready)
+        members = components[number]
+        if cluster and len(members) > 1:
+            members = _feedback_order(members, cells)
+        blocks.append((len(order), len(order) + len(members)))
+        order.extend(members)
+        for dependent in dependents[number]:
+            waiting[dependent] -= 1
+            if not waiting[dependent]:
+                heapq.heappush(ready, (components[dependent][0], dependent))
+    return order, blocks
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+from array import array
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from dependenpy._internal.dsm import Module, Package
+
+# A dependency as stored in columns: (target node, or name of the external target, line number, what is imported).
+_Row = tuple["Module | Package | str", int, "str | None"]
+
+
+class DependencyStore:
+    """Columnar store of the dependencies of all the modules of a DSM.
+
+    Instead of one `Dependency` object per import, dependencies are stored in parallel arrays of integers:
+    the identifier of the source module, the identifier of the target node (or of the name of the external target),
+    the line number, and the identifier of what is imported. Nodes and strings are identified
+    by their position in tables shared by all the dependencies.
+
+    The dependencies of each module are stored in a contiguous range of rows,
+    and the module's `dependencies` are a view over this range.
+    """
+
+    __slots__ = (
+        "_modules",
+        "_node_ids",
+        "_released",
+        "_string_ids",
+        "external",
+        "linenos",
+        "names",
+        "nodes",
+        "sources",
+        "strings",
+        "targets",
+        "whats",
+    )
+
+    def __init__(self) -> None:
+        """Initialization method."""
+        self.sources: array[int] = array("I")
+        """Identifiers of the source modules."""
+        self.targets: array[int] = array("I")
+        """Identifiers of the target nodes, or of the names of external targets."""
+        self.external: array[int] = array("B")
+        """Whether targets are external (1) or nodes (0)."""
+        self.linenos: array[int] = array("I")
+        """Line numbers of the import statements."""
+        self.whats: array[int] = array("I")
+        """Identifiers of what is imported, 0 for nothing."""
+        self.names: array[int] = array("I")
+        """Identifiers of the imported absolute names, to resolve them again when nodes are added or removed."""
+        self.nodes: list[Module | Package] = []
+        """Table of the nodes."""
+        self.strings: list[str] = [""]
+        """Table of the strings."""
+        self._node_ids: dict[Module | Package, int] = {}
+        self._string_ids: dict[str, int] = {"": 0}
+        # Modules owning rows, and number of rows no module owns anymore.
+        self._modules: dict[Module, None] = {}
+        self._released = 0
+
+    def __len__(self) -> int:
+        return len(self.linenos)
+
+    def _node_id(self, node: Module | Package) -> int:
+        node_id = self._node_ids.get(node)
+        if node_id is None:
+            node_id = self._node_ids[node] = len(self.nodes)
+            self.nodes.append(node)
+        return node_id
+
+    def _string_id(self, string: str) -> int:
+        string_id = self._string_ids.get(string)
+        if string_id is None:
+            string_id = self._string_ids[string] = len(self.strings)
+            self.strings.append(string)
+        return string_id
+
+    def add(
+        self,
+        source: Module,
+        target: Module | Package | str,
+        lineno: int,
+        what: str | None = None,
+        name: str = "",
+    ) -> None:
+        """Add a dependency to the rows of its source module.
+
+        Parameters:
+            source: Source module.
+            target: Target node, or name of the external target.
+            lineno: Line number of the import statement.
+            what: What is imported (optional).
+            name: Absolute name that was imported.
+        """
+        start, stop = source._rows or (len(self), len(self))
+        if stop != len(self):
+            # Rows of a module are contiguous: move its previous rows after the others first.
+            count = stop - start
+            for row in range(start, stop):
+                self._append(*(column[row] for column in self._columns()))
+            self._released += count
+            start, stop = len(self) - count, len(self)
+        external = isinstance(target, str)
+        self._append(
+            self._node_id(source),
+            self._string_id(target) if external else self._node_id(target),  # type: ignore[arg-type]
+            int(external),
+            lineno,
+            self._string_id(what) if what else 0,
+            self._string_id(name),
+        )
+        source._rows = (start, stop + 1)
+        self._modules[source] = None
+
+    def _columns(self) -> tuple[array[int], ...]:
+        return self.sources, self.targets, self.external, self.linenos, self.whats, self.names
+
+    def _append(self, *values: int) -> None:
+        for column, value in zip(self._columns(), values):
+            column.append(value)
+
+    def release(self, module: Module) -> None:
+        """Forget the dependencies of a module.
+
+        Rows are reclaimed once most of them belong to no module anymore.
+
+        Parameters:
+            module: The module.
+        """
+        if module._rows is not None:
+            start, stop = module._rows
+            self._released += stop - start
+        module._rows = None
+        self._modules.pop(module, None)
+        if self._released > len(self) // 2:
+            self._compact()
+
+    def _compact(self) -> None:
+        # Tables are rebuilt too, so that removed nodes and unused strings are not kept alive.
+        columns = self._columns()
+        nodes, strings = self.nodes, self.strings
+        self.sources, self.targets, self.external, self.linenos, self.whats, self.names = (
+            array(column.typecode) for column in columns
+        )
+        self.nodes, self._node_ids = [], {}
+        self.strings, self._string_ids = [""], {"": 0}
+        for module in self._modules:
+            start, stop = module._rows  # type: ignore[misc]
+            new_start = len(self)
+            for source, target, external, lineno, what, name in zip(*(column[start:stop] for column in columns)):
+                self._append(
+                    self._node_id(nodes[source]),
+                    self._string_id(strings[target]) if external else self._node_id(nodes[target]),
+                    external,
+                    lineno,
+                    self._string_id(strings[what]) if what else 0,
+                    self._string_id(strings[name]),
+                )
+            module._rows = (new_start, len(self))
+        self._released = 0
+
+    def rows(self, start: int, stop: int) -> Iterator[_Row]:
+        """Iterate on dependencies without building `Dependency` objects.
+
+        Parameters:
+            start: First row.
+            stop: Row after the last one.
+
+        Yields:
+            The target node or the name of the external target, the line number, and what is imported.
+        """
+        nodes, strings = self.nodes, self.strings
+        for target, external, lineno, what in zip(
+            self.targets[start:stop],
+            self.external[start:stop],
+            self.linenos[start:stop],
+            self.whats[start:stop],
+        ):
+            yield (strings[target] if external else nodes[target]), lineno, (strings[what] or None)
+
+    def imports(self, start: int, stop: int) -> list[tuple[str, int]]:
+        """Return the absolute names imported by dependencies, with their line numbers.
+
+        Parameters:
+            start: First row.
+            stop: Row after the last one.
+
+        Returns:
+            The imported names and line numbers.
+        """
+        strings = self.strings
+        return [(strings[name], lineno) for name, lineno in zip(self.names[start:stop], self.linenos[start:stop])]
@@ -1,16 +1,146 @@
 from __future__ import annotations
 
+import ast
 import copy
+import itertools
 import json
+import struct
+import sys
+from array import array
 from typing import TYPE_CHECKING, Any
 
 from colorama import Style
 
-from dependenpy._internal.helpers import PrintMixin
+from dependenpy._internal.helpers import PrintMixin, _iter_json, _Stream
+from dependenpy._internal.sequencing import _sequence, _strong_components
 
 if TYPE_CHECKING:
+    import os
+    from collections.abc import Callable, Iterable, Iterator, Sequence
+
+    import numpy as np
+    from scipy import sparse
+
     from dependenpy._internal.dsm import DSM, Module, Package
 
+# Identifiers of graph vertices.
+_VERTEX_IDS = itertools.count()
+
+# Magic string starting NumPy `.npy` files, and array type codes of the integer types they can hold.
+_NPY_MAGIC = b"\x93NUMPY"
+_NPY_TYPECODES = {"u": "BHILQ", "i": "bhilq"}
+
+
+def _npy_typecode(descr: str) -> str | None:
+    # Type code of the `array` matching a NumPy integer type description, like `<u4`.
+    kind, size = descr[1:2], descr[2:]
+    for typecode in _NPY_TYPECODES.get(kind, ""):
+        if str(array(typecode).itemsize) == size:
+            return typecode
+    return None
+
+
+def _submodules(nodes: tuple[DSM | Package | Module, ...]) -> list[Module]:
+    # Modules of the given nodes, in the order of the nodes.
+    modules: list[Module] = []
+    for node in nodes:
+        if node.ismodule:
+            modules.append(node)  # type: ignore[arg-type]
+        elif node.ispackage or node.isdsm:
+            modules.extend(node.submodules)  # type: ignore[union-attr]
+    return modules
+
+
+def _roots(nodes: tuple[DSM | Package | Module, ...]) -> set[Package]:
+    # Packages above which keys are not searched.
+    return {node for node in nodes if node.ispackage}  # type: ignore[misc]
+
+
+def _key_function(
+    depth: int,
+    roots: set[Package],
+    expanded: frozenset[str] = frozenset(),
+    collapsed: frozenset[str] = frozenset(),
+) -> Callable[[Module], Package | Module]:
+    # Function returning the key of a module: its highest collapsed ancestor, or its ancestor at the given depth
+    # (without going above the roots) unless it is expanded, or the module itself.
+    limit = depth if depth >= 1 else sys.maxsize
+    opened = _opened(expanded)
+
+    def key(module: Module) -> Package | Module:
+        ancestors: list[Package] = []
+        package = module.package
+        while package is not None:
+            ancestors.append(package)
+            if package in roots:
+                break
+            package = package.package
+        for package in reversed(ancestors):
+            name = package.absolute_name()
+            if name in collapsed or (package.depth >= limit and name not in opened):
+                return package
+        return module
+
+    return key
+
+
+def _keys(modules: list[Module], key_of: Callable[[Module], Package | Module]) -> list[Package | Module]:
+    # Keys of the given modules, sorted by name.
+    return sorted(dict.fromkeys(key_of(module) for module in modules), key=lambda key: key.absolute_name())
+
+
+def _opened(expanded: frozenset[str]) -> set[str]:
+    # Names of the expanded packages and of their ancestors, which must be expanded too to show them.
+    opened: set[str] = set()
+    for name in expanded:
+        parts = name.split(".")
+        opened.update(".".join(parts[:index]) for index in range(1, len(parts) + 1))
+    return opened
+
+
+class _Columns:
+    """Columns in which dependencies to each node are counted.
+
+    A key contains itself and its descendants, and an `__init__` module also contains its package.
+    This gives the same counts as `row_key.cardinal(to=col_key)` for each cell.
+    """
+
+    def __init__(self, keys: list[Package | Module]) -> None:
+        self._columns: dict[Package | Module, list[int]] = {}
+        self._init_columns: dict[Package, list[int]] = {}
+        for index, key in enumerate(keys):
+            self._columns.setdefault(key, []).append(index)
+            if key.ismodule and key.name == "__init__" and key.package is not None:
+                self._init_columns.setdefault(key.package, []).append(index)
+        self._target_columns: dict[Package | Module, list[int]] = {}
+
+    def __call__(self, target: Package | Module) -> list[int]:
+        cols = self._target_columns.get(target)
+        if cols is None:
+            cols = self._target_columns[target] = list(self._init_columns.get(target, ()))  # type: ignore[arg-type]
+            ancestor: Package | Module | None = target
+            while ancestor is not None:
+                cols.extend(self._columns.get(ancestor, ()))
+                ancestor = ancestor.package
+        return cols
+
+
+def _sources(key: Package | Module) -> list[Module]:
+    # Modules whose dependencies are counted in the row of a key.
+    return [key] if key.ismodule else key.submodules  # type: ignore[list-item,union-attr]
+
+
+def _row_cells(key: Package | Module, columns: _Columns) -> dict[int, int]:
+    # Dependencies are read once, and counted in the columns of the keys containing their target.
+    counts: dict[int, int] = {}
+    for source in _sources(key):
+        for target, _, _ in source._dependency_rows():
+            if isinstance(target, str):
+                continue
+            for col in columns(target):
+                counts[col] = counts.get(col, 0) + 1
+    return counts
+
 
 class Matrix(PrintMixin):
     """Matrix class.
@@ -18,9 +148,18 @@ class Matrix(PrintMixin):
     A class to build a matrix given a list of nodes. After instantiation,
     it has two attributes: data, a 2-dimensions array, and keys, the names
     of the entities in the corresponding order.
+
+    Cells are stored sparsely, as most of them are zeros: `data` is only built
+    when first accessed, and the matrix is printed from its non-zero cells.
     """
 
-    def __init__(self, *nodes: DSM | Package | Module, depth: int = 0):
+    def __init__(
+        self,
+        *nodes: DSM | Package | Module,
+        depth: int = 0,
+        expanded: Iterable[str] = (),
+        collapsed: Iterable[str] = (),
+    ):
         """Initialization method.
 
         Parameters:
@@ -30,56 +169,444 @@ class Matrix(PrintMixin):
                 "A.B.C" and a depth of 1 will return a matrix of size 1,
                 containing A only. To see the matrix for the sub-modules and
                 sub-packages in C, you will have to give depth=4.
+            expanded: Names of packages to show the contents of, whatever the depth.
+            collapsed: Names of packages to show as a single key, whatever the depth.
         """
-        modules: list[Module] = []
-        for node in nodes:
-            if node.ismodule:
-                modules.append(node)  # type: ignore[arg-type]
-            elif node.ispackage or node.isdsm:
-                modules.extend(node.submodules)  # type: ignore[union-attr]
-
-        if depth < 1:
-            keys = modules
-        else:
-            keys = []
-            for module in modules:
-                if module.depth <= depth:
-                    keys.append(module)
+        modules = _submodules(nodes)
+        self.depth = depth
+        """The depth of the matrix."""
+        self.expanded = frozenset(expanded)
+        """The names of the packages expanded whatever the depth."""
+        self.collapsed = frozenset(collapsed)
+        """The names of the packages collapsed whatever the depth."""
+        self._modules = modules
+        self._roots = _roots(nodes)
+        # Number of dependencies to each node, by source module: built on first expansion,
+        # and shared with the matrices derived from this one.
+        self._reverse: dict[Package | Module, dict[Module, int]] | None = None
+
+        key_nodes = _keys(modules, self._key_function())
+        columns = _Columns(key_nodes)
+        self._set(key_nodes, [_row_cells(key, columns) for key in key_nodes])
+
+    def _key_function(self) -> Callable[[Module], Package | Module]:
+        return _key_function(self.depth, self._roots, self.expanded, self.collapsed)
+
+    def _set(self, key_nodes: list[Package | Module], cells: list[dict[int, int]]) -> None:
+        self._key_nodes = key_nodes
+        self.size = len(key_nodes)
+        """The size of the matrix."""
+        self.keys = [key.absolute_name() for key in key_nodes]
+        """The keys of the matrix."""
+        self.cells = cells
+        """The non-zero cells of the matrix: for each row, the values by column index."""
+        self.blocks: list[tuple[int, int]] | None = None
+        """The `(start, stop)` ranges of the blocks of mutually dependent keys, when the keys are sequenced."""
+        self._data: list[list[int]] | None = None
+
+    @property
+    def data(self) -> list[list[int]]:
+        """The data of the matrix, as a list of rows.
+
+        It is built from the non-zero cells when first accessed.
+        Changing its values does not change the cells: assign a new list instead.
+        """
+        if self._data is None:
+            self._data = list(self._dense_rows())
+        return self._data
+
+    @data.setter
+    def data(self, data: list[list[int]]) -> None:
+        self._data = data
+        self.size = len(data)
+        self.cells = [{col: value for col, value in enumerate(line) if value} for line in data]
+
+    def _dense_rows(self) -> Iterator[list[int]]:
+        # Rows are built one at a time, so that printing a matrix does not hold all of them.
+        for cells in self.cells:
+            line = [0] * self.size
+            for col, value in cells.items():
+                line[col] = value
+            yield line
+
+    def iter_cells(self) -> Iterator[tuple[int, int, int]]:
+        """Iterate on the non-zero cells of the matrix, row by row.
+
+        Yields:
+            The row index, column index and value of each cell.
+        """
+        for row, cells in enumerate(self.cells):
+            for col in sorted(cells):
+                yield row, col, cells[col]
+
+    def row_sums(self) -> list[int]:
+        """Return the sum of each row: the number of dependencies from each key.
+
+        Returns:
+            The sums, in the order of the keys.
+        """
+        return [sum(cells.values()) for cells in self.cells]
+
+    def column_sums(self) -> list[int]:
+        """Return the sum of each column: the number of dependencies to each key.
+
+        Returns:
+            The sums, in the order of the keys.
+        """
+        sums = [0] * self.size
+        for cells in self.cells:
+            for col, value in cells.items():
+                sums[col] += value
+        return sums
+
+    def _derive(self, expanded: frozenset[str], collapsed: frozenset[str]) -> Matrix:
+        # New matrix on the same nodes, without keys yet.
+        matrix = Matrix()
+        matrix.depth = self.depth
+        matrix.expanded = expanded
+        matrix.collapsed = collapsed
+        matrix._modules = self._modules
+        matrix._roots = self._roots
+        matrix._reverse = self._reverse
+        return matrix
+
+    def _moved_cells(self, size: int, old_rows: list[int | None]) -> list[dict[int, int]]:
+        # Cells of this matrix moved (or summed) to the row and column given for each old row and column,
+        # or dropped when None is given.
+        cells: list[dict[int, int]] = [{} for _ in range(size)]
+        for row, row_cells in enumerate(self.cells):
+            new_row = old_rows[row]
+            if new_row is None:
+                continue
+            counts = cells[new_row]
+            for col, value in row_cells.items():
+                new_col = old_rows[col]
+                if new_col is not None:
+                    counts[new_col] = counts.get(new_col, 0) + value
+        return cells
+
+    def _reverse_index(self) -> dict[Package | Module, dict[Module, int]]:
+        if self._reverse is None:
+            reverse: dict[Package | Module, dict[Module, int]] = {}
+            for key in self._key_nodes:
+                for source in _sources(key):
+                    for target, _, _ in source._dependency_rows():
+                        if not isinstance(target, str):
+                            counts = reverse.setdefault(target, {})
+                            counts[source] = counts.get(source, 0) + 1
+            self._reverse = reverse
+        return self._reverse
+
+    def _key_node(self, name: str) -> Package | Module:
+        if len(self._key_nodes) != self.size:
+            raise ValueError("Only matrices built from nodes can be expanded or collapsed")
+        try:
+            return self._key_nodes[self.keys.index(name)]
+        except ValueError:
+            raise KeyError(name) from None
+
+    def expand(self, package: str) -> Matrix:
+        """Return a new matrix in which a package is replaced by its contents.
+
+        Only the row of the package is computed again, for each of its sub-modules and sub-packages:
+        the other rows are copied from this matrix, and the column of the package is split
+        using the number of dependencies of each module. This matrix is left unchanged.
+
+        Parameters:
+            package: Name of a package key of this matrix.
+
+        Raises:
+            KeyError: When the package is not a key of this matrix.
+            ValueError: When the key is a module, or when the matrix was not built from nodes.
+
+        Returns:
+            The new matrix, equal to a matrix built from scratch with the package added to `expanded`.
+        """
+        node = self._key_node(package)
+        if not node.ispackage:
+            raise ValueError(f"Cannot expand module {package}")
+        reverse = self._reverse_index()
+        expanded = self.expanded | {package}
+        collapsed = self.collapsed - {package}
+        key_nodes = [key for key in self._key_nodes if key is not node]
+        matrix = self._derive(expanded, collapsed)
+        key_of = matrix._key_function()
+        new_keys = dict.fromkeys(key_of(module) for module in self._modules if module in node)
+        key_nodes = sorted(key_nodes + list(new_keys), key=Matrix._name)
+        positions = {key: index for index, key in enumerate(key_nodes)}
+        cells = self._moved_cells(len(key_nodes), [positions.get(key) for key in self._key_nodes])
+        matrix._set(key_nodes, cells)
+        columns = _Columns(key_nodes)
+        for key in new_keys:
+            cells[positions[key]] = _row_cells(key, columns)
+        # Dependencies from the other keys to the package are split into the columns of its contents.
+        for target, sources in reverse.items():
+            if target is not node and target not in node:
+                continue
+            cols = columns(target)
+            for source, count in sources.items():
+                ancestor: Package | Module | None = source
+                while ancestor is not None and ancestor not in positions:
+                    ancestor = ancestor.package
+                if ancestor is None or ancestor in new_keys:
                     continue
-                package = module.package
-                while package.depth > depth and package.package and package not in nodes:  # type: ignore[union-attr]
-                    package = package.package  # type: ignore[union-attr]
-                if package not in keys:
-                    keys.append(package)  # type: ignore[arg-type]
-
-        size = len(keys)
-        data = [[0] * size for _ in range(size)]
-        keys = sorted(keys, key=lambda key: key.absolute_name())
-
-        if depth < 1:
-            for index, key in enumerate(keys):
-                key.index = index  # type: ignore[attr-defined]
-            for index, key in enumerate(keys):
-                for dep in key.dependencies:
-                    if dep.external:
-                        continue
-                    if dep.target.ismodule and dep.target in keys:  # type: ignore[union-attr]
-                        data[index][dep.target.index] += 1  # type: ignore[index,union-attr]
-                    elif dep.target.ispackage:  # type: ignore[union-attr]
-                        init = dep.target.get("__init__")  # type: ignore[union-attr]
-                        if init is not None and init in keys:
-                            data[index][init.index] += 1  # type: ignore[union-attr]
+                counts = cells[positions[ancestor]]
+                for col in cols:
+                    counts[col] = counts.get(col, 0) + count
+        return matrix
+
+    def collapse(self, package: str) -> Matrix:
+        """Return a new matrix in which the contents of a package are merged into a single key.
+
+        The rows and columns of the keys inside the package are summed: no dependency is read again.
+        This matrix is left unchanged.
+
+        Parameters:
+            package: Name of a package containing keys of this matrix.
+
+        Raises:
+            KeyError: When no key of this matrix is inside the package.
+            ValueError: When the matrix was not built from nodes.
+
+        Returns:
+            The new matrix, equal to a matrix built from scratch with the package added to `collapsed`.
+        """
+        if len(self._key_nodes) != self.size:
+            raise ValueError("Only matrices built from nodes can be expanded or collapsed")
+        prefix = package + "."
+        inner = {index for index, name in enumerate(self.keys) if name.startswith(prefix)}
+        if not inner:
+            raise KeyError(package)
+        node: Package | Module = self._key_nodes[min(inner)]
+        while node.absolute_name() != package:
+            # Packages above the nodes the matrix is built on cannot be collapsed.
+            if node in self._roots or node.package is None:
+                raise KeyError(package)
+            node = node.package
+        expanded = frozenset(name for name in self.expanded if name != package and not name.startswith(prefix))
+        collapsed = frozenset(name for name in self.collapsed if not name.startswith(prefix)) | {package}
+
+        kept = [key for index, key in enumerate(self._key_nodes) if index not in inner]
+        key_nodes = sorted([*kept, node], key=Matrix._name)
+        positions = {key: index for index, key in enumerate(key_nodes)}
+        old_rows: list[int | None] = [
+            positions[node] if index in inner else positions[key] for index, key in enumerate(self._key_nodes)
+        ]
+        matrix = self._derive(expanded, collapsed)
+        matrix._set(key_nodes, self._moved_cells(len(key_nodes), old_rows))
+        return matrix
+
+    @staticmethod
+    def _name(key: Package | Module) -> str:
+        return key.absolute_name()
+
+    def permute(self, order: Sequence[int]) -> Matrix:
+        """Return a new matrix with the keys in another order.
+
+        Parameters:
+            order: The index of the current key to put at each position.
+
+        Raises:
+            ValueError: When the order is not a permutation of the indices of the keys.
+
+        Returns:
+            The new matrix.
+        """
+        if sorted(order) != list(range(self.size)):
+            raise ValueError("The order must contain each index of the keys once")
+        positions = [0] * self.size
+        for position, index in enumerate(order):
+            positions[index] = position
+        cells = [{positions[col]: value for col, value in self.cells[index].items()} for index in order]
+        matrix = self._derive(self.expanded, self.collapsed)
+        matrix._set([self._key_nodes[index] for index in order] if len(self._key_nodes) == self.size else [], cells)
+        matrix.keys = [self.keys[index] for index in order]
+        matrix.size = self.size
+        return matrix
+
+    def sequence(self, *, cluster: bool = False) -> Matrix:
+        """Return a new matrix with the keys ordered in blocks of mutually dependent keys.
+
+        Blocks are the strongly connected components of the dependencies, found in linear time.
+        They are sorted so that each key comes after the keys it depends on, unless they are in the same block:
+        all the cells above the diagonal are in the blocks. Blocks and keys are otherwise kept in their current order.
+
+        Parameters:
+            cluster: Also order the keys of each block so that most of their dependencies are below the diagonal.
+
+        Returns:
+            The new matrix, with the ranges of its blocks in `blocks`.
+        """
+        order, blocks = _sequence(self.cells, cluster=cluster)
+        matrix = self.permute(order)
+        matrix.blocks = blocks
+        return matrix
+
+    def to_array(self) -> array[int]:
+        """Return the data of the matrix as a contiguous buffer of unsigned integers, row after row.
+
+        The array supports the buffer protocol: it can be handed to other libraries without copying it.
+
+        Returns:
+            An array of `size * size` integers.
+        """
+        size = self.size
+        buffer = array("I", bytes(size * size * array("I").itemsize))
+        for row, cells in enumerate(self.cells):
+            for col, value in cells.items():
+                buffer[row * size + col] = value
+        return buffer
+
+    def to_csr(self) -> tuple[array[int], array[int], array[int]]:
+        """Return the non-zero cells of the matrix in compressed sparse row (CSR) format.
+
+        Returns:
+            The offsets of the rows in the two other arrays, the column indexes, and the values.
+        """
+        indptr, indices, values = array("i", [0]), array("i"), array("I")
+        for cells in self.cells:
+            for col in sorted(cells):
+                indices.append(col)
+                values.append(cells[col])
+            indptr.append(len(indices))
+        return indptr, indices, values
+
+    def to_numpy(self) -> np.ndarray:
+        """Return the data of the matrix as a NumPy array.
+
+        The NumPy array shares the memory of the buffer returned by `to_array`, without copying it.
+
+        Returns:
+            A two-dimensions array of unsigned integers.
+        """
+        import numpy as np  # noqa: PLC0415
+
+        buffer = self.to_array()
+        return np.frombuffer(buffer, dtype=f"u{buffer.itemsize}").reshape(self.size, self.size)
+
+    def to_scipy_sparse(self) -> sparse.csr_matrix:
+        """Return the matrix as a SciPy sparse matrix in CSR format, sharing the buffers returned by `to_csr`.
+
+        Returns:
+            A sparse matrix of unsigned integers.
+        """
+        import numpy as np  # noqa: PLC0415
+        from scipy import sparse  # noqa: PLC0415
+
+        indptr, indices, values = self.to_csr()
+        return sparse.csr_matrix(
+            (
+                np.frombuffer(values, dtype=f"u{values.itemsize}"),
+                np.frombuffer(indices, dtype=f"i{indices.itemsize}"),
+                np.frombuffer(indptr, dtype=f"i{indptr.itemsize}"),
+            ),
+            shape=(self.size, self.size),
+        )
+
+    def save(self, path: str | os.PathLike) -> None:
+        """Save the data of the matrix in a NumPy `.npy` file.
+
+        NumPy is not needed to write the file, which can then be read with `numpy.load` or `Matrix.load`.
+        Keys are not saved in the file.
+
+        Parameters:
+            path: Path of the file to write.
+        """
+        buffer = self.to_array()
+        if sys.byteorder == "big":
+            buffer.byteswap()
+        header = repr({"descr": f"<u{buffer.itemsize}", "fortran_order": False, "shape": (self.size, self.size)})
+        # The header is padded with spaces so that data is aligned on 64 bytes, as NumPy does.
+        header += " " * (-(len(_NPY_MAGIC) + 4 + len(header) + 1) % 64) + "\n"
+        with open(path, "wb") as file:
+            file.write(_NPY_MAGIC + b"\x01\x00" + struct.pack("<H", len(header)) + header.encode("latin1"))
+            buffer.tofile(file)
+
+    @staticmethod
+    def load(path: str | os.PathLike, keys: list[str]) -> Matrix:
+        """Load a matrix from a NumPy `.npy` file.
+
+        Square arrays of integers, in C order, are supported. NumPy is not needed to read them.
+
+        Parameters:
+            path: Path of the file to read.
+            keys: The matrix keys.
+
+        Raises:
+            ValueError: When the file is not a supported `.npy` file, or when its size does not match the keys.
+
+        Returns:
+            A new matrix.
+        """
+        with open(path, "rb") as file:
+            content = file.read()
+        if not content.startswith(_NPY_MAGIC):
+            raise ValueError(f"Not a .npy file: {path}")
+        # Version 1 files have a 2-bytes header length, later versions a 4-bytes one.
+        length_format = "<H" if content[len(_NPY_MAGIC)] == 1 else "<I"
+        start = len(_NPY_MAGIC) + 2 + struct.calcsize(length_format)
+        (header_length,) = struct.unpack_from(length_format, content, start - struct.calcsize(length_format))
+        header = ast.literal_eval(content[start : start + header_length].decode("latin1"))
+        descr, shape = header["descr"], header["shape"]
+        typecode = _npy_typecode(descr)
+        if typecode is None or header["fortran_order"] or len(shape) != 2 or shape[0] != shape[1]:  # noqa: PLR2004
+            raise ValueError(f"Unsupported array in {path}: {descr} {shape}, fortran_order={header['fortran_order']}")
+        size = shape[0]
+        if size != len(keys):
+            raise ValueError(f"Matrix of size {size} in {path}, but {len(keys)} keys given")
+        data = array(typecode)
+        data.frombytes(content[start + header_length :][: size * size * data.itemsize])
+        if descr[0] == (">" if sys.byteorder == "little" else "<"):
+            data.byteswap()
+        matrix = Matrix()
+        matrix.keys = list(keys)
+        matrix.size = size
+        matrix.cells = [
+            {col: value for col, value in enumerate(data[row * size : (row + 1) * size]) if value}
+            for row in range(size)
+        ]
+        return matrix
+
+    @staticmethod
+    def from_json(text: str) -> Matrix:
+        """Load a matrix from its JSON output, with rows of data or with sparse cells.
+
+        Parameters:
+            text: The JSON output of a matrix.
+
+        Raises:
+            ValueError: When the JSON document is not a matrix.
+
+        Returns:
+            A new matrix.
+        """
+        document = json.loads(text)
+        if not isinstance(document, dict) or "keys" not in document:
+            raise ValueError("Not the JSON output of a matrix")
+        matrix = Matrix()
+        matrix.keys = list(document["keys"])
+        if "cells" in document:
+            matrix.size = len(matrix.keys)
+            matrix.cells = [{} for _ in matrix.keys]
+            for row, col, value in document["cells"]:
+                matrix.cells[row][col] = value
         else:
-            for row, row_key in enumerate(keys):
-                for col, col_key in enumerate(keys):
-                    data[row][col] = row_key.cardinal(to=col_key)
+            matrix.data = document.get("data", [])
+        return matrix
 
-        self.size = size
-        """The size of the matrix."""
-        self.keys = [key.absolute_name() for key in keys]
-        """The keys of the matrix."""
-        self.data = data
-        """The data of the matrix."""
+    def diff(self, other: Matrix) -> MatrixDiff:
+        """Compare this matrix to another one, matching their keys by name.
+
+        Only the non-zero cells are compared: the time it takes is proportional
+        to the number of dependencies, not to the square of the number of keys.
+
+        Parameters:
+            other: The other (newer) matrix.
+
+        Returns:
+            The differences from this matrix to the other.
+        """
+        return MatrixDiff(self, other)
 
     @staticmethod
     def cast(keys: list[str], data: list[list[int]]) -> Matrix:
@@ -104,24 +631,34 @@ class Matrix(PrintMixin):
         Returns:
             The total number of dependencies.
         """
-        return sum(cell for line in self.data for cell in line)
-
-    def _to_csv(self, **kwargs: Any) -> str:  # noqa: ARG002
-        text = ["module,", ",".join(self.keys)]
-        for index, key in enumerate(self.keys):
-            line = ",".join(map(str, self.data[index]))
-            text.append(f"{key},{line}")
-        return "\n".join(text)
-
-    def _to_json(self, **kwargs: Any) -> str:
-        return json.dumps({"keys": self.keys, "data": self.data}, **kwargs)
-
-    def _to_text(self, **kwargs: Any) -> str:
-        if not self.keys or not self.data:
-            return ""
+        return sum(sum(cells.values()) for cells in self.cells)
+
+    def _iter_csv(self, **kwargs: Any) -> Iterator[str]:  # noqa: ARG002
+        yield "module,\n"
+        yield ",".join(self.keys)
+        for key, line in zip(self.keys, self._dense_rows()):
+            yield f"\n{key},{','.join(map(str, line))}"
+
+    def _iter_json(self, **kwargs: Any) -> Iterator[str]:
+        # The sparse layout lists the non-zero cells as `[row, column, value]` triples.
+        # Sequenced matrices also list the ranges of their blocks.
+        blocks = {} if self.blocks is None else {"blocks": self.blocks}
+        if kwargs.pop("sparse", False):
+            cells = _Stream(self.iter_cells(), sum(map(len, self.cells)))
+            return _iter_json({"keys": self.keys, "cells": cells, **blocks}, **kwargs)
+        data = _Stream(self._dense_rows(), self.size)
+        return _iter_json({"keys": self.keys, "data": data, **blocks}, **kwargs)
+
+    def _iter_text(self, **kwargs: Any) -> Iterator[str]:
+        if not self.keys or not self.cells:
+            yield ""
+            return
         zero = kwargs.pop("zero", "0")
         max_key_length = max(len(key) for key in [*self.keys, "Module"])
-        max_dep_length = max([len(str(col)) for line in self.data for col in line] + [len(zero)])
+        max_dep_length = max((len(str(value)) for cells in self.cells for value in cells.values()), default=0)
+        if sum(map(len, self.cells)) < self.size * self.size:
+            max_dep_length = max(max_dep_length, len("0"))
+        max_dep_length = max(max_dep_length, len(zero))
         key_col_length = len(str(len(self.keys)))
         key_line_length = max(key_col_length, 2)
         column_length = max(key_col_length, max_dep_length)
@@ -129,26 +666,132 @@ class Matrix(PrintMixin):
         reset = Style.RESET_ALL
 
         # first line left headers
-        text = [f"\n {bold}{'Module':>{max_key_length}}{reset} │ {bold}{'Id':>{key_line_length}}{reset} │"]
+        yield f"\n {bold}{'Module':>{max_key_length}}{reset} │ {bold}{'Id':>{key_line_length}}{reset} │"
         # first line column headers
-        for index, _ in enumerate(self.keys):
-            text.append(f"{bold}{index:^{column_length}}{reset}│")
-        text.append("\n")
+        yield "".join(f"{bold}{index:^{column_length}}{reset}│" for index in range(len(self.keys)))
+        yield "\n"
         # line of dashes
-        text.append(f" {'─' * max_key_length}─┼─{'─' * key_line_length}─┼")
-        for _ in range(len(self.keys) - 1):
-            text.append(f"{'─' * column_length}┼")
-        text.append(f"{'─' * column_length}┤")
-        text.append("\n")
-        # lines
-        for index, key in enumerate(self.keys):
-            text.append(f" {key:>{max_key_length}} │ {bold}{index:>{key_line_length}}{reset} │")
-            for value in self.data[index]:
-                text.append(f"{value if value else zero:>{column_length}}│")
-            text.append("\n")
-        text.append("\n")
-
-        return "".join(text)
+        yield f" {'─' * max_key_length}─┼─{'─' * key_line_length}─┼"
+        yield f"{'─' * column_length}┼" * (len(self.keys) - 1)
+        yield f"{'─' * column_length}┤"
+        yield "\n"
+        # lines, one at a time
+        for index, (key, line) in enumerate(zip(self.keys, self._dense_rows())):
+            cells = "".join(f"{value if value else zero:>{column_length}}│" for value in line)
+            yield f" {key:>{max_key_length}} │ {bold}{index:>{key_line_length}}{reset} │{cells}\n"
+        yield "\n"
+
+
+class MatrixDiff(PrintMixin):
+    """Differences between two matrices, whose keys are matched by name.
+
+    Edges are the non-zero cells of the matrices: the number of dependencies from a key to another.
+    """
+
+    def __init__(self, old: Matrix, new: Matrix) -> None:
+        """Initialization method.
+
+        Parameters:
+            old: The old matrix.
+            new: The new matrix.
+        """
+        old_keys = set(old.keys)
+        new_keys = set(new.keys)
+        self.added_keys = sorted(new_keys - old_keys)
+        """The keys only in the new matrix."""
+        self.removed_keys = sorted(old_keys - new_keys)
+        """The keys only in the old matrix."""
+        # Cells are matched by the names of their keys, the old ones left unmatched are removed.
+        old_edges = {(old.keys[row], old.keys[col]): value for row, col, value in old.iter_cells()}
+        added_edges: dict[tuple[str, str], int] = {}
+        changed_edges: dict[tuple[str, str], tuple[int, int]] = {}
+        for row, col, value in new.iter_cells():
+            edge = (new.keys[row], new.keys[col])
+            old_value = old_edges.pop(edge, 0)
+            if not old_value:
+                added_edges[edge] = value
+            elif old_value != value:
+                changed_edges[edge] = (old_value, value)
+        self.added_edges = added_edges
+        """The edges only in the new matrix, with their value."""
+        self.removed_edges = old_edges
+        """The edges only in the old matrix, with their value."""
+        self.changed_edges = changed_edges
+        """The edges in both matrices, with their old and new values, when they differ."""
+
+        # A cycle is new when its keys were not all in the same cycle of the old matrix.
+        old_cycles: dict[str, int] = {}
+        for number, cycle in enumerate(_cycles(old)):
+            for key in cycle:
+                old_cycles[key] = number
+        new_cycles = []
+        for cycle in _cycles(new):
+            old_number = old_cycles.get(cycle[0])
+            if old_number is None or any(old_cycles.get(key) != old_number for key in cycle):
+                new_cycles.append(cycle)
+        self.new_cycles = new_cycles
+        """The cycles of the new matrix that are not in the old one, as sorted lists of keys."""
+
+    def __bool__(self) -> bool:
+        return bool(
+            self.added_keys
+            or self.removed_keys
+            or self.added_edges
+            or self.removed_edges
+            or self.changed_edges
+            or self.new_cycles,
+        )
+
+    def _iter_text(self, **kwargs: Any) -> Iterator[str]:  # noqa: ARG002
+        for key in self.added_keys:
+            yield f"+ {key}\n"
+        for key in self.removed_keys:
+            yield f"- {key}\n"
+        for (source, target), value in self.added_edges.items():
+            yield f"+ {source} -> {target} ({value})\n"
+        for (source, target), value in self.removed_edges.items():
+            yield f"- {source} -> {target} ({value})\n"
+        for (source, target), (old_value, new_value) in self.changed_edges.items():
+            yield f"~ {source} -> {target} ({old_value} -> {new_value})\n"
+        for cycle in self.new_cycles:
+            yield f"! cycle: {', '.join(cycle)}\n"
+
+    def _iter_csv(self, **kwargs: Any) -> Iterator[str]:
+        header = kwargs.pop("header", True)
+        yield "change,source,target,old,new\n" if header else ""
+        for key in self.added_keys:
+            yield f"added_key,{key},,,\n"
+        for key in self.removed_keys:
+            yield f"removed_key,{key},,,\n"
+        for (source, target), value in self.added_edges.items():
+            yield f"added_edge,{source},{target},0,{value}\n"
+        for (source, target), value in self.removed_edges.items():
+            yield f"removed_edge,{source},{target},{value},0\n"
+        for (source, target), (old_value, new_value) in self.changed_edges.items():
+            yield f"changed_edge,{source},{target},{old_value},{new_value}\n"
+        for number, cycle in enumerate(self.new_cycles):
+            for key in cycle:
+                yield f"new_cycle,{key},,{number},\n"
+
+    def _iter_json(self, **kwargs: Any) -> Iterator[str]:
+        return _iter_json(
+            {
+                "added_keys": self.added_keys,
+                "removed_keys": self.removed_keys,
+                "added_edges": [[*edge, value] for edge, value in self.added_edges.items()],
+                "removed_edges": [[*edge, value] for edge, value in self.removed_edges.items()],
+                "changed_edges": [[*edge, *values] for edge, values in self.changed_edges.items()],
+                "new_cycles": self.new_cycles,
+            },
+            **kwargs,
+        )
+
+
+def _cycles(matrix: Matrix) -> list[list[str]]:
+    # Keys of the blocks of mutually dependent keys, when there are several keys in a block.
+    successors = [[col for col in cells if col != row] for row, cells in enumerate(matrix.cells)]
+    components = _strong_components(successors)
+    return sorted(sorted(matrix.keys[index] for index in component) for component in components if len(component) > 1)
 
 
 class TreeMap(PrintMixin):
@@ -187,19 +830,21 @@ class TreeMap(PrintMixin):
         self.value = value
         """The value of the current area."""
 
-    def _to_csv(self, **kwargs: Any) -> str:  # noqa: ARG002
-        return ""
+    def _iter_csv(self, **kwargs: Any) -> Iterator[str]:  # noqa: ARG002
+        yield ""
 
-    def _to_json(self, **kwargs: Any) -> str:  # noqa: ARG002
-        return ""
+    def _iter_json(self, **kwargs: Any) -> Iterator[str]:  # noqa: ARG002
+        yield ""
 
-    def _to_text(self, **kwargs: Any) -> str:  # noqa: ARG002
-        return ""
+    def _iter_text(self, **kwargs: Any) -> Iterator[str]:  # noqa: ARG002
+        yield ""
 
 
 class Vertex:
     """Vertex class. Used in Graph class."""
 
+    __slots__ = ("_in", "_out", "id", "name")
+
     def __init__(self, name: str) -> None:
         """Initialization method.
 
@@ -208,10 +853,21 @@ class Vertex:
         """
         self.name = name
         """Name of the vertex."""
-        self.edges_in: set[Edge] = set()
-        """Incoming edges."""
-        self.edges_out: set[Edge] = set()
-        """Outgoing edges."""
+        self.id = next(_VERTEX_IDS)
+        """Unique identifier of the vertex."""
+        # Incoming and outgoing edges by identifier of the vertex at their other end.
+        self._in: dict[int, Edge] = {}
+        self._out: dict[int, Edge] = {}
+
+    @property
+    def edges_in(self) -> frozenset[Edge]:
+        """Incoming edges (read-only: use `connect_from` and `Edge.go_in` to change them)."""
+        return frozenset(self._in.values())
+
+    @property
+    def edges_out(self) -> frozenset[Edge]:
+        """Outgoing edges (read-only: use `connect_to` and `Edge.go_from` to change them)."""
+        return frozenset(self._out.values())
 
     def __str__(self):
         return self.name
@@ -224,12 +880,12 @@ class Vertex:
             weight: Weight of the edge.
 
         Returns:
-            The newly created edge.
+            The newly created edge, or the existing one.
         """
-        for edge in self.edges_out:
-            if vertex == edge.vertex_in:
-                return edge
-        return Edge(self, vertex, weight)
+        edge = self._out.get(vertex.id)
+        if edge is None:
+            edge = Edge(self, vertex, weight)
+        return edge
 
     def connect_from(self, vertex: Vertex, weight: int = 1) -> Edge:
         """Connect another vertex to this one.
@@ -239,17 +895,19 @@ class Vertex:
             weight: Weight of the edge.
 
         Returns:
-            The newly created edge.
+            The newly created edge, or the existing one.
         """
-        for edge in self.edges_in:
-            if vertex == edge.vertex_out:
-                return edge
-        return Edge(vertex, self, weight)
+        edge = self._in.get(vertex.id)
+        if edge is None:
+            edge = Edge(vertex, self, weight)
+        return edge
 
 
 class Edge:
     """Edge class. Used in Graph class."""
 
+    __slots__ = ("vertex_in", "vertex_out", "weight")
+
     def __init__(self, vertex_out: Vertex, vertex_in: Vertex, weight: int = 1) -> None:
         """Initialization method.
 
@@ -258,14 +916,14 @@ class Edge:
             vertex_in (Vertex): target vertex (edge going in).
             weight (int): weight of the edge.
         """
-        self.vertex_out: Vertex | None = None
+        self.vertex_out: Vertex | None = vertex_out
         """Outgoing vertex."""
-        self.vertex_in: Vertex | None = None
+        self.vertex_in: Vertex | None = vertex_in
         """Incoming vertex."""
         self.weight = weight
         """Weight of the edge."""
-        self.go_from(vertex_out)
-        self.go_in(vertex_in)
+        vertex_out._out[vertex_in.id] = self
+        vertex_in._in[vertex_out.id] = self
 
     def __str__(self):
         return f"{self.vertex_out.name} --{self.weight}--> {self.vertex_in.name}"
@@ -276,10 +934,9 @@ class Edge:
         Parameters:
             vertex (Vertex): vertex to go from.
         """
-        if self.vertex_out:
-            self.vertex_out.edges_out.remove(self)
+        self._unindex()
         self.vertex_out = vertex
-        vertex.edges_out.add(self)
+        self._index()
 
     def go_in(self, vertex: Vertex) -> None:
         """Tell the edge to go into this vertex.
@@ -287,10 +944,21 @@ class Edge:
         Parameters:
             vertex (Vertex): vertex to go into.
         """
-        if self.vertex_in:
-            self.vertex_in.edges_in.remove(self)
+        self._unindex()
         self.vertex_in = vertex
-        vertex.edges_in.add(self)
+        self._index()
+
+    def _index(self) -> None:
+        if self.vertex_out is not None and self.vertex_in is not None:
+            self.vertex_out._out[self.vertex_in.id] = self
+            self.vertex_in._in[self.vertex_out.id] = self
+
+    def _unindex(self) -> None:
+        if self.vertex_out is not None and self.vertex_in is not None:
+            if self.vertex_out._out.get(self.vertex_in.id) is self:
+                del self.vertex_out._out[self.vertex_in.id]
+            if self.vertex_in._in.get(self.vertex_out.id) is self:
+                del self.vertex_in._in[self.vertex_out.id]
 
 
 class Graph(PrintMixin):
@@ -304,48 +972,45 @@ class Graph(PrintMixin):
     def __init__(self, *nodes: DSM | Package | Module, depth: int = 0) -> None:
         """Initialization method.
 
-        An intermediary matrix is built to ease the creation of the graph.
+        The graph is built from the dependencies, read once: it has the same vertices and edges
+        as the non-zero cells of the matrix of the same nodes and depth.
 
         Parameters:
             *nodes (list of DSM/Package/Module):
                 the nodes on which to build the graph.
-            depth (int): the depth of the intermediary matrix. See
+            depth (int): the depth of the graph. See
                 the documentation for Matrix class.
         """
         self.edges = set()
         """Set of edges in the graph."""
-        vertices = []
-        matrix = Matrix(*nodes, depth=depth)
-        for key in matrix.keys:
-            vertices.append(Vertex(key))
-        for line_index, line in enumerate(matrix.data):
-            for col_index, cell in enumerate(line):
-                if cell > 0:
-                    self.edges.add(Edge(vertices[line_index], vertices[col_index], weight=cell))
+        keys = _keys(_submodules(nodes), _key_function(depth, _roots(nodes)))
+        vertices = [Vertex(key.absolute_name()) for key in keys]
+        columns = _Columns(keys)
+        for vertex, key in zip(vertices, keys):
+            for col, value in _row_cells(key, columns).items():
+                if value > 0:
+                    self.edges.add(Edge(vertex, vertices[col], weight=value))
         self.vertices = set(vertices)
         """Set of vertices in the graph."""
 
-    def _to_csv(self, **kwargs: Any) -> str:
+    def _iter_csv(self, **kwargs: Any) -> Iterator[str]:
         header = kwargs.pop("header", True)
-        text = ["vertex_out,edge_weight,vertex_in\n" if header else ""]
+        yield "vertex_out,edge_weight,vertex_in\n" if header else ""
         for edge in self.edges:
-            text.append(f"{edge.vertex_out.name},{edge.weight},{edge.vertex_in.name}\n")  # type: ignore[union-attr]
+            yield f"{edge.vertex_out.name},{edge.weight},{edge.vertex_in.name}\n"  # type: ignore[union-attr]
         for vertex in self.vertices:
-            if not (vertex.edges_out or vertex.edges_in):
-                text.append("{vertex.name},,\n")
-        return "".join(text)
+            if not (vertex._out or vertex._in):
+                yield "{vertex.name},,\n"
 
-    def _to_json(self, **kwargs: Any) -> str:
-        return json.dumps(
-            {
-                "vertices": [vertex.name for vertex in self.vertices],
-                "edges": [
-                    {"out": edge.vertex_out.name, "weight": edge.weight, "in": edge.vertex_in.name}  # type: ignore[union-attr]
-                    for edge in self.edges
-                ],
-            },
+    def _iter_json(self, **kwargs: Any) -> Iterator[str]:
+        edges = (
+            {"out": edge.vertex_out.name, "weight": edge.weight, "in": edge.vertex_in.name}  # type: ignore[union-attr]
+            for edge in self.edges
+        )
+        return _iter_json(
+            {"vertices": [vertex.name for vertex in self.vertices], "edges": _Stream(edges, len(self.edges))},
             **kwargs,
         )
 
-    def _to_text(self, **kwargs: Any) -> str:  # noqa: ARG002
-        return ""
+    def _iter_text(self, **kwargs: Any) -> Iterator[str]:  # noqa: ARG002
+        yield ""
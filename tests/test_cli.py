@@ -2,10 +2,19 @@
 
 from __future__ import annotations
 
+import os
+import shutil
+from typing import TYPE_CHECKING
+from unittest.mock import patch
+
 import pytest
 
 from dependenpy import main
 from dependenpy._internal import debug
+from tests import FIXTURES_DIR
+
+if TYPE_CHECKING:
+    from pathlib import Path
 
 
 def test_main() -> None:
@@ -52,3 +61,55 @@ def test_show_debug_info(capsys: pytest.CaptureFixture) -> None:
     assert "system" in captured
     assert "environment" in captured
     assert "packages" in captured
+
+
+def test_watch(tmp_path: Path, capsys: pytest.CaptureFixture) -> None:
+    """Watch modules and print the matrix again after a change.
+
+    Parameters:
+        tmp_path: Pytest fixture providing a temporary directory.
+        capsys: Pytest fixture to capture output.
+    """
+    internal = tmp_path / "internal"
+    shutil.copytree(FIXTURES_DIR / "internal", internal, ignore=shutil.ignore_patterns("__pycache__"))
+    sleeps = 0
+
+    def sleep(seconds: float) -> None:  # noqa: ARG001
+        nonlocal sleeps
+        sleeps += 1
+        if sleeps == 1:
+            internal.joinpath("module_b.py").write_text("from . import module_a\n")
+        elif sleeps == 3:
+            raise KeyboardInterrupt
+
+    with patch("dependenpy._internal.cli.time.sleep", sleep):
+        assert main(["--watch", "0", str(internal)]) == 0
+    captured = capsys.readouterr()
+    assert captured.out.count("Module") == 2
+    assert "module_b" in captured.out
+    assert "Updated in" in captured.err
+    assert "(1 added, 0 changed, 0 removed)" in captured.err
+
+
+def test_cache_eviction(tmp_path: Path) -> None:
+    """Test that caches of the command line are pruned at most once an hour, by default and with the given limits.
+
+    Arguments:
+        tmp_path: Pytest fixture providing a temporary directory.
+    """
+    cache_dir = tmp_path / "cache"
+    package = str(FIXTURES_DIR / "internal")
+    output = str(tmp_path / "output.txt")
+    assert main([package, "--cache-dir", str(cache_dir), "-o", output]) == 0
+    entries = list(cache_dir.glob("*/*.json"))
+    assert entries
+    with patch("dependenpy._internal.dsm.ParseCache.prune", autospec=True) as prune:
+        assert main([package, "--cache-dir", str(cache_dir), "-o", output]) == 0
+        assert not prune.called
+        os.utime(cache_dir / "last-prune", (0, 0))
+        assert main([package, "--cache-dir", str(cache_dir), "-o", output]) == 0
+    assert prune.call_args[0][0].max_age == 30 * 86400
+    assert prune.call_args[0][0].max_size == 100 * 2**20
+    os.utime(cache_dir / "last-prune", (0, 0))
+    assert main([package, "--cache-dir", str(cache_dir), "--cache-max-size", "0.000001", "-o", output]) == 0
+    assert not list(cache_dir.glob("*/*.json"))
@@ -2,10 +2,35 @@
 
 from __future__ import annotations
 
+import compileall
+import importlib.util
+import io
+import json
+import os
+import py_compile
+import shutil
+import subprocess
+import sys
+import tarfile
+import zipfile
+from typing import TYPE_CHECKING
+from unittest.mock import Mock, patch
+
 import pytest
 
+from dependenpy._internal.archives import _ARCHIVES, _MAX_ARCHIVES, _archive_member, _read_bytes
+from dependenpy._internal.cache import ParseCache
 from dependenpy._internal.cli import main
 from dependenpy._internal.dsm import DSM
+from dependenpy._internal.finder import Finder, InstalledPackageFinder
+from dependenpy._internal.helpers import _iter_json, _Stream
+from dependenpy._internal.parsing import _parse_source, _prefetch, _read_bytecode_imports, _scan_source
+from dependenpy._internal.sequencing import _sequence
+from dependenpy._internal.structures import Graph, Matrix, Vertex
+from tests import FIXTURES_DIR
+
+if TYPE_CHECKING:
+    from pathlib import Path
 
 
 @pytest.mark.parametrize(
@@ -50,6 +75,325 @@ def test_tree() -> None:
         assert dsm.get(item)
 
 
+def test_absolute_names() -> None:
+    """Test the absolute names of nodes, truncated at each depth, and that they are computed once."""
+    dsm = DSM("internal")
+    module_i = dsm["internal.subpackage_a.subpackage_1.module_i"]
+    assert module_i.depth == 4
+    assert module_i.absolute_name() == "internal.subpackage_a.subpackage_1.module_i"
+    assert module_i.absolute_name(depth=2) == "internal.subpackage_a"
+    assert module_i.absolute_name(depth=5) == module_i.absolute_name(depth=0)
+    assert module_i.absolute_name() is module_i.absolute_name()
+    assert module_i.absolute_name(depth=3) is dsm["internal.subpackage_a.subpackage_1"].absolute_name()
+
+
+@pytest.mark.parametrize("depth", [0, 1, 2, 3, 4])
+def test_matrix_cells(depth: int) -> None:
+    """Test that each cell of a matrix counts the dependencies from its row key to its column key.
+
+    Arguments:
+        depth: Depth of the matrix.
+    """
+    dsm = DSM("internal")
+    matrix = dsm.as_matrix(depth=depth)
+    keys = [dsm[key] for key in matrix.keys]
+    assert any(any(row) for row in matrix.data)
+    assert matrix.data == [[row_key.cardinal(to=col_key) for col_key in keys] for row_key in keys]
+
+
+def test_drill_down_matrix() -> None:
+    """Test that expanding and collapsing packages gives the same matrices as building them with these packages."""
+    dsm = DSM("internal")
+    matrix = dsm.as_matrix(depth=1)
+    assert Matrix(dsm, depth=1, expanded=["internal.subpackage_a"], collapsed=["internal"]).keys == matrix.keys
+    expanded = matrix.expand("internal").expand("internal.subpackage_a")
+    assert matrix.keys == ["internal"]
+    assert expanded.expanded == {"internal", "internal.subpackage_a"}
+    assert "internal.subpackage_a.subpackage_1" in expanded.keys
+    built = dsm.as_matrix(depth=1, expanded=expanded.expanded)
+    assert expanded.keys == built.keys
+    assert expanded.cells == built.cells
+    keys = [dsm[key] for key in expanded.keys]
+    assert expanded.data == [[row_key.cardinal(to=col_key) for col_key in keys] for row_key in keys]
+    collapsed = expanded.collapse("internal.subpackage_a")
+    assert collapsed.cells == Matrix(dsm, depth=1, expanded=["internal"]).cells
+    assert collapsed.collapse("internal").cells == matrix.cells
+    with pytest.raises(KeyError):
+        matrix.expand("internal.subpackage_a")
+    with pytest.raises(ValueError, match="module"):
+        expanded.expand("internal.module_a")
+
+
+@pytest.mark.parametrize("cluster", [False, True])
+def test_sequence_matrix(cluster: bool) -> None:
+    """Test that sequenced matrices only have dependencies above the diagonal within blocks.
+
+    Arguments:
+        cluster: Whether to order keys within blocks.
+    """
+    dsm = DSM("internal")
+    matrix = dsm.as_matrix(depth=0)
+    sequenced = matrix.sequence(cluster=cluster)
+    assert sorted(sequenced.keys) == matrix.keys
+    assert sequenced.blocks is not None
+    assert [stop for _, stop in sequenced.blocks][-1] == sequenced.size
+    block_of = {index: block for block, (start, stop) in enumerate(sequenced.blocks) for index in range(start, stop)}
+    for row, col, _ in sequenced.iter_cells():
+        assert col <= row or block_of[row] == block_of[col]
+    keys = [dsm[key] for key in sequenced.keys]
+    assert sequenced.data == [[row_key.cardinal(to=col_key) for col_key in keys] for row_key in keys]
+    assert json.loads(sequenced._to_json())["blocks"] == [list(block) for block in sequenced.blocks]
+    assert matrix.permute(range(matrix.size)[::-1]).keys == matrix.keys[::-1]
+
+
+def test_strong_components() -> None:
+    """Test that long chains and cycles are sequenced without recursion."""
+    size = sys.getrecursionlimit() * 2
+    chain = [{index + 1: 1} for index in range(size - 1)] + [{}]
+    order, blocks = _sequence(chain)
+    assert order == list(range(size))[::-1]
+    assert len(blocks) == size
+    cycle = [*chain[:-1], {0: 1}]
+    assert _sequence(cycle) == (list(range(size)), [(0, size)])
+
+
+def test_cluster_large_cycle() -> None:
+    """Test that keys of a large cycle are clustered in linear time, breaking the cycle only once."""
+    size = 100_000
+    cycle = [{(index + 1) % size: 1} for index in range(size)]
+    order, blocks = _sequence(cycle, cluster=True)
+    assert blocks == [(0, size)]
+    assert sorted(order) == list(range(size))
+    position = {key: index for index, key in enumerate(order)}
+    assert sum(position[col] > position[row] for row, cells in enumerate(cycle) for col in cells) == 1
+
+
+@pytest.mark.parametrize("format", ["csv", "json", "text"])
+def test_streamed_output(format: str) -> None:  # noqa: A002
+    """Test that printing writes the same output as the renderings, by batches.
+
+    Arguments:
+        format: Output format.
+    """
+    dsm = DSM("internal")
+    matrix = dsm.as_matrix(depth=0)
+    for obj, kwargs in ((dsm, {}), (matrix, {}), (matrix.sequence(), {"indent": 2}), (dsm.as_graph(depth=0), {})):
+        output = io.StringIO()
+        obj.print(format=format, output=output, **kwargs)
+        assert output.getvalue() == getattr(obj, f"_to_{format}")(**kwargs) + "\n"
+    assert dsm._to_json(indent="\t", sort_keys=True) == json.dumps(dsm.as_dict(), indent="\t", sort_keys=True)
+    # Names looking like anything the encoder could use internally are written as they are.
+    name = "\x00dependenpy-stream-0\x00"
+    expected = {name: [{name: [1, {"a": 2}]}, {}], "b": {"c": [], name: [name]}}
+    for kwargs in ({}, {"indent": 2}, {"indent": "\t", "sort_keys": True}, {"separators": (",", ":")}):
+        obj = {name: _Stream(iter(expected[name]), 2), "b": {"c": _Stream(iter([]), 0), name: [name]}}
+        assert "".join(_iter_json(obj, **kwargs)) == json.dumps(expected, **kwargs)
+    writes = []
+    with patch("dependenpy._internal.helpers._BUFFER_SIZE", 1):
+        matrix.print(format=format, output=Mock(write=writes.append))
+    assert len(writes) > matrix.size
+
+
+def test_matrix_diff() -> None:
+    """Test that matrices are compared by key names, with their added and removed keys and edges, and new cycles."""
+    old = Matrix.cast(["a", "b", "c"], [[0, 1, 0], [0, 0, 2], [0, 0, 0]])
+    new = Matrix.cast(["a", "c", "d"], [[0, 1, 3], [0, 0, 4], [0, 5, 0]])
+    diff = old.diff(new)
+    assert diff.added_keys == ["d"]
+    assert diff.removed_keys == ["b"]
+    assert diff.added_edges == {("a", "c"): 1, ("a", "d"): 3, ("c", "d"): 4, ("d", "c"): 5}
+    assert diff.removed_edges == {("a", "b"): 1, ("b", "c"): 2}
+    assert diff.changed_edges == {}
+    assert diff.new_cycles == [["c", "d"]]
+    assert not new.diff(Matrix.from_json(new._to_json()))
+    assert not new.diff(Matrix.from_json(new._to_json(sparse=True)))
+    changed = new.diff(Matrix.cast(new.keys, [[0, 2, 3], [0, 0, 4], [0, 5, 0]]))
+    assert changed.changed_edges == {("a", "c"): (1, 2)}
+    assert not changed.new_cycles
+    assert json.loads(changed._to_json())["changed_edges"] == [["a", "c", 1, 2]]
+    assert changed._to_csv() == "change,source,target,old,new\nchanged_edge,a,c,1,2\n"
+    with pytest.raises(ValueError, match="matrix"):
+        Matrix.from_json("[]")
+
+
+def test_dsm_diff(tmp_path: Path) -> None:
+    """Test comparing the modules of two trees, and the JSON outputs of their matrices on the command line.
+
+    Arguments:
+        tmp_path: A temporary path.
+    """
+    internal = tmp_path / "internal"
+    shutil.copytree(FIXTURES_DIR / "internal", internal)
+    old = DSM(str(internal))
+    (internal / "module_b.py").write_text("from . import module_a\n")
+    (internal / "module_a.py").write_text("from . import module_b\n")
+    new = DSM(str(internal))
+    diff = old.diff(new)
+    assert diff.added_keys == ["internal.module_b"]
+    assert ["internal.module_a", "internal.module_b"] in diff.new_cycles
+    with (tmp_path / "old.json").open("w") as old_json, (tmp_path / "new.json").open("w") as new_json:
+        old.print_matrix(format="json", output=old_json, depth=0)
+        new.print_matrix(format="json", output=new_json, depth=0, sparse=True)
+    output = tmp_path / "diff.json"
+    assert main(["diff", str(tmp_path / "old.json"), str(tmp_path / "new.json"), "-f", "json", "-o", str(output)]) == 0
+    assert json.loads(output.read_text())["new_cycles"] == diff.new_cycles
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+@pytest.mark.parametrize("directory", ["repo", "repo/src", "outside"])
+def test_diff_revision(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture,
+    directory: str,
+) -> None:
+    """Test comparing a git revision with the packages on disk, from anywhere in or outside the repository.
+
+    Arguments:
+        tmp_path: A temporary path.
+        monkeypatch: Pytest fixture to change the current directory.
+        capsys: Pytest fixture to capture output.
+        directory: Directory to run the command from.
+    """
+    repo = tmp_path / "repo"
+    package = repo / "src" / "pk"
+    package.mkdir(parents=True)
+    (package / "__init__.py").write_text("")
+    (package / "a.py").write_text("")
+    (package / "b.py").write_text("from pk import a\n")
+    outside = tmp_path / "outside" / "other"
+    outside.mkdir(parents=True)
+    (outside / "__init__.py").write_text("")
+
+    def git(*args: str) -> None:
+        subprocess.run(  # noqa: S603
+            ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],  # noqa: S607
+            cwd=repo,
+            capture_output=True,
+            check=True,
+        )
+
+    git("init", "-q")
+    git("add", ".")
+    git("commit", "-q", "-m", "initial")
+    (package / "a.py").write_text("from pk import b\n")
+    monkeypatch.chdir(tmp_path / directory)
+    output = tmp_path / "diff.json"
+    path = os.path.relpath(package)
+    assert main(["diff", "HEAD", "-p", path, "-f", "json", "-o", str(output)]) == 0
+    diff = json.loads(output.read_text())
+    assert diff["added_edges"] == [["pk.a", "pk.b", 1]]
+    assert diff["new_cycles"] == [["pk.a", "pk.b"]]
+    assert main(["diff", "-p", path, "--", "--output=x"]) == 2
+    capsys.readouterr()
+    assert main(["diff", "HEAD", "-p", path, os.path.relpath(outside)]) == 2
+    assert "is outside the repository" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("depth", [0, 2])
+def test_graph(depth: int) -> None:
+    """Test that graphs have an edge for each non-zero cell of the matrix, and that their edges are indexed.
+
+    Arguments:
+        depth: Depth of the graph.
+    """
+    dsm = DSM("internal")
+    graph = Graph(dsm, depth=depth)
+    matrix = Matrix(dsm, depth=depth)
+    edges = {(edge.vertex_out.name, edge.vertex_in.name): edge.weight for edge in graph.edges}  # type: ignore[union-attr]
+    assert edges == {(matrix.keys[row], matrix.keys[col]): value for row, col, value in matrix.iter_cells()}
+    assert {vertex.name for vertex in graph.vertices} == set(matrix.keys)
+    for vertex in graph.vertices:
+        for edge in vertex.edges_out:
+            assert vertex.connect_to(edge.vertex_in) is edge  # type: ignore[arg-type]
+            assert edge in edge.vertex_in.edges_in  # type: ignore[union-attr]
+
+    source, target, other = Vertex("source"), Vertex("target"), Vertex("other")
+    edge = source.connect_to(target, weight=2)
+    assert target.connect_from(source) is edge
+    edge.go_in(other)
+    assert target.edges_in == set()
+    assert source.edges_out == other.edges_in == {edge}
+    assert source.connect_to(other) is edge
+    assert source.connect_to(target) is not edge
+    with pytest.raises(AttributeError):
+        source.edges_out.discard(edge)  # type: ignore[attr-defined]
+
+
+def test_sparse_matrix() -> None:
+    """Test that matrices are printed from their non-zero cells, and only build their dense data on access."""
+    matrix = Matrix(DSM("internal"), depth=3)
+    sparse = json.loads(matrix._to_json(sparse=True))
+    dense = json.loads(matrix._to_json())
+    matrix._to_csv()
+    matrix._to_text()
+    assert matrix._data is None
+    assert matrix.total == sum(value for _, _, value in sparse["cells"]) == sum(map(sum, dense["data"]))
+    for row, col, value in sparse["cells"]:
+        assert dense["data"][row][col] == value
+    assert matrix.data == dense["data"]
+    assert Matrix.cast(matrix.keys, matrix.data).cells == matrix.cells
+
+
+def test_matrix_buffers(tmp_path: Path) -> None:
+    """Test exporting matrices to typed buffers, and saving and loading them in `.npy` files.
+
+    Arguments:
+        tmp_path: Pytest fixture providing a temporary directory.
+    """
+    matrix = Matrix(DSM("internal"), depth=3)
+    size = matrix.size
+    buffer = matrix.to_array()
+    assert memoryview(buffer).nbytes == size * size * buffer.itemsize
+    assert [buffer[row * size : (row + 1) * size].tolist() for row in range(size)] == matrix.data
+    indptr, indices, values = matrix.to_csr()
+    assert list(zip(indices, values)) == [(col, value) for _, col, value in matrix.iter_cells()]
+    assert [indptr[row + 1] - indptr[row] for row in range(size)] == [len(cells) for cells in matrix.cells]
+    assert matrix.row_sums() == [sum(row) for row in matrix.data]
+    assert matrix.column_sums() == [sum(column) for column in zip(*matrix.data)]
+    path = tmp_path / "matrix.npy"
+    matrix.save(path)
+    assert (path.stat().st_size - memoryview(buffer).nbytes) % 64 == 0  # aligned header
+    loaded = Matrix.load(path, matrix.keys)
+    assert loaded.keys == matrix.keys
+    assert loaded.data == matrix.data
+    with pytest.raises(ValueError, match="keys"):
+        Matrix.load(path, matrix.keys[1:])
+
+
+def test_matrix_numpy(tmp_path: Path) -> None:
+    """Test sharing matrices with NumPy and SciPy.
+
+    Arguments:
+        tmp_path: Pytest fixture providing a temporary directory.
+    """
+    np = pytest.importorskip("numpy")
+    matrix = Matrix(DSM("internal"), depth=3)
+    array = matrix.to_numpy()
+    assert array.tolist() == matrix.data
+    assert array.sum(axis=0).tolist() == matrix.column_sums()
+    matrix.save(tmp_path / "matrix.npy")
+    assert np.array_equal(np.load(tmp_path / "matrix.npy"), array)
+    np.save(tmp_path / "int64.npy", array.astype(">i8"))
+    assert Matrix.load(tmp_path / "int64.npy", matrix.keys).data == matrix.data
+    pytest.importorskip("scipy")
+    assert matrix.to_scipy_sparse().toarray().tolist() == matrix.data
+
+
+def test_containment() -> None:
+    """Test that nodes contain themselves and their descendants only."""
+    dsm = DSM("internal", lazy=True)
+    subpackage_a = dsm["internal.subpackage_a"]
+    module_i = dsm["internal.subpackage_a.subpackage_1.module_i"]
+    assert module_i in subpackage_a
+    assert module_i in dsm
+    assert subpackage_a in dsm["internal.subpackage_a"]
+    assert subpackage_a not in module_i
+    assert dsm["internal.module_a"] not in subpackage_a
+    assert subpackage_a in dsm["internal.subpackage_a.__init__"]
+    assert module_i not in DSM("internal")
+
+
 def test_inner_imports() -> None:
     """Test inner imports."""
     dsm = DSM("internal")
@@ -64,3 +408,471 @@ def test_delayed_build() -> None:
     dsm.build_tree()
     dsm.build_dependencies()
     assert len(dsm.submodules) == 6
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_parallel_build_is_identical(executor: str) -> None:
+    """Test that parsing modules in parallel gives the same result as a serial run.
+
+    Arguments:
+        executor: The executor to use.
+    """
+    serial = DSM("internal", "dependenpy")
+    parallel = DSM("internal", "dependenpy", workers=2, executor=executor)
+    assert parallel._to_json() == serial._to_json()
+    assert parallel.as_matrix(depth=2).data == serial.as_matrix(depth=2).data
+
+
+def test_prefetch_build_is_identical(tmp_path: Path) -> None:
+    """Test that prefetching files gives the same result, with or without cache.
+
+    Arguments:
+        tmp_path: Pytest fixture providing a temporary directory.
+    """
+    serial = DSM("internal", "dependenpy")
+    assert DSM("internal", "dependenpy", prefetch=4)._to_json() == serial._to_json()
+    assert DSM("internal", "dependenpy", prefetch=4, cache=tmp_path)._to_json() == serial._to_json()
+
+
+def test_prefetch_is_bounded() -> None:
+    """Test that files are read in order, and never too far ahead."""
+    read = []
+
+    def read_file(path: str) -> str:
+        read.append(path)
+        return path
+
+    paths = [f"module_{index}.py" for index in range(20)]
+    for index, result in enumerate(_prefetch(read_file, paths, 3)):
+        assert result == paths[index]
+        assert len(read) <= index + 1 + 3
+    assert sorted(read) == sorted(paths)
+
+
+def test_unknown_executor() -> None:
+    """Test that an unknown executor is rejected."""
+    with pytest.raises(ValueError, match="Unknown executor"):
+        DSM("internal", executor="fibers")
+    with pytest.raises(ValueError, match="Unknown engine"):
+        DSM("internal", engine="regex")
+
+
+def test_lazy_tree() -> None:
+    """Test that a lazy DSM only builds the parts of the tree it needs."""
+    dsm = DSM("internal", lazy=True)
+    module_1 = dsm["internal.subpackage_a.module_1"]
+    subpackage_1 = dsm["internal.subpackage_a.subpackage_1"]
+    assert subpackage_1._build_tree_pending
+    assert module_1._build_dependencies_pending
+    assert module_1.dependencies[0].target is dsm["internal.subpackage_a.subpackage_1.module_i"]
+    assert not subpackage_1._build_tree_pending
+    assert dsm["internal.module_a"]._build_dependencies_pending
+    assert dsm._to_json() == DSM("internal")._to_json()
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_name_index(tmp_path: Path, lazy: bool) -> None:
+    """Test that nodes are found through the index of the tree, modules before packages of the same name.
+
+    Arguments:
+        tmp_path: Pytest fixture providing a temporary directory.
+        lazy: Whether the tree is built on first access.
+    """
+    package = tmp_path / "package"
+    package.joinpath("same").mkdir(parents=True)
+    for path in ("__init__.py", "same.py", "same/__init__.py", "same/inner.py", "other.py"):
+        package.joinpath(path).touch()
+    dsm = DSM(str(package), lazy=lazy)
+    same = dsm["package.same"]
+    inner = dsm["package.same.inner"]
+    assert same.ismodule
+    assert inner.package is not None
+    assert inner.package.name == "same"
+    assert dsm.get_target("package.same.inner") is same
+    assert dsm.get_target("package.same.inner.Object") is inner
+    assert dsm.get_target("package.other.Object") is dsm["package.other"]
+    assert dsm.get_target("package.missing") is dsm["package"]
+    assert dsm.get_target("package.missing.module") is None
+    assert dsm["package"].get_target("same.inner.Object") is inner  # type: ignore[union-attr]
+    with pytest.raises(KeyError):
+        dsm["package.missing"]
+
+
+def test_tree_syscalls() -> None:
+    """Test that building the tree lists each directory once, without extra stat calls."""
+    dsm = DSM("internal", build_dependencies=False)
+    directories = sum(1 for _ in os.walk(dsm["internal"].path))
+    assert dsm.stats == {"scandir": directories, "stat": 0}
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_refresh(tmp_path: Path, compact: bool) -> None:
+    """Test that refreshing a DSM only parses what changed, and gives the same result as a new DSM.
+
+    Arguments:
+        tmp_path: Pytest fixture providing a temporary directory.
+        compact: Whether dependencies are stored in a dependency store.
+    """
+    internal = tmp_path / "internal"
+    shutil.copytree(FIXTURES_DIR / "internal", internal, ignore=shutil.ignore_patterns("__pycache__"))
+    dsm = DSM(str(internal), compact=compact)
+    assert dsm.refresh() == {"added": [], "changed": [], "removed": []}
+    matrix = dsm.as_matrix()
+    module_1 = dsm["internal.subpackage_a.module_1"]
+    module_i = dsm["internal.subpackage_a.subpackage_1.module_i"]
+    assert module_i in dsm["internal.subpackage_a"]
+
+    internal.joinpath("module_a.py").write_text("import os\nfrom . import module_b\n")
+    internal.joinpath("module_b.py").write_text("from .subpackage_a import module_2\n")
+    internal.joinpath("subpackage_a", "module_2.py").write_text("from ..module_a import ClassA\n")
+    shutil.rmtree(internal / "subpackage_a" / "subpackage_1")
+    with patch("dependenpy._internal.parsing._parse_source", wraps=_parse_source) as parse_source:
+        changes = dsm.refresh()
+    assert parse_source.call_count == 3
+    assert changes == {
+        "added": ["internal.module_b", "internal.subpackage_a.module_2"],
+        "changed": ["internal.module_a"],
+        "removed": ["internal.subpackage_a.subpackage_1.__init__", "internal.subpackage_a.subpackage_1.module_i"],
+    }
+    assert dsm["internal.subpackage_a.module_1"] is module_1
+    assert module_i not in dsm["internal.subpackage_a"]
+    assert dsm["internal.module_b"] in dsm["internal"]
+    assert module_1.dependencies[0].external
+    assert dsm.as_matrix() is not matrix
+    if dsm.store is not None:
+        dsm.store._compact()
+        assert module_i not in dsm.store.nodes
+    assert dsm._to_json() == DSM(str(internal))._to_json()
+    assert dsm.as_matrix().data == DSM(str(internal)).as_matrix().data
+
+
+def test_refresh_lazy(tmp_path: Path) -> None:
+    """Test that refreshing a lazy DSM lists the same added modules as an eager one.
+
+    Arguments:
+        tmp_path: Pytest fixture providing a temporary directory.
+    """
+    internal = tmp_path / "internal"
+    shutil.copytree(FIXTURES_DIR / "internal", internal, ignore=shutil.ignore_patterns("__pycache__"))
+    lazy = DSM(str(internal), lazy=True)
+    eager = DSM(str(internal))
+    lazy["internal.subpackage_a"]
+    new = internal / "new"
+    new.mkdir()
+    new.joinpath("__init__.py").write_text("")
+    new.joinpath("y.py").write_text("from . import z\n")
+    new.joinpath("z.py").write_text("")
+    changes = {"added": ["internal.new.__init__", "internal.new.y", "internal.new.z"], "changed": [], "removed": []}
+    assert lazy.refresh() == eager.refresh() == changes
+    assert lazy._to_json() == eager._to_json()
+
+
+def _archive_internal(tmp_path: Path, archive_format: str) -> str:
+    # Archive the `internal` fixture like a wheel (zip) or a source distribution (tar).
+    sources = sorted(path for path in (FIXTURES_DIR / "internal").rglob("*.py"))
+    if archive_format == "zip":
+        archive = tmp_path / "internal-1.0-py3-none-any.whl"
+        with zipfile.ZipFile(archive, "w") as wheel:
+            for path in sources:
+                wheel.write(path, path.relative_to(FIXTURES_DIR).as_posix())
+            wheel.writestr("internal-1.0.dist-info/METADATA", "Name: internal\n")
+    else:
+        archive = tmp_path / "internal-1.0.tar.gz"
+        with tarfile.open(archive, "w:gz") as sdist:
+            for path in sources:
+                sdist.add(path, f"internal-1.0/src/{path.relative_to(FIXTURES_DIR).as_posix()}")
+            sdist.add(FIXTURES_DIR / "external" / "__init__.py", "internal-1.0/setup.py")
+    return str(archive)
+
+
+@pytest.mark.parametrize("archive_format", ["zip", "tar"])
+def test_archives(tmp_path: Path, archive_format: str) -> None:
+    """Test that packages inside archives are analyzed in place, like their extracted files.
+
+    Arguments:
+        tmp_path: Pytest fixture providing a temporary directory.
+        archive_format: The format of the archive.
+    """
+    archive = _archive_internal(tmp_path, archive_format)
+    dsm = DSM(archive)
+    expected = DSM("internal")
+    assert not dsm.not_found
+    assert dsm.stats["scandir"] == 0
+    assert dsm._to_text() == expected._to_text()
+    assert dsm.as_matrix().keys == expected.as_matrix().keys
+    assert dsm.as_matrix().data == expected.as_matrix().data
+
+    inner = "internal/subpackage_a" if archive_format == "zip" else "internal-1.0/src/internal/subpackage_a"
+    subpackage = DSM(f"{archive}/{inner}")
+    assert [module.name for module in subpackage.submodules] == [
+        module.name
+        for module in DSM("internal").get("internal.subpackage_a").submodules  # type: ignore[union-attr]
+    ]
+
+
+def test_archives_are_closed(tmp_path: Path) -> None:
+    """Test that only the most recently used archives are kept open, and that closed ones can still be read.
+
+    Arguments:
+        tmp_path: Pytest fixture providing a temporary directory.
+    """
+    paths = []
+    for number in range(_MAX_ARCHIVES + 2):
+        path = tmp_path / f"package_{number}-1.0-py3-none-any.whl"
+        with zipfile.ZipFile(path, "w") as wheel:
+            wheel.writestr(f"package_{number}/__init__.py", f"import os  # {number}\n")
+        paths.append(f"{path}/package_{number}/__init__.py")
+    archives = [_archive_member(path)[0] for path in paths]  # type: ignore[index]
+    assert len(_ARCHIVES) <= _MAX_ARCHIVES
+    assert archives[0]._zip.fp is None  # type: ignore[union-attr]
+    assert archives[-1]._zip.fp is not None  # type: ignore[union-attr]
+    assert _read_bytes(paths[0]) == b"import os  # 0\n"
+
+
+def test_installed_finder_does_not_import(tmp_path: Path) -> None:
+    """Test that installed packages are found on disk, without executing their code.
+
+    Arguments:
+        tmp_path: Pytest fixture providing a temporary directory.
+    """
+    site = tmp_path / "site"
+    for directory in (site / "heavy" / "sub", tmp_path / "linked" / "linked", tmp_path / "mapped"):
+        directory.mkdir(parents=True)
+        directory.joinpath("__init__.py").write_text("raise RuntimeError('imported')\n")
+    site.joinpath("module.py").write_text("raise RuntimeError('imported')\n")
+    site.joinpath("linked.pth").write_text(f"{tmp_path / 'linked'}\nimport os; os._exit(1)\n")
+    site.joinpath("__editable___mapped_finder.py").write_text(f"MAPPING = {{'mapped': {str(tmp_path / 'mapped')!r}}}\n")
+    finder = InstalledPackageFinder([str(site)])
+
+    spec = finder.find("heavy.sub")
+    assert spec is not None
+    assert (spec.name, spec.path, spec.limit_to) == ("heavy", str(site / "heavy"), ["sub"])
+    assert finder.find("heavy.missing") is None
+    assert finder.find("module").path == str(site / "module.py")  # type: ignore[union-attr]
+    assert finder.find("linked").path == str(tmp_path / "linked" / "linked")  # type: ignore[union-attr]
+    assert finder.find("mapped").path == str(tmp_path / "mapped")  # type: ignore[union-attr]
+    assert finder.find("missing") is None
+
+
+def test_path_index(tmp_path: Path) -> None:
+    """Test that path entries are listed once, and that a saved index is reused until entries change.
+
+    Arguments:
+        tmp_path: Pytest fixture providing a temporary directory.
+    """
+    site = tmp_path / "site"
+    for name in ("package_a", "package_b"):
+        site.joinpath(name).mkdir(parents=True)
+        site.joinpath(name, "__init__.py").touch()
+    index_file = tmp_path / "index.json"
+    finder = Finder([InstalledPackageFinder], index=index_file)
+    finder.finders[0].path = [str(site), str(tmp_path / "missing")]  # type: ignore[attr-defined]
+    assert finder.find("package_a").path == str(site / "package_a")  # type: ignore[union-attr]
+    assert finder.find("package_b").path == str(site / "package_b")  # type: ignore[union-attr]
+    assert finder.find("package_c") is None
+    assert finder.index.scans == 2
+
+    reloaded = Finder([InstalledPackageFinder], index=index_file)
+    reloaded.finders[0].path = [str(site), str(tmp_path / "missing")]  # type: ignore[attr-defined]
+    with patch("dependenpy._internal.finder._isfile") as isfile:
+        assert reloaded.find("package_b").path == str(site / "package_b")  # type: ignore[union-attr]
+    assert not isfile.called
+    assert reloaded.index.scans == 0
+
+    site.joinpath("package_c").mkdir()
+    site.joinpath("package_c", "__init__.py").touch()
+    os.utime(site, ns=(0, 0))
+    changed = Finder([InstalledPackageFinder], index=index_file)
+    changed.finders[0].path = [str(site)]  # type: ignore[attr-defined]
+    assert changed.find("package_c").path == str(site / "package_c")  # type: ignore[union-attr]
+    assert changed.index.scans == 1
+
+    # Editing a `.pth` file does not change the modification time of its directory.
+    linked = tmp_path / "linked"
+    linked.joinpath("package_d").mkdir(parents=True)
+    linked.joinpath("package_d", "__init__.py").touch()
+    site.joinpath("linked.pth").write_text("")
+    os.utime(site, ns=(1, 1))
+    changed = Finder([InstalledPackageFinder], index=index_file)
+    changed.finders[0].path = [str(site)]  # type: ignore[attr-defined]
+    assert changed.find("package_d") is None
+    site.joinpath("linked.pth").write_text(f"{linked}\n")
+    os.utime(site.joinpath("linked.pth"), ns=(2, 2))
+    os.utime(site, ns=(1, 1))
+    edited = Finder([InstalledPackageFinder], index=index_file)
+    edited.finders[0].path = [str(site)]  # type: ignore[attr-defined]
+    assert edited.find("package_d").path == str(linked / "package_d")  # type: ignore[union-attr]
+    assert edited.index.scans == 2  # The site, and the linked directory.
+
+
+@pytest.mark.skipif(sys.version_info < (3, 11), reason="columns are recorded in bytecode since Python 3.11")
+def test_bytecode_engine_is_identical(tmp_path: Path) -> None:
+    """Test that finding imports in bytecode finds the same dependencies as parsing modules.
+
+    Arguments:
+        tmp_path: Pytest fixture providing a temporary directory.
+    """
+    internal = tmp_path / "internal"
+    shutil.copytree(FIXTURES_DIR / "internal", internal, ignore=shutil.ignore_patterns("__pycache__"))
+    compileall.compile_dir(internal, quiet=1)
+    with patch("dependenpy._internal.parsing._parse_source", wraps=_parse_source) as parse_source:
+        dsm = DSM(str(internal), engine="bytecode")
+    assert parse_source.call_count < len(dsm.submodules)
+    assert dsm._to_json() == DSM(str(internal))._to_json()
+
+    internal.joinpath("module_a.py").write_text("import os\n")
+    assert DSM(str(internal), engine="bytecode")._to_json() == DSM(str(internal))._to_json()
+
+
+@pytest.mark.skipif(sys.version_info < (3, 11), reason="columns are recorded in bytecode since Python 3.11")
+@pytest.mark.parametrize(
+    ("code", "usable"),
+    [
+        ("import a, b.c as d\nfrom . import e\nfrom ..f import (g,\n h as i,)\nfrom j import *\n", True),
+        ("def f():\n  import a\n  def g():\n      import b\n  return g\n\nasync def h():\n    import c\n", True),
+        ("import a\n@d\nclass B(\n    C,\n):\n  import d\n  def e(self):\n    from . import f\n", True),
+        ("import a\nfrom b import (\n    c,\n)\nraise E from \\\n    a\n", True),
+        ("try:\n    import a\nexcept ImportError:\n    import b\n", False),
+        ("def f():\n    for a in b:\n        import c\n", False),
+        ("def f():\n    if a:\n        pass\n    else:\n        import b\n", False),
+        ("def f():\n    try:\n        pass\n    except E:\n        import a\n", False),
+        ("class A:\n    while a:\n        def f():\n            import b\n", False),
+        ("def f():\n    x = g(\n1)\n    import y\n", False),
+        ("from a import b\nif False:\n    import c\nif 0:\n    import d\n", False),
+        ("if not __debug__:\n    import a\nelif (True):\n    import b\n", False),
+        ("import a; import b\nif False: import c\n", False),
+        ("def f():\n    return 1\n    import zz\n", False),
+        ("def f():\n    while True:\n        break\n        import a\n    raise E\n    from b import c\n", False),
+    ],
+)
+def test_bytecode_imports(tmp_path: Path, code: str, usable: bool) -> None:
+    """Test that imports found in bytecode are the ones found by parsing, or that parsing is required.
+
+    Arguments:
+        tmp_path: Pytest fixture providing a temporary directory.
+        code: The code to compile.
+        usable: Whether imports can be found in the bytecode.
+    """
+    module = tmp_path / "module.py"
+    module.write_text(code)
+    py_compile.compile(str(module), cfile=importlib.util.cache_from_source(str(module)), doraise=True)
+    imports = _read_bytecode_imports(str(module))
+    assert (imports is not None) == usable
+    assert imports is None or imports == _parse_source(code.encode())
+
+    # Hash-based bytecode is checked against the source even when the interpreter would not check it.
+    py_compile.compile(
+        str(module),
+        cfile=importlib.util.cache_from_source(str(module)),
+        doraise=True,
+        invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH,
+    )
+    module.write_text(code + "import zz\n")
+    assert _read_bytecode_imports(str(module)) is None
+
+
+def test_slots() -> None:
+    """Test that the objects of big trees store their attributes in slots, and share their names."""
+    dsm = DSM("internal")
+    module = dsm["internal.module_a"]
+    graph = dsm.as_graph()
+    objects = [module, module.package, module.dependencies[0], dsm.specs[0], *graph.vertices, *graph.edges]  # type: ignore[union-attr]
+    assert not any(hasattr(obj, "__dict__") for obj in objects)
+    targets = [dep.target for dep in module.dependencies if dep.external]  # type: ignore[union-attr]
+    assert targets
+    assert all(target is sys.intern(target) for target in targets)
+
+
+def test_compact_is_identical() -> None:
+    """Test that storing dependencies in a dependency store gives the same results as objects."""
+    dsm = DSM("internal")
+    compact = DSM("internal", compact=True)
+    assert compact.store is not None
+    assert len(compact.store) == sum(len(module.dependencies) for module in dsm.submodules)
+    assert compact._to_json() == dsm._to_json()
+    assert compact._to_csv() == dsm._to_csv()
+    assert compact._to_text() == dsm._to_text()
+    assert compact.as_matrix(depth=0).data == dsm.as_matrix(depth=0).data
+    assert compact.as_matrix(depth=2).data == dsm.as_matrix(depth=2).data
+    module_i = compact["internal.subpackage_a.subpackage_1.module_i"]
+    assert [str(dep) for dep in module_i.dependencies[1:]] == [str(dep) for dep in module_i.dependencies][1:]  # type: ignore[union-attr]
+    module_i.dependencies = module_i.dependencies[:1]  # type: ignore[union-attr]
+    assert len(module_i.dependencies) == 1  # type: ignore[union-attr]
+
+
+def test_parse_cache(tmp_path: Path) -> None:
+    """Test that a warm cache gives the same result without parsing files again.
+
+    Arguments:
+        tmp_path: Pytest fixture providing a temporary directory.
+    """
+    cold = DSM("internal", cache=tmp_path)
+    assert cold.cache.misses == 6  # type: ignore[union-attr]
+    with patch("dependenpy._internal.parsing._parse_source") as parse_source:
+        warm = DSM("internal", cache=tmp_path)
+    parse_source.assert_not_called()
+    assert warm.cache.hits == 6  # type: ignore[union-attr]
+    assert warm._to_json() == cold._to_json()
+
+
+def test_parse_cache_staleness(tmp_path: Path) -> None:
+    """Test that modified files are parsed again and touched files are not.
+
+    Arguments:
+        tmp_path: Pytest fixture providing a temporary directory.
+    """
+    package = tmp_path / "package"
+    package.mkdir()
+    (package / "__init__.py").write_text("")
+    module = package / "module.py"
+    module.write_text("import os\n")
+    cache = ParseCache(tmp_path / "cache")
+    assert DSM(str(package), cache=cache)["package.module"].dependencies[0].target == "os"  # type: ignore[union-attr]
+    stat = module.stat()
+    os.utime(module, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert DSM(str(package), cache=cache)["package.module"].dependencies[0].target == "os"  # type: ignore[union-attr]
+    assert cache.hits == 2
+    module.write_text("import re\n")
+    assert DSM(str(package), cache=cache)["package.module"].dependencies[0].target == "re"  # type: ignore[union-attr]
+
+
+def test_parse_cache_eviction(tmp_path: Path) -> None:
+    """Test that entries are evicted by size.
+
+    Arguments:
+        tmp_path: Pytest fixture providing a temporary directory.
+    """
+    DSM("internal", cache=tmp_path)
+    assert ParseCache(tmp_path, max_size=0).prune() == 6
+    assert not list(tmp_path.glob("*/*.json"))
+
+
+def test_scan_engine_is_identical() -> None:
+    """Test that scanning modules finds the same dependencies as parsing them."""
+    parsed = DSM("internal", "dependenpy")
+    scanned = DSM("internal", "dependenpy", engine="scan")
+    assert scanned._to_json() == parsed._to_json()
+
+
+@pytest.mark.parametrize(
+    "code",
+    [
+        "import a, b.c as d\nfrom . import e\nfrom ..f import (g,\n h as i,)\nfrom j import *  # import k\n",
+        "if x:\n    import a\nelif y:\n    import b\nelse:\n    import c\nimport d\n",
+        "try:\n    import a\nexcept ImportError:\n    import b\nelse:\n    import c\nfinally:\n    import d\n",
+        "def f():\n    for x in y:\n        import a\n    import b\n\nasync def g():\n    import c\n",
+        "class A:\n\tif x: import a; import b\n\twhile y: import c\n\tx = 1; import d\n",
+        "x = '''\nimport a\n'''\ny = (\n    1\n    if z\n    else 2\n)\nimport b\n",
+        "with a, b:\n    import c\nmatch x:\n    case 1:\n        import d\nimport \\\n    e\n",
+        "try:\n    import a\nexcept* ValueError:\n    import b\n",
+        "import a\n\nclass B(\n    C,\n):\n  import d\n",
+    ],
+)
+def test_scan_source(code: str) -> None:
+    """Test that scanning code finds the same imports as parsing it.
+
+    Arguments:
+        code: The code to scan.
+    """
+    source = code.encode()
+    assert _scan_source(source) == _parse_source(source)